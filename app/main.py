@@ -1,15 +1,42 @@
+import abc
+import asyncio
+import bisect
+import cProfile
+import csv
+import functools
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import pstats
 import random
+import re
 import sqlite3
 import os
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextvars import ContextVar
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Literal, Optional
+from typing import Iterator, Literal, Optional
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import FileResponse
+import numpy as np
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.routing import APIRoute
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
+try:  # Optional: brotli variants are only built when the package is installed.
+    import brotli
+except ImportError:
+    brotli = None
+
 BASE_DIR = Path(__file__).resolve().parent
 PROJECT_DIR = BASE_DIR.parent
 STATIC_DIR = BASE_DIR / "static"
@@ -26,6 +53,53 @@ def resolve_db_path() -> Path:
 
 DB_PATH = resolve_db_path()
 
+
+def resolve_archive_db_path() -> Path:
+    archive_value = os.getenv("HORSE_ARCHIVE_DB_PATH", "").strip()
+    if not archive_value:
+        return DB_PATH.with_name(f"{DB_PATH.stem}-archive{DB_PATH.suffix or '.db'}")
+    archive_path = Path(archive_value)
+    if not archive_path.is_absolute():
+        archive_path = PROJECT_DIR / archive_path
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    return archive_path
+
+
+ARCHIVE_DB_PATH = resolve_archive_db_path()
+# Race days older than this (with no pending tips) are moved out of the hot DB.
+ARCHIVE_AFTER_DAYS = int(os.getenv("HORSE_ARCHIVE_AFTER_DAYS", "14"))
+
+# Statements at or above this many milliseconds land in the slow-query log. Off by
+# default: every cursor call goes through TimedCursor while it is on.
+SLOW_QUERY_MS = float(os.getenv("HORSE_SLOW_QUERY_MS", "0"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("HORSE_SLOW_QUERY_LOG_SIZE", "200"))
+# Recent alert-engine evaluation ticks kept for /api/admin/alerts/ticks.
+ALERT_TICK_LOG_SIZE = int(os.getenv("HORSE_ALERT_TICK_LOG_SIZE", "200"))
+# Recent settlement passes kept for /api/admin/settlements.
+SETTLEMENT_LOG_SIZE = int(os.getenv("HORSE_SETTLEMENT_LOG_SIZE", "200"))
+# Per-process race board cache entries (0 disables the cache).
+BOARD_CACHE_SIZE = int(os.getenv("HORSE_BOARD_CACHE_SIZE", "256"))
+# Background jump scheduler that pre-warms boards for races about to jump.
+SCHEDULER_ENABLED = os.getenv("HORSE_SCHEDULER", "1").strip() == "1"
+SCHEDULER_TICK_S = float(os.getenv("HORSE_SCHEDULER_TICK_S", "5"))
+SCHEDULER_WARM_AHEAD_S = float(os.getenv("HORSE_SCHEDULER_WARM_AHEAD_S", "900"))
+
+
+def resolve_profile_dir() -> Path:
+    dir_value = os.getenv("HORSE_PROFILE_DIR", "profiles").strip()
+    profile_dir = Path(dir_value)
+    if not profile_dir.is_absolute():
+        profile_dir = PROJECT_DIR / profile_dir
+    return profile_dir
+
+
+# Request profiling is opt-in: HORSE_PROFILING=1 honours `?profile=1` on any route and
+# HORSE_PROFILE_SAMPLE_RATE additionally profiles that fraction of live traffic.
+PROFILING_ENABLED = os.getenv("HORSE_PROFILING", "0").strip() == "1"
+PROFILE_SAMPLE_RATE = float(os.getenv("HORSE_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = resolve_profile_dir()
+PROFILE_KEEP = int(os.getenv("HORSE_PROFILE_KEEP", "50"))
+
 BOOKMAKERS = ["sportsbet", "ladbrokes", "tab", "neds", "pointsbet"]
 BOOK_SYMBOLS = {
     "sportsbet": "SB",
@@ -120,7 +194,129 @@ DEFAULT_USER_SETTINGS = {
     "analytics_top_n": 8,
 }
 
+# ---------------------------------------------------------------------------
+# Request profiling
+# ---------------------------------------------------------------------------
+
+PROFILE_ID_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+request_profilers: ContextVar[Optional[list]] = ContextVar("request_profilers", default=None)
+profile_files_lock = threading.Lock()
+# One profiled request at a time: overlapping cProfile sessions skew each
+# other, and on Python 3.12+ a second one fails with "Another profiling tool
+# is already active".
+profiling_lock = threading.Lock()
+
+
+def profile_reason(request: Request) -> Optional[str]:
+    if not PROFILING_ENABLED:
+        return None
+    if request.query_params.get("profile", "").lower() in {"1", "true", "yes"}:
+        return "requested"
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+def save_profile(profilers: list, label: str) -> Optional[str]:
+    """Merge the per-thread profilers of one request into a pstats dump and
+    rotate PROFILE_DIR so it never holds more than PROFILE_KEEP files."""
+    stats = None
+    for profiler in profilers:
+        try:
+            if stats is None:
+                stats = pstats.Stats(profiler)
+            else:
+                stats.add(profiler)
+        except TypeError:
+            # Raised for a profiler that never saw a call.
+            continue
+    if stats is None:
+        return None
+
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-")[:60] or "request"
+    profile_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}-{slug}"
+    with profile_files_lock:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stats.dump_stats(str(PROFILE_DIR / f"{profile_id}.prof"))
+        existing = sorted(PROFILE_DIR.glob("*.prof"), key=lambda p: p.stat().st_mtime_ns)
+        for stale in existing[: max(len(existing) - max(PROFILE_KEEP, 1), 0)]:
+            stale.unlink(missing_ok=True)
+    return profile_id
+
+
+def profile_endpoint(endpoint):
+    """Sync endpoints run in the threadpool, where the request's event-loop
+    profiler cannot see them; give that thread its own profiler."""
+    if asyncio.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profilers = request_profilers.get()
+        if profilers is None:
+            return endpoint(*args, **kwargs)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+: one profiler per process, and the event-loop
+            # profiler already sees calls made on this thread.
+            return endpoint(*args, **kwargs)
+        profilers.append(profiler)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profiler.disable()
+
+    return wrapper
+
+
+class ProfilingRoute(APIRoute):
+    """Route that can capture a call-graph profile of a single request.
+
+    The event-loop part (validation, serialization) and the threadpool part
+    (SQLite and Python work in the endpoint) are profiled separately and
+    merged. The event-loop profiler may also see other requests interleaved
+    at await points, so profiles are best taken on a quiet server.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, profile_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def profiled_handler(request: Request):
+            reason = profile_reason(request)
+            if reason is None or not profiling_lock.acquire(blocking=False):
+                return await handler(request)
+            try:
+                loop_profiler = cProfile.Profile()
+                try:
+                    loop_profiler.enable()
+                except ValueError:
+                    # A profiler started outside this app holds the hook.
+                    return await handler(request)
+                profilers = [loop_profiler]
+                token = request_profilers.set(profilers)
+                try:
+                    response = await handler(request)
+                finally:
+                    loop_profiler.disable()
+                    request_profilers.reset(token)
+            finally:
+                profiling_lock.release()
+            profile_id = await asyncio.to_thread(save_profile, profilers, f"{reason}-{request.method}-{request.url.path}")
+            if profile_id:
+                response.headers["X-Profile-Id"] = profile_id
+            return response
+
+        return profiled_handler
+
+
 app = FastAPI(title="Horse Tips MVP", version="0.1.0")
+app.router.route_class = ProfilingRoute
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
 
@@ -160,8 +356,155 @@ class UpdateBetResultRequest(BaseModel):
     result: Literal["pending", "won", "lost"]
 
 
-def get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH, timeout=10)
+# ---------------------------------------------------------------------------
+# Slow-query log
+# ---------------------------------------------------------------------------
+
+SQL_WHITESPACE_RE = re.compile(r"\s+")
+SQL_PLACEHOLDER_LIST_RE = re.compile(r"\?(?:\s*,\s*\?)+")
+EXPLAINABLE_PREFIXES = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+slow_query_log: deque = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+slow_query_lock = threading.Lock()
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and variable-length `IN (?, ?, ...)` lists so that
+    the same query shape always normalizes to the same text."""
+    collapsed = SQL_WHITESPACE_RE.sub(" ", sql).strip()
+    return SQL_PLACEHOLDER_LIST_RE.sub("?, ...", collapsed)
+
+
+def explain_query_plan(conn: sqlite3.Connection, sql: str, params) -> list[dict]:
+    # A plain cursor keeps the EXPLAIN itself out of the slow-query log.
+    try:
+        rows = conn.cursor(sqlite3.Cursor).execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    except (sqlite3.Error, ValueError):
+        return []
+    return [{"id": r[0], "parent": r[1], "detail": r[3]} for r in rows]
+
+
+def record_slow_query(conn: sqlite3.Connection, sql: str, params, duration_s: float, batch_size: int = 1) -> None:
+    normalized = normalize_sql(sql)
+    params = params if params is not None else ()
+    plan = explain_query_plan(conn, sql, params) if normalized.upper().startswith(EXPLAINABLE_PREFIXES) else []
+    entry = {
+        "sql": normalized,
+        "param_count": len(params),
+        "batch_size": batch_size,
+        "duration_ms": round(duration_s * 1000.0, 3),
+        "plan": plan,
+        "recorded_at": datetime.utcnow().isoformat(),
+    }
+    with slow_query_lock:
+        slow_query_log.append(entry)
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports statements slower than SLOW_QUERY_MS.
+
+    SQLite steps a SELECT lazily, so time spent in the fetch calls is added to
+    the statement and it is only judged once its rows are exhausted (or the
+    cursor is reused, closed or garbage collected).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._timed_sql = None
+        self._timed_params = None
+        self._timed_elapsed = 0.0
+        self._timed_batch = 1
+
+    def _finish_statement(self) -> None:
+        sql = self._timed_sql
+        if sql is None:
+            return
+        self._timed_sql = None
+        if SLOW_QUERY_MS > 0 and (self._timed_elapsed * 1000.0) >= SLOW_QUERY_MS:
+            record_slow_query(self.connection, sql, self._timed_params, self._timed_elapsed, self._timed_batch)
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._timed_elapsed += time.perf_counter() - start
+
+    def execute(self, sql, parameters=()):
+        self._finish_statement()
+        self._timed_sql = sql
+        self._timed_params = parameters
+        self._timed_elapsed = 0.0
+        self._timed_batch = 1
+        try:
+            return self._timed(super().execute, sql, parameters)
+        finally:
+            if self.description is None:
+                self._finish_statement()
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish_statement()
+        if not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters)
+        self._timed_sql = sql
+        self._timed_params = seq_of_parameters[0] if seq_of_parameters else ()
+        self._timed_elapsed = 0.0
+        self._timed_batch = len(seq_of_parameters)
+        try:
+            return self._timed(super().executemany, sql, seq_of_parameters)
+        finally:
+            self._finish_statement()
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish_statement()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed(super().fetchmany, size)
+        if len(rows) < size:
+            self._finish_statement()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._finish_statement()
+        return rows
+
+    def __next__(self):
+        try:
+            return self._timed(super().__next__)
+        except StopIteration:
+            self._finish_statement()
+            raise
+
+    def close(self):
+        self._finish_statement()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish_statement()
+        except (sqlite3.Error, AttributeError):
+            pass
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def get_conn(with_archive: bool = False, check_same_thread: bool = True) -> sqlite3.Connection:
+    factory = TimedConnection if SLOW_QUERY_MS > 0 else sqlite3.Connection
+    conn = sqlite3.connect(DB_PATH, timeout=10, factory=factory, check_same_thread=check_same_thread)
     conn.row_factory = sqlite3.Row
     # Safer defaults for concurrent local development sessions.
     conn.execute("PRAGMA foreign_keys=ON;")
@@ -169,6 +512,8 @@ def get_conn() -> sqlite3.Connection:
     conn.execute("PRAGMA synchronous=NORMAL;")
     conn.execute("PRAGMA busy_timeout=10000;")
     conn.execute("PRAGMA temp_store=MEMORY;")
+    if with_archive:
+        attach_archive(conn)
     return conn
 
 
@@ -191,6 +536,22 @@ def init_db() -> None:
         )
         """
     )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS horses (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS people (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+        """
+    )
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS runners (
@@ -203,64 +564,71 @@ def init_db() -> None:
             jockey TEXT NOT NULL,
             model_prob REAL NOT NULL,
             predicted_price REAL NOT NULL,
+            horse_id INTEGER,
+            trainer_id INTEGER,
             FOREIGN KEY (race_id) REFERENCES races(id)
         )
         """
     )
     cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS odds (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            runner_id INTEGER NOT NULL,
-            bookmaker TEXT NOT NULL,
-            current_odds REAL NOT NULL,
-            bet_url TEXT NOT NULL,
-            updated_at TEXT NOT NULL,
-            FOREIGN KEY (runner_id) REFERENCES runners(id)
+        CREATE TABLE IF NOT EXISTS bookmakers (
+            id INTEGER PRIMARY KEY,
+            code TEXT NOT NULL UNIQUE
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tracks (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
         )
         """
     )
+    # Compact storage behind the `odds` view (see ensure_compact_storage):
+    # integer bookmaker key, price in ticks, epoch-microsecond timestamp and
+    # bet_url only when it differs from the default deep link.
     cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS runner_history (
+        CREATE TABLE IF NOT EXISTS odds_data (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             runner_id INTEGER NOT NULL,
-            run_date TEXT NOT NULL,
-            track TEXT NOT NULL,
-            distance_m INTEGER NOT NULL,
-            finish_pos INTEGER NOT NULL,
-            starting_price REAL NOT NULL,
-            carried_weight_kg REAL NOT NULL,
-            jockey TEXT NOT NULL,
+            bookmaker_id INTEGER NOT NULL,
+            price_ticks INTEGER NOT NULL,
+            bet_url TEXT,
+            updated_us INTEGER NOT NULL,
+            price_rank INTEGER,
             FOREIGN KEY (runner_id) REFERENCES runners(id)
         )
         """
     )
     cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS trainer_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            trainer TEXT NOT NULL,
-            run_date TEXT NOT NULL,
-            horse_name TEXT NOT NULL,
-            track TEXT NOT NULL,
-            distance_m INTEGER NOT NULL,
-            finish_pos INTEGER NOT NULL,
-            starting_price REAL NOT NULL
+        CREATE TABLE IF NOT EXISTS runner_best_prices (
+            runner_id INTEGER PRIMARY KEY,
+            race_id INTEGER NOT NULL,
+            best_odds REAL NOT NULL,
+            best_bookmaker TEXT NOT NULL,
+            best_bet_url TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            FOREIGN KEY (runner_id) REFERENCES runners(id)
         )
         """
     )
     cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS jockey_history (
+        CREATE TABLE IF NOT EXISTS runner_history_data (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            jockey TEXT NOT NULL,
-            run_date TEXT NOT NULL,
-            horse_name TEXT NOT NULL,
-            track TEXT NOT NULL,
+            runner_id INTEGER NOT NULL,
+            run_day INTEGER NOT NULL,
+            track_id INTEGER NOT NULL,
             distance_m INTEGER NOT NULL,
             finish_pos INTEGER NOT NULL,
-            starting_price REAL NOT NULL
+            sp_ticks INTEGER NOT NULL,
+            carried_weight_hg INTEGER NOT NULL,
+            jockey_id INTEGER NOT NULL,
+            FOREIGN KEY (runner_id) REFERENCES runners(id)
         )
         """
     )
@@ -277,7 +645,8 @@ def init_db() -> None:
             stake REAL NOT NULL DEFAULT 0,
             result TEXT NOT NULL DEFAULT 'pending',
             tracked_at TEXT NOT NULL,
-            settled_at TEXT
+            settled_at TEXT,
+            manual_result INTEGER NOT NULL DEFAULT 0
         )
         """
     )
@@ -357,46 +726,31 @@ def ensure_schema_compat() -> None:
         cur.execute("ALTER TABLE runners ADD COLUMN jockey TEXT")
         cur.execute("UPDATE runners SET jockey = 'Unknown Jockey' WHERE jockey IS NULL")
 
-    odds_cols = {r[1] for r in cur.execute("PRAGMA table_info(odds)").fetchall()}
-    if "bet_url" not in odds_cols:
-        cur.execute("ALTER TABLE odds ADD COLUMN bet_url TEXT")
-        cur.execute(
-            """
-            UPDATE odds
-            SET bet_url = 'https://example.com/bet/' || bookmaker || '/legacy/' || runner_id
-            WHERE bet_url IS NULL
-            """
-        )
+    # odds and runner_history are views over dictionary-encoded tables; older
+    # DBs are converted in place, filling columns added since (bet_url, price_rank).
+    compacted = ensure_compact_storage(cur)
 
-    # Ensure new history tables exist for clickable trainer/jockey views.
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS trainer_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            trainer TEXT NOT NULL,
-            run_date TEXT NOT NULL,
-            horse_name TEXT NOT NULL,
-            track TEXT NOT NULL,
-            distance_m INTEGER NOT NULL,
-            finish_pos INTEGER NOT NULL,
-            starting_price REAL NOT NULL
-        )
-        """
-    )
+    # Best price across all books, maintained at write time by refresh_best_prices().
     cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS jockey_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            jockey TEXT NOT NULL,
-            run_date TEXT NOT NULL,
-            horse_name TEXT NOT NULL,
-            track TEXT NOT NULL,
-            distance_m INTEGER NOT NULL,
-            finish_pos INTEGER NOT NULL,
-            starting_price REAL NOT NULL
+        CREATE TABLE IF NOT EXISTS runner_best_prices (
+            runner_id INTEGER PRIMARY KEY,
+            race_id INTEGER NOT NULL,
+            best_odds REAL NOT NULL,
+            best_bookmaker TEXT NOT NULL,
+            best_bet_url TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            FOREIGN KEY (runner_id) REFERENCES runners(id)
         )
         """
     )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_best_prices_race ON runner_best_prices(race_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_odds_runner_book ON odds_data(runner_id, bookmaker_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_runners_race ON runners(race_id)")
+    ensure_search_schema(cur)
+    # Trainer/jockey history are views over runner_history keyed by horses/people.
+    ensure_history_schema(cur)
+
     tracked_cols = {r[1] for r in cur.execute("PRAGMA table_info(tracked_tips)").fetchall()}
     if "user_id" not in tracked_cols:
         cur.execute("ALTER TABLE tracked_tips ADD COLUMN user_id TEXT")
@@ -406,6 +760,8 @@ def ensure_schema_compat() -> None:
         cur.execute("UPDATE tracked_tips SET stake = 0 WHERE stake IS NULL")
     if "settled_at" not in tracked_cols:
         cur.execute("ALTER TABLE tracked_tips ADD COLUMN settled_at TEXT")
+    if "manual_result" not in tracked_cols:
+        cur.execute("ALTER TABLE tracked_tips ADD COLUMN manual_result INTEGER NOT NULL DEFAULT 0")
 
     cur.execute(
         """
@@ -425,6 +781,12 @@ def ensure_schema_compat() -> None:
     race_results_cols = {r[1] for r in cur.execute("PRAGMA table_info(race_results)").fetchall()}
     if "closing_odds" not in race_results_cols:
         cur.execute("ALTER TABLE race_results ADD COLUMN closing_odds REAL")
+    # Per-runner change versions behind /api/races/{id}/board/delta.
+    ensure_board_change_schema(cur)
+    ensure_alert_schema(cur)
+    ensure_cache_version_schema(cur)
+    ensure_jump_index_schema(cur)
+    ensure_settlement_schema(cur)
 
     cur.execute(
         """
@@ -561,19 +923,23 @@ def ensure_schema_compat() -> None:
     )
 
     conn.commit()
+    if compacted:
+        # Reclaim the pages freed by dropping the legacy TEXT/REAL tables.
+        conn.execute("VACUUM")
     conn.close()
 
 
 def seed_dummy_data() -> None:
     conn = get_conn()
     cur = conn.cursor()
-    count = cur.execute("SELECT COUNT(*) FROM races").fetchone()[0]
+    today = datetime.now().date()
+    # A DB holding only past race days (e.g. waiting to be archived) still gets a card for today.
+    count = cur.execute("SELECT COUNT(*) FROM races WHERE race_date >= ?", (today.isoformat(),)).fetchone()[0]
     if count > 0:
         conn.close()
         return
 
     rng = random.Random(42)
-    today = datetime.now().date()
     dates = [today, today + timedelta(days=1)]
     tracks = TRACK_POOL
 
@@ -671,41 +1037,8 @@ def seed_dummy_data() -> None:
                                 hist_jockey,
                             ),
                         )
-                        cur.execute(
-                            """
-                            INSERT INTO trainer_history (
-                                trainer, run_date, horse_name, track, distance_m, finish_pos, starting_price
-                            )
-                            VALUES (?, ?, ?, ?, ?, ?, ?)
-                            """,
-                            (
-                                trainer,
-                                run_date.isoformat(),
-                                horse_name,
-                                hist_track,
-                                hist_distance,
-                                finish_pos,
-                                sp,
-                            ),
-                        )
-                        cur.execute(
-                            """
-                            INSERT INTO jockey_history (
-                                jockey, run_date, horse_name, track, distance_m, finish_pos, starting_price
-                            )
-                            VALUES (?, ?, ?, ?, ?, ?, ?)
-                            """,
-                            (
-                                hist_jockey,
-                                run_date.isoformat(),
-                                horse_name,
-                                hist_track,
-                                hist_distance,
-                                finish_pos,
-                                sp,
-                            ),
-                        )
 
+    refresh_best_prices(conn)
     conn.commit()
     conn.close()
 
@@ -726,6 +1059,52 @@ def normalized_probs_from_prices(price_by_runner: dict[int, float]) -> dict[int,
     return {rid: p / total for rid, p in raw.items()}
 
 
+def refresh_best_prices(conn: sqlite3.Connection, race_ids: Optional[list[int]] = None) -> None:
+    """Re-rank odds per runner and upsert runner_best_prices for `race_ids`
+    (every race when None). Call after any write to odds."""
+    if race_ids is not None and not race_ids:
+        return
+    if race_ids is None:
+        rank_filter = ""
+        best_filter = ""
+        params: list = []
+    else:
+        ph = ",".join("?" for _ in race_ids)
+        rank_filter = f"WHERE runner_id IN (SELECT id FROM runners WHERE race_id IN ({ph}))"
+        best_filter = f"AND r.race_id IN ({ph})"
+        params = list(race_ids)
+    conn.execute(
+        f"""
+        UPDATE odds_data
+        SET price_rank = ranked.rn
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY runner_id ORDER BY price_ticks DESC, id) AS rn
+            FROM odds_data
+            {rank_filter}
+        ) AS ranked
+        WHERE odds_data.id = ranked.id AND odds_data.price_rank IS NOT ranked.rn
+        """,
+        params,
+    )
+    conn.execute(
+        f"""
+        INSERT INTO runner_best_prices (runner_id, race_id, best_odds, best_bookmaker, best_bet_url, updated_at)
+        SELECT o.runner_id, r.race_id, o.current_odds, o.bookmaker, o.bet_url, o.updated_at
+        FROM odds o
+        JOIN runners r ON r.id = o.runner_id
+        WHERE o.price_rank = 1
+          {best_filter}
+        ON CONFLICT(runner_id) DO UPDATE SET
+          race_id = excluded.race_id,
+          best_odds = excluded.best_odds,
+          best_bookmaker = excluded.best_bookmaker,
+          best_bet_url = excluded.best_bet_url,
+          updated_at = excluded.updated_at
+        """,
+        params,
+    )
+
+
 def backfill_dummy_profiles() -> None:
     conn = get_conn()
     cur = conn.cursor()
@@ -797,29 +1176,6 @@ def backfill_dummy_profiles() -> None:
                     ),
                 )
 
-    cur.execute("DELETE FROM trainer_history")
-    cur.execute(
-        """
-        INSERT INTO trainer_history (
-            trainer, run_date, horse_name, track, distance_m, finish_pos, starting_price
-        )
-        SELECT r.trainer, h.run_date, r.horse_name, h.track, h.distance_m, h.finish_pos, h.starting_price
-        FROM runner_history h
-        JOIN runners r ON r.id = h.runner_id
-        """
-    )
-    cur.execute("DELETE FROM jockey_history")
-    cur.execute(
-        """
-        INSERT INTO jockey_history (
-            jockey, run_date, horse_name, track, distance_m, finish_pos, starting_price
-        )
-        SELECT h.jockey, h.run_date, r.horse_name, h.track, h.distance_m, h.finish_pos, h.starting_price
-        FROM runner_history h
-        JOIN runners r ON r.id = h.runner_id
-        """
-    )
-
     conn.commit()
     conn.close()
 
@@ -833,6 +1189,7 @@ def rebalance_dummy_odds() -> None:
         SELECT o.id, r.predicted_price
         FROM odds o
         JOIN runners r ON r.id = o.runner_id
+        ORDER BY o.runner_id, o.bookmaker
         """
     ).fetchall()
     for row in rows:
@@ -844,6 +1201,7 @@ def rebalance_dummy_odds() -> None:
             "UPDATE odds SET current_odds = ?, updated_at = ? WHERE id = ?",
             (odds, datetime.utcnow().isoformat(), row["id"]),
         )
+    refresh_best_prices(conn)
     conn.commit()
     conn.close()
 
@@ -917,41 +1275,303 @@ def publish_dummy_race_result(conn: sqlite3.Connection, race_id: int) -> dict:
     }
 
 
-def settle_pending_tips(conn: sqlite3.Connection, user_id: str = "demo") -> dict:
-    pending = conn.execute(
+# ---------------------------------------------------------------------------
+# Settlement
+# ---------------------------------------------------------------------------
+
+# Tips are settled per race, for every user at once, with set-based statements
+# in the caller's transaction. Triggers queue a race whenever its results are
+# written, corrected or withdrawn, or a tip is tracked on a race that has
+# already resulted, so a pass only touches tips on queued races: a corrected
+# result re-settles the tips it flips and a withdrawn one returns them to
+# pending, without rescanning anyone else's bets.
+#
+# Results a user set by hand (manual_result) are left alone, except when the
+# race is queued as `forced`: a result correction or withdrawal, or an explicit
+# resettle, re-derives every tip on the race.
+
+# An upsert clause, unlike OR IGNORE, is not overridden by the writing statement's conflict policy.
+SETTLEMENT_QUEUE_SQL = (
+    "INSERT INTO settlement_queue (race_id, forced) VALUES ({race}, {forced}) "
+    "ON CONFLICT(race_id) DO UPDATE SET forced = max(forced, excluded.forced);"
+)
+SETTLEMENT_QUEUE_TRIGGERS = [
+    ("settlement_result_insert", "AFTER INSERT ON race_results", "NEW.race_id", 0),
+    ("settlement_result_update", "AFTER UPDATE OF race_id, runner_id, finish_pos ON race_results", "NEW.race_id", 1),
+    ("settlement_result_delete", "AFTER DELETE ON race_results", "OLD.race_id", 1),
+    (
+        "settlement_late_tip",
+        "AFTER INSERT ON tracked_tips WHEN EXISTS (SELECT 1 FROM race_results rr WHERE rr.race_id = NEW.race_id)",
+        "NEW.race_id",
+        0,
+    ),
+]
+SETTLED_RESULT_SQL = "CASE WHEN rr.finish_pos = 1 THEN 'won' ELSE 'lost' END"
+
+settlement_log: deque = deque(maxlen=SETTLEMENT_LOG_SIZE)
+settlement_lock = threading.Lock()
+
+
+def ensure_settlement_schema(cur: sqlite3.Cursor) -> None:
+    cur.execute("CREATE TABLE IF NOT EXISTS settlement_queue (race_id INTEGER PRIMARY KEY, forced INTEGER NOT NULL DEFAULT 0)")
+    if "forced" not in {r[1] for r in cur.execute("PRAGMA table_info(settlement_queue)").fetchall()}:
+        cur.execute("ALTER TABLE settlement_queue ADD COLUMN forced INTEGER NOT NULL DEFAULT 0")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_tracked_tips_race ON tracked_tips(race_id, runner_id)")
+    for name, event, race, forced in SETTLEMENT_QUEUE_TRIGGERS:
+        # Recreated so a DB made by an older build picks up the current bodies.
+        cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cur.execute(f"CREATE TRIGGER {name} {event} BEGIN {SETTLEMENT_QUEUE_SQL.format(race=race, forced=forced)} END")
+    # Results published before the queue existed.
+    cur.execute(
         """
-        SELECT t.id, rr.finish_pos
+        INSERT OR IGNORE INTO settlement_queue (race_id)
+        SELECT DISTINCT t.race_id
         FROM tracked_tips t
         JOIN race_results rr ON rr.race_id = t.race_id AND rr.runner_id = t.runner_id
-        WHERE t.user_id = ? AND t.result = 'pending'
-        """,
-        (user_id,),
-    ).fetchall()
-    if not pending:
-        return {"checked": 0, "settled": 0, "won": 0, "lost": 0}
+        WHERE t.result = 'pending'
+        """
+    )
 
-    now = datetime.utcnow().isoformat()
-    won = 0
-    lost = 0
-    updates = []
-    for row in pending:
-        if int(row["finish_pos"]) == 1:
-            result = "won"
-            won += 1
-        else:
-            result = "lost"
-            lost += 1
-        updates.append((result, now, row["id"]))
 
-    conn.executemany(
-        """
-        UPDATE tracked_tips
-        SET result = ?, settled_at = ?
-        WHERE id = ?
+def settle_pending_tips(conn: sqlite3.Connection) -> dict:
+    """Settle every user's tips on the races queued since the last pass.
+    Runs in the caller's transaction; the caller commits."""
+    empty = {"races": 0, "checked": 0, "settled": 0, "won": 0, "lost": 0, "resettled": 0, "unsettled": 0, "users": 0}
+    # Read first so the common empty case never takes the write lock.
+    if not conn.execute("SELECT 1 FROM settlement_queue LIMIT 1").fetchone():
+        return empty
+
+    started = time.perf_counter()
+    # Claiming the queue is the first write, so nothing can be queued between
+    # reading these races and settling them.
+    claimed = conn.execute("DELETE FROM settlement_queue RETURNING race_id, forced").fetchall()
+    if not claimed:
+        return empty
+    race_ids = sorted(row[0] for row in claimed)
+    forced_ids = [row[0] for row in claimed if row[1]]
+    ph = ",".join("?" for _ in race_ids)
+    # Hand-set results only give way on forced races.
+    derived = f"(t.manual_result = 0 OR t.race_id IN ({','.join('?' for _ in forced_ids)}))"
+    counts = conn.execute(
+        f"""
+        SELECT
+          (SELECT COUNT(*) FROM tracked_tips WHERE race_id IN ({ph})) AS checked,
+          COUNT(*) AS settled,
+          COALESCE(SUM({SETTLED_RESULT_SQL} = 'won'), 0) AS won,
+          COALESCE(SUM(t.result <> 'pending'), 0) AS resettled,
+          COUNT(DISTINCT t.user_id) AS users
+        FROM tracked_tips t
+        JOIN race_results rr ON rr.race_id = t.race_id AND rr.runner_id = t.runner_id
+        WHERE t.race_id IN ({ph}) AND t.result <> {SETTLED_RESULT_SQL} AND {derived}
+        """,
+        race_ids + race_ids + forced_ids,
+    ).fetchone()
+    now = datetime.utcnow().isoformat()
+    conn.execute(
+        f"""
+        UPDATE tracked_tips AS t
+        SET result = {SETTLED_RESULT_SQL}, settled_at = ?, manual_result = 0
+        FROM race_results rr
+        WHERE rr.race_id = t.race_id
+          AND rr.runner_id = t.runner_id
+          AND t.race_id IN ({ph})
+          AND t.result <> {SETTLED_RESULT_SQL}
+          AND {derived}
         """,
-        updates,
+        [now] + race_ids + forced_ids,
     )
-    return {"checked": len(pending), "settled": len(updates), "won": won, "lost": lost}
+    # Results withdrawn since the tips were settled.
+    unsettled = conn.execute(
+        f"""
+        UPDATE tracked_tips AS t
+        SET result = 'pending', settled_at = NULL, manual_result = 0
+        WHERE t.race_id IN ({ph})
+          AND t.result IN ('won', 'lost')
+          AND {derived}
+          AND NOT EXISTS (
+            SELECT 1 FROM race_results rr
+            WHERE rr.race_id = t.race_id AND rr.runner_id = t.runner_id
+          )
+        """,
+        race_ids + forced_ids,
+    ).rowcount
+
+    settlement = {
+        "races": len(race_ids),
+        "checked": counts["checked"],
+        "settled": counts["settled"],
+        "won": counts["won"],
+        "lost": counts["settled"] - counts["won"],
+        "resettled": counts["resettled"],
+        "unsettled": unsettled,
+        "users": counts["users"],
+    }
+    with settlement_lock:
+        settlement_log.append(
+            {
+                "at": now,
+                "race_ids": race_ids,
+                **settlement,
+                "duration_ms": round((time.perf_counter() - started) * 1000.0, 3),
+            }
+        )
+    return settlement
+
+
+@app.post("/api/admin/races/{race_id}/resettle")
+def resettle_race(race_id: int):
+    """Re-derive every tip on the race from its current results, hand-set
+    ones included."""
+    conn = get_conn()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if not conn.execute("SELECT 1 FROM races WHERE id = ?", (race_id,)).fetchone():
+            raise HTTPException(status_code=404, detail="Race not found.")
+        conn.execute(SETTLEMENT_QUEUE_SQL.format(race="?", forced=1), (race_id,))
+        settlement = settle_pending_tips(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    return {"status": "ok", "settlement": settlement}
+
+
+# ---------------------------------------------------------------------------
+# Hot/cold archive
+# ---------------------------------------------------------------------------
+
+# Parent tables first: rows are copied in this order and deleted in reverse.
+ARCHIVE_TABLES = ["races", "runners", "odds_data", "runner_history_data", "race_results", "tracked_tips"]
+ARCHIVE_ROW_FILTERS = {
+    "races": "id IN (SELECT race_id FROM temp.archive_race_ids)",
+    "runners": "race_id IN (SELECT race_id FROM temp.archive_race_ids)",
+    "odds_data": "runner_id IN (SELECT id FROM main.runners WHERE race_id IN (SELECT race_id FROM temp.archive_race_ids))",
+    "runner_history_data": "runner_id IN (SELECT id FROM main.runners WHERE race_id IN (SELECT race_id FROM temp.archive_race_ids))",
+    "race_results": "race_id IN (SELECT race_id FROM temp.archive_race_ids)",
+    "tracked_tips": "race_id IN (SELECT race_id FROM temp.archive_race_ids)",
+}
+ARCHIVE_INDEXES = [
+    ("idx_archive_races_date", "races", "race_date, track"),
+    ("idx_archive_runners_race", "runners", "race_id"),
+    ("idx_archive_odds_runner", "odds_data", "runner_id"),
+    ("idx_archive_history_runner", "runner_history_data", "runner_id"),
+    ("idx_archive_history_jockey", "runner_history_data", "jockey_id"),
+    ("idx_archive_runners_trainer", "runners", "trainer_id"),
+    ("idx_archive_results_race", "race_results", "race_id"),
+    ("idx_archive_tips_user", "tracked_tips", "user_id, tracked_at"),
+]
+CREATE_TABLE_RE = re.compile(r"^\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?", re.IGNORECASE)
+
+
+def archive_cutoff(keep_days: int = ARCHIVE_AFTER_DAYS) -> str:
+    return (datetime.now().date() - timedelta(days=keep_days)).isoformat()
+
+
+def table_columns(conn: sqlite3.Connection, schema: str, table: str) -> list[str]:
+    return [r[1] for r in conn.execute(f"PRAGMA {schema}.table_info({table})").fetchall()]
+
+
+def attach_archive(conn: sqlite3.Connection) -> bool:
+    """Attach the archive DB (when one exists) and create `<table>_all` temp views
+    over hot + archived rows, so historical queries read both transparently."""
+    archived_tables: set[str] = set()
+    attached = any(r[1] == "archive" for r in conn.execute("PRAGMA database_list").fetchall())
+    if attached or ARCHIVE_DB_PATH.exists():
+        if not attached:
+            conn.execute("ATTACH DATABASE ? AS archive", (str(ARCHIVE_DB_PATH),))
+        archived_tables = {
+            r[0] for r in conn.execute("SELECT name FROM archive.sqlite_master WHERE type = 'table'").fetchall()
+        }
+    for table in ARCHIVE_TABLES:
+        cols = ", ".join(table_columns(conn, "main", table))
+        body = f"SELECT {cols} FROM main.{table}"
+        if table in archived_tables:
+            body += f" UNION ALL SELECT {cols} FROM archive.{table}"
+        conn.execute(f"CREATE TEMP VIEW IF NOT EXISTS {table}_all AS {body}")
+    for view, body in COMPACT_VIEWS.items():
+        conn.execute(f"CREATE TEMP VIEW IF NOT EXISTS {view}_all AS {body.format(db='', src='_all')}")
+    for view, body in HISTORY_VIEWS.items():
+        conn.execute(f"CREATE TEMP VIEW IF NOT EXISTS {view}_all AS {body.format(src='_all')}")
+    return bool(archived_tables)
+
+
+def ensure_archive_schema(conn: sqlite3.Connection) -> None:
+    # Mirror the hot DDL so ids, constraints and column order stay identical,
+    # then add any columns introduced since the archive was created.
+    for table in ARCHIVE_TABLES:
+        ddl = conn.execute(
+            "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?",
+            (table,),
+        ).fetchone()[0]
+        conn.execute(CREATE_TABLE_RE.sub("CREATE TABLE IF NOT EXISTS archive.", ddl, count=1))
+        archived_cols = set(table_columns(conn, "archive", table))
+        for col in conn.execute(f"PRAGMA main.table_info({table})").fetchall():
+            if col[1] not in archived_cols:
+                conn.execute(f"ALTER TABLE archive.{table} ADD COLUMN {col[1]} {col[2]}")
+    for index_name, table, cols in ARCHIVE_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS archive.{index_name} ON {table}({cols})")
+
+
+def archive_race_days(keep_days: int = ARCHIVE_AFTER_DAYS) -> dict:
+    """Move settled race days older than `keep_days` into the archive DB."""
+    cutoff = archive_cutoff(keep_days)
+    conn = get_conn()
+    days = [
+        r["race_date"]
+        for r in conn.execute(
+            """
+            SELECT DISTINCT race_date
+            FROM races
+            WHERE race_date < ?
+              AND race_date NOT IN (
+                SELECT ra.race_date
+                FROM tracked_tips t
+                JOIN races ra ON ra.id = t.race_id
+                WHERE t.result = 'pending'
+              )
+            ORDER BY race_date
+            """,
+            (cutoff,),
+        ).fetchall()
+    ]
+    if not days and not ARCHIVE_DB_PATH.exists():
+        conn.close()
+        return {"cutoff": cutoff, "archived_days": [], "moved": {}}
+
+    conn.execute("ATTACH DATABASE ? AS archive", (str(ARCHIVE_DB_PATH),))
+    conn.execute("PRAGMA archive.journal_mode=WAL;")
+    ensure_archive_schema(conn)
+    migrate_compact_storage(conn, "archive")
+    backfill_dimension_keys(conn, "archive")
+    conn.commit()
+
+    moved: dict[str, int] = {}
+    if days:
+        conn.execute("CREATE TEMP TABLE archive_race_ids (race_id INTEGER PRIMARY KEY)")
+        ph = ",".join("?" for _ in days)
+        conn.execute(f"INSERT INTO temp.archive_race_ids SELECT id FROM main.races WHERE race_date IN ({ph})", days)
+        # Derived and hot-only: archived boards are read straight from odds.
+        conn.execute("DELETE FROM main.runner_best_prices WHERE race_id IN (SELECT race_id FROM temp.archive_race_ids)")
+        # Alerts for archived runners can't be delivered against a live board.
+        conn.execute("DELETE FROM main.alert_events WHERE race_id IN (SELECT race_id FROM temp.archive_race_ids)")
+        # WAL keeps each file atomic but not the pair, so the copy is an idempotent
+        # upsert: a crash between the two commits is repaired by the next run.
+        for table in ARCHIVE_TABLES:
+            cols = ", ".join(table_columns(conn, "main", table))
+            cur = conn.execute(
+                f"INSERT OR REPLACE INTO archive.{table} ({cols}) "
+                f"SELECT {cols} FROM main.{table} WHERE {ARCHIVE_ROW_FILTERS[table]}"
+            )
+            moved[table] = cur.rowcount
+        for table in reversed(ARCHIVE_TABLES):
+            conn.execute(f"DELETE FROM main.{table} WHERE {ARCHIVE_ROW_FILTERS[table]}")
+        conn.commit()
+    conn.close()
+    return {"cutoff": cutoff, "archived_days": days, "moved": moved}
+
+
+def tracked_tips_tables(conn: sqlite3.Connection) -> list[str]:
+    schemas = {r[1] for r in conn.execute("PRAGMA database_list").fetchall()}
+    return ["main.tracked_tips"] + (["archive.tracked_tips"] if "archive" in schemas else [])
 
 
 @app.on_event("startup")
@@ -961,36 +1581,154 @@ def startup() -> None:
     seed_dummy_data()
     backfill_dummy_profiles()
     rebalance_dummy_odds()
+    archive_race_days()
+    rebuild_search_index(only_if_empty=True)
+    build_static_assets()
+    start_jump_scheduler()
+
+
+# ---------------------------------------------------------------------------
+# Static assets
+# ---------------------------------------------------------------------------
+
+# CSS/JS are content-hashed at startup and served from /assets/<name>.<hash>.<ext>
+# with immutable caching; pages are rewritten to point at them and revalidate
+# by ETag. Both carry precompressed gzip (and brotli when installed) variants.
+# /static keeps serving the raw files for anything still linking there.
+FINGERPRINT_SUFFIXES = {".css", ".js"}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PAGE_CACHE_CONTROL = "no-cache"
+STATIC_REF_RE = re.compile(r"/static/([\w.-]+?)(?:\?v=[\w.-]*)?(?=[\"'])")
+STATIC_MANIFEST: dict[str, str] = {}
+STATIC_ASSETS: dict[str, dict] = {}
+STATIC_PAGES: dict[str, dict] = {}
+
+
+def build_asset(body: bytes, media_type: str) -> dict:
+    return {
+        "body": body,
+        "media_type": media_type,
+        "etag": f'"{hashlib.sha256(body).hexdigest()[:16]}"',
+        "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+        "br": brotli.compress(body, quality=11) if brotli else None,
+    }
+
+
+def build_static_assets() -> dict:
+    manifest: dict[str, str] = {}
+    assets: dict[str, dict] = {}
+    for path in sorted(STATIC_DIR.iterdir()):
+        if path.suffix not in FINGERPRINT_SUFFIXES:
+            continue
+        body = path.read_bytes()
+        name = f"{path.stem}.{hashlib.sha256(body).hexdigest()[:12]}{path.suffix}"
+        manifest[path.name] = name
+        assets[name] = build_asset(body, mimetypes.guess_type(path.name)[0] or "application/octet-stream")
+
+    def fingerprint(match: re.Match) -> str:
+        name = manifest.get(match.group(1))
+        return f"/assets/{name}" if name else match.group(0)
+
+    pages = {
+        path.name: build_asset(
+            STATIC_REF_RE.sub(fingerprint, path.read_text(encoding="utf-8")).encode("utf-8"),
+            "text/html; charset=utf-8",
+        )
+        for path in sorted(STATIC_DIR.glob("*.html"))
+    }
+    STATIC_MANIFEST.clear()
+    STATIC_MANIFEST.update(manifest)
+    STATIC_ASSETS.clear()
+    STATIC_ASSETS.update(assets)
+    STATIC_PAGES.clear()
+    STATIC_PAGES.update(pages)
+    return dict(manifest)
+
+
+def accepted_encodings(request: Request) -> dict[str, float]:
+    """Content codings the client accepts, with their q-values; `q=0` ones
+    are refused and left out."""
+    accepted: dict[str, float] = {}
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, *params = (p.strip() for p in part.split(";"))
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    if "*" in accepted:
+        for coding in ("br", "gzip"):
+            accepted.setdefault(coding, accepted["*"])
+    return {coding: q for coding, q in accepted.items() if q > 0}
+
+
+def asset_response(request: Request, asset: dict, cache_control: str) -> Response:
+    body, etag, encoding = asset["body"], asset["etag"], None
+    encodings = accepted_encodings(request)
+    # Highest q wins, brotli first on a tie. Each coding is its own
+    # representation, so it gets its own ETag.
+    for coding in sorted(("br", "gzip"), key=lambda c: -encodings.get(c, 0.0)):
+        variant = asset[coding]
+        if coding in encodings and variant is not None and len(variant) < len(asset["body"]):
+            body, encoding, etag = variant, coding, f'{asset["etag"][:-1]}-{coding}"'
+            break
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if_none_match = {tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")}
+    if etag in if_none_match or "*" in if_none_match:
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=asset["media_type"], headers=headers)
+
+
+def page_response(request: Request, filename: str) -> Response:
+    if filename not in STATIC_PAGES:
+        build_static_assets()
+    return asset_response(request, STATIC_PAGES[filename], PAGE_CACHE_CONTROL)
+
+
+@app.get("/assets/{name}")
+def static_asset(name: str, request: Request) -> Response:
+    asset = STATIC_ASSETS.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Asset not found.")
+    return asset_response(request, asset, IMMUTABLE_CACHE_CONTROL)
 
 
 @app.get("/")
-def index() -> FileResponse:
-    return FileResponse(STATIC_DIR / "index.html")
+def index(request: Request) -> Response:
+    return page_response(request, "index.html")
 
 
 @app.get("/dashboard")
-def dashboard_page() -> FileResponse:
-    return FileResponse(STATIC_DIR / "dashboard.html")
+def dashboard_page(request: Request) -> Response:
+    return page_response(request, "dashboard.html")
 
 
 @app.get("/tips")
-def tips_page() -> FileResponse:
-    return FileResponse(STATIC_DIR / "tips.html")
+def tips_page(request: Request) -> Response:
+    return page_response(request, "tips.html")
 
 
 @app.get("/settings")
-def settings_page() -> FileResponse:
-    return FileResponse(STATIC_DIR / "settings.html")
+def settings_page(request: Request) -> Response:
+    return page_response(request, "settings.html")
 
 
 @app.get("/my-bets")
-def my_bets_page() -> FileResponse:
-    return FileResponse(STATIC_DIR / "my-bets.html")
+def my_bets_page(request: Request) -> Response:
+    return page_response(request, "my-bets.html")
 
 
 @app.get("/stats")
-def stats_page() -> FileResponse:
-    return FileResponse(STATIC_DIR / "stats.html")
+def stats_page(request: Request) -> Response:
+    return page_response(request, "stats.html")
 
 
 @app.get("/api/bookmakers")
@@ -1009,13 +1747,21 @@ def get_races(
     track: Optional[str] = Query(default=None),
 ):
     day = race_date or datetime.now().date().isoformat()
-    conn = get_conn()
+    cold = day < archive_cutoff()
+    conn = get_conn(with_archive=cold)
+    races = list_races(conn, day, track, cold)
+    conn.close()
+    return {"date": day, "races": races}
+
+
+def list_races(conn: sqlite3.Connection, day: str, track: Optional[str] = None, cold: bool = False) -> list[dict]:
+    races_table = "races_all" if cold else "races"
     if track:
         rows = conn.execute(
-            """
+            f"""
             SELECT id, race_date, track, race_number, distance_m, jump_time,
                    race_name, starters, prize_pool, track_rating
-            FROM races
+            FROM {races_table}
             WHERE race_date = ? AND track = ?
             ORDER BY race_number
             """,
@@ -1023,77 +1769,290 @@ def get_races(
         ).fetchall()
     else:
         rows = conn.execute(
-            """
+            f"""
             SELECT id, race_date, track, race_number, distance_m, jump_time,
                    race_name, starters, prize_pool, track_rating
-            FROM races
+            FROM {races_table}
             WHERE race_date = ?
             ORDER BY track, race_number
             """,
             (day,),
         ).fetchall()
-    conn.close()
-    return {"date": day, "races": [dict(r) for r in rows]}
+    return [dict(r) for r in rows]
 
 
 @app.get("/api/tracks")
 def get_tracks(race_date: Optional[str] = Query(default=None)):
     day = race_date or datetime.now().date().isoformat()
-    conn = get_conn()
+    cold = day < archive_cutoff()
+    conn = get_conn(with_archive=cold)
     rows = conn.execute(
-        "SELECT DISTINCT track FROM races WHERE race_date = ? ORDER BY track",
+        f"SELECT DISTINCT track FROM {'races_all' if cold else 'races'} WHERE race_date = ? ORDER BY track",
         (day,),
     ).fetchall()
     conn.close()
     return {"date": day, "tracks": [r["track"] for r in rows]}
 
 
+# Upper bound on races per /api/races/boards call (a full day is ~40).
+MAX_BATCH_RACES = 200
+# Row fields selectable with `fields=`; form_last5 and the ROI columns cost a
+# query each and are skipped entirely when not requested.
+BOARD_FIELDS = (
+    "runner_id", "horse_number", "horse_name", "barrier", "trainer", "jockey", "predicted_price",
+    "market_odds", "best_bookmaker", "best_book_symbol", "bet_url", "model_prob_pct", "bookmaker_pct",
+    "edge_pct", "form_last5", "jockey_roi_pct", "trainer_roi_pct", "finish_pos", "qualifies",
+    "place_prob_pct", "fair_place_price",
+)
+TIP_FIELDS = (
+    "race_id", "race_date", "track", "race_number", "jump_time", "runner_id", "horse_number", "horse_name",
+    "barrier", "trainer", "jockey", "predicted_price", "market_odds", "best_bookmaker", "best_book_symbol",
+    "bet_url", "model_prob_pct", "bookmaker_pct", "edge_pct", "form_last5", "jockey_roi_pct", "trainer_roi_pct",
+)
+
+# Board rows for the default all-books selection: one indexed read of the
+# write-time best prices instead of scanning every book's odds per runner.
+BEST_PRICE_RUNNERS_SQL = """
+    SELECT
+        r.id AS runner_id,
+        r.race_id,
+        r.horse_number,
+        r.horse_name,
+        r.barrier,
+        r.trainer,
+        r.jockey,
+        r.model_prob,
+        r.predicted_price,
+        b.best_bookmaker AS bookmaker,
+        b.best_odds AS current_odds,
+        b.best_bet_url AS bet_url
+    FROM runner_best_prices b
+    JOIN runners r ON r.id = b.runner_id
+    WHERE b.race_id IN ({race_ph})
+"""
+
+
 @app.get("/api/races/{race_id}/board")
 def get_race_board(
     race_id: int,
     min_edge: float = Query(default=0.0),
     books: Optional[str] = Query(default=None),
+    exotics: bool = False,
+    fields: Optional[str] = None,
+    response: Response = None,
 ):
+    selected_books = parse_selected_books(books)
+    selected_fields = parse_fields(fields, BOARD_FIELDS, ("runner_id",))
+    key = (race_id, tuple(selected_books), min_edge, exotics, frozenset(selected_fields) if selected_fields else None)
+    cached = cached_board(key)
+    if cached is not None:
+        set_max_age(response, board_refresh_after_s(cached))
+        return cached
+    conn = get_conn()
+    try:
+        # The versions are read in the same snapshot as the board they stamp.
+        conn.execute("BEGIN")
+        versions = data_versions(conn)
+        board = race_board(conn, race_id, selected_books, min_edge, exotics, selected_fields)
+        conn.commit()
+    finally:
+        conn.close()
+    store_board(key, versions, board)
+    set_max_age(response, board_refresh_after_s(board))
+    return board
+
+
+def board_refresh_after_s(board: dict) -> int:
+    race = board["race"]
+    return refresh_after_s(race["race_date"], race["jump_time"], bool(board["results"]))
+
+
+def parse_fields(fields: Optional[str], allowed: tuple[str, ...], always: tuple[str, ...]) -> Optional[set[str]]:
+    """`fields=a,b,c` -> the requested row fields plus the identifying ones,
+    or None (every field) when the parameter is absent."""
+    if not fields:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}.")
+    return requested | set(always)
+
+
+def select_fields(rows: list[dict], fields: Optional[set[str]]) -> list[dict]:
+    if fields is None:
+        return rows
+    return [{k: v for k, v in row.items() if k in fields} for row in rows]
+
+
+def parse_selected_books(books: Optional[str]) -> list[str]:
     selected_books = BOOKMAKERS if not books else [b.strip() for b in books.split(",") if b.strip()]
     if not selected_books:
         raise HTTPException(status_code=400, detail="At least one bookmaker must be selected.")
+    return selected_books
 
-    conn = get_conn()
-    race = conn.execute("SELECT * FROM races WHERE id = ?", (race_id,)).fetchone()
-    if not race:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Race not found.")
-
-    placeholders = ",".join("?" for _ in selected_books)
-    query = f"""
-        SELECT
-            r.id AS runner_id,
-            r.horse_number,
-            r.horse_name,
-            r.barrier,
-            r.trainer,
-            r.jockey,
-            r.model_prob,
-            r.predicted_price,
-            o.bookmaker,
-            o.current_odds,
-            o.bet_url
-        FROM runners r
-        JOIN odds o ON o.runner_id = r.id
-        WHERE r.race_id = ?
-          AND o.bookmaker IN ({placeholders})
-    """
-    rows = conn.execute(query, [race_id, *selected_books]).fetchall()
 
-    by_runner = {}
-    raw_model_prob = {}
-    for row in rows:
-        rid = row["runner_id"]
-        raw_model_prob[rid] = float(row["model_prob"] or 0.0)
-        candidate = by_runner.get(rid)
-        if candidate is None or row["current_odds"] > candidate["market_odds"]:
-            market_odds = round(row["current_odds"], 2)
-            by_runner[rid] = {
+def race_board(
+    conn: sqlite3.Connection,
+    race_id: int,
+    selected_books: list[str],
+    min_edge: float = 0.0,
+    exotics: bool = False,
+    fields: Optional[set[str]] = None,
+) -> dict:
+    race = conn.execute("SELECT 1 FROM races WHERE id = ?", (race_id,)).fetchone()
+    # Races on archived days are read through the hot+archive views.
+    src = ""
+    if not race and attach_archive(conn):
+        src = "_all"
+    boards, race_probs = race_boards(conn, [race_id], selected_books, min_edge, src, fields)
+    if race_id not in boards:
+        raise HTTPException(status_code=404, detail="Race not found.")
+    payload = boards[race_id]
+    if exotics:
+        # Opt-in so the standard board response pays nothing for it.
+        board = payload["rows"]
+        exotic_prices = compute_exotics(
+            race_id,
+            [
+                {"runner_id": item["runner_id"], "horse_number": item["horse_number"], "win_prob": race_probs.get(item["runner_id"], 0.0)}
+                for item in sorted(board, key=lambda x: x["horse_number"])
+            ],
+        )
+        place_by_runner = {p["runner_id"]: p for p in exotic_prices["place"]}
+        for item in board:
+            place = place_by_runner.get(item["runner_id"], {})
+            item["place_prob_pct"] = place.get("place_prob_pct")
+            item["fair_place_price"] = place.get("fair_place_price")
+        payload["exotics"] = exotic_prices
+    payload["rows"] = select_fields(payload["rows"], fields)
+    return payload
+
+
+def people_roi(conn: sqlite3.Connection, role: str, names: set[str]) -> dict[str, float]:
+    """Flat-stake ROI % per jockey or trainer across their history."""
+    if not names:
+        return {}
+    ph = ",".join("?" for _ in names)
+    rows = conn.execute(
+        f"""
+        SELECT {role} AS name, COUNT(*) AS runs, SUM(CASE WHEN finish_pos = 1 THEN starting_price ELSE 0 END) AS returns
+        FROM {role}_history
+        WHERE {role} IN ({ph})
+        GROUP BY {role}
+        """,
+        list(names),
+    ).fetchall()
+    return {r["name"]: round(((r["returns"] - r["runs"]) / max(r["runs"], 1)) * 100.0, 1) for r in rows}
+
+
+def runner_form_and_roi(
+    conn: sqlite3.Connection,
+    runners: list[dict],
+    fields: Optional[set[str]] = None,
+    src: str = "",
+) -> dict[int, dict]:
+    """Form string (last 5 finishes) and jockey/trainer ROI for `runners`,
+    from one query each. Returns {runner_id: extra fields}; with `fields`,
+    only the requested ones are computed."""
+    want_form, want_jockey_roi, want_trainer_roi = (
+        fields is None or name in fields for name in ("form_last5", "jockey_roi_pct", "trainer_roi_pct")
+    )
+    form_map: dict[int, list[int]] = {}
+    if runners and want_form:
+        runner_ph = ",".join("?" for _ in runners)
+        form_rows = conn.execute(
+            f"""
+            SELECT runner_id, finish_pos
+            FROM runner_history{src}
+            WHERE runner_id IN ({runner_ph})
+            ORDER BY runner_id DESC, run_day DESC
+            """,
+            [item["runner_id"] for item in runners],
+        ).fetchall()
+        for fr in form_rows:
+            positions = form_map.setdefault(fr["runner_id"], [])
+            if len(positions) < 5:
+                positions.append(fr["finish_pos"])
+    jockey_roi = people_roi(conn, "jockey", {item["jockey"] for item in runners}) if want_jockey_roi else {}
+    trainer_roi = people_roi(conn, "trainer", {item["trainer"] for item in runners}) if want_trainer_roi else {}
+
+    extras: dict[int, dict] = {}
+    for item in runners:
+        extra = extras[item["runner_id"]] = {}
+        if want_form:
+            positions = form_map.get(item["runner_id"], [])
+            extra["form_last5"] = "".join(str(p) if p < 10 else "x" for p in reversed(positions))
+        if want_jockey_roi:
+            extra["jockey_roi_pct"] = jockey_roi.get(item["jockey"], 0.0)
+        if want_trainer_roi:
+            extra["trainer_roi_pct"] = trainer_roi.get(item["trainer"], 0.0)
+    return extras
+
+
+def race_boards(
+    conn: sqlite3.Connection,
+    race_ids: list[int],
+    selected_books: list[str],
+    min_edge: float = 0.0,
+    src: str = "",
+    fields: Optional[set[str]] = None,
+) -> tuple[dict[int, dict], dict[int, float]]:
+    """Boards for many races from one query per table: runners+prices, form,
+    jockey/trainer ROI and results are each fetched once for the whole set.
+    Returns ({race_id: board}, {runner_id: normalized model prob}); races
+    that don't exist are absent. With `fields`, form and ROI are only
+    computed when requested (rows are not projected here)."""
+    if not race_ids:
+        return {}, {}
+    race_ph = ",".join("?" for _ in race_ids)
+    races = {
+        r["id"]: dict(r)
+        for r in conn.execute(f"SELECT * FROM races{src} WHERE id IN ({race_ph})", race_ids).fetchall()
+    }
+    if not races:
+        return {}, {}
+    found = list(races)
+    race_ph = ",".join("?" for _ in found)
+
+    if not src and set(selected_books) == set(BOOKMAKERS):
+        rows = conn.execute(
+            BEST_PRICE_RUNNERS_SQL.format(race_ph=race_ph),
+            found,
+        ).fetchall()
+    else:
+        placeholders = ",".join("?" for _ in selected_books)
+        query = f"""
+            SELECT
+                r.id AS runner_id,
+                r.race_id,
+                r.horse_number,
+                r.horse_name,
+                r.barrier,
+                r.trainer,
+                r.jockey,
+                r.model_prob,
+                r.predicted_price,
+                o.bookmaker,
+                o.current_odds,
+                o.bet_url
+            FROM runners{src} r
+            JOIN odds{src} o ON o.runner_id = r.id
+            WHERE r.race_id IN ({race_ph})
+              AND o.bookmaker IN ({placeholders})
+        """
+        rows = conn.execute(query, [*found, *selected_books]).fetchall()
+
+    by_race: dict[int, dict[int, dict]] = {race_id: {} for race_id in found}
+    raw_model_prob: dict[int, float] = {}
+    for row in rows:
+        rid = row["runner_id"]
+        raw_model_prob[rid] = float(row["model_prob"] or 0.0)
+        by_runner = by_race[row["race_id"]]
+        candidate = by_runner.get(rid)
+        if candidate is None or row["current_odds"] > candidate["market_odds"]:
+            market_odds = round(row["current_odds"], 2)
+            by_runner[rid] = {
                 "runner_id": rid,
                 "horse_number": row["horse_number"],
                 "horse_name": row["horse_name"],
@@ -1107,96 +2066,101 @@ def get_race_board(
                 "bet_url": row["bet_url"],
             }
 
-    model_total = sum(raw_model_prob.values()) or 1.0
-    race_probs = {rid: (raw_model_prob.get(rid, 0.0) / model_total) for rid in by_runner.keys()}
-    for rid, item in by_runner.items():
-        model_prob = race_probs.get(rid, 0.0)
-        item["model_prob_pct"] = round(model_prob * 100.0, 2)
-        item["bookmaker_pct"] = round((1.0 / max(item["market_odds"], 1.01)) * 100.0, 2)
-        item["edge_pct"] = round(calc_edge_pct(model_prob, item["market_odds"]), 2)
-
-    # Compute form string (last 5 finishes) for each runner
-    runner_ids_list = list(by_runner.keys())
-    if runner_ids_list:
-        ph = ",".join("?" for _ in runner_ids_list)
-        form_rows = conn.execute(
-            f"""
-            SELECT runner_id, finish_pos
-            FROM runner_history
-            WHERE runner_id IN ({ph})
-            ORDER BY runner_id, run_date DESC
-            """,
-            runner_ids_list,
-        ).fetchall()
-        form_map: dict[int, list[int]] = {}
-        for fr in form_rows:
-            rid = fr["runner_id"]
-            form_map.setdefault(rid, [])
-            if len(form_map[rid]) < 5:
-                form_map[rid].append(fr["finish_pos"])
-
-        jockey_names = list({item["jockey"] for item in by_runner.values()})
-        trainer_names = list({item["trainer"] for item in by_runner.values()})
-
-        jockey_roi: dict[str, float] = {}
-        if jockey_names:
-            jph = ",".join("?" for _ in jockey_names)
-            jrows = conn.execute(
-                f"SELECT jockey, COUNT(*) AS runs, SUM(CASE WHEN finish_pos = 1 THEN starting_price ELSE 0 END) AS returns FROM jockey_history WHERE jockey IN ({jph}) GROUP BY jockey",
-                jockey_names,
-            ).fetchall()
-            for jr in jrows:
-                jockey_roi[jr["jockey"]] = round(((jr["returns"] - jr["runs"]) / max(jr["runs"], 1)) * 100.0, 1)
-
-        trainer_roi: dict[str, float] = {}
-        if trainer_names:
-            tph = ",".join("?" for _ in trainer_names)
-            trows = conn.execute(
-                f"SELECT trainer, COUNT(*) AS runs, SUM(CASE WHEN finish_pos = 1 THEN starting_price ELSE 0 END) AS returns FROM trainer_history WHERE trainer IN ({tph}) GROUP BY trainer",
-                trainer_names,
-            ).fetchall()
-            for tr_row in trows:
-                trainer_roi[tr_row["trainer"]] = round(((tr_row["returns"] - tr_row["runs"]) / max(tr_row["runs"], 1)) * 100.0, 1)
-    else:
-        form_map = {}
-        jockey_roi = {}
-        trainer_roi = {}
-
-    # Fetch race results if they exist
-    result_rows = conn.execute(
-        """
-        SELECT rr.runner_id, rr.finish_pos, r.horse_name
-        FROM race_results rr
-        JOIN runners r ON r.id = rr.runner_id
-        WHERE rr.race_id = ?
-        ORDER BY rr.finish_pos
+    race_probs: dict[int, float] = {}
+    for by_runner in by_race.values():
+        model_total = sum(raw_model_prob[rid] for rid in by_runner) or 1.0
+        for rid, item in by_runner.items():
+            model_prob = raw_model_prob.get(rid, 0.0) / model_total
+            race_probs[rid] = model_prob
+            item["model_prob_pct"] = round(model_prob * 100.0, 2)
+            item["bookmaker_pct"] = round((1.0 / max(item["market_odds"], 1.01)) * 100.0, 2)
+            item["edge_pct"] = round(calc_edge_pct(model_prob, item["market_odds"]), 2)
+
+    # Form and jockey/trainer ROI for every runner at once.
+    all_runners = [item for by_runner in by_race.values() for item in by_runner.values()]
+    extras = runner_form_and_roi(conn, all_runners, fields, src)
+
+    results_by_race: dict[int, list[dict]] = {race_id: [] for race_id in found}
+    for rr in conn.execute(
+        f"""
+        SELECT rr.race_id, rr.runner_id, rr.finish_pos, r.horse_name
+        FROM race_results{src} rr
+        JOIN runners{src} r ON r.id = rr.runner_id
+        WHERE rr.race_id IN ({race_ph})
+        ORDER BY rr.race_id, rr.finish_pos
         """,
-        (race_id,),
-    ).fetchall()
-    results = [dict(rr) for rr in result_rows]
-
-    conn.close()
-
-    for rid, item in by_runner.items():
-        positions = form_map.get(rid, [])
-        item["form_last5"] = "".join(str(p) if p < 10 else "x" for p in reversed(positions))
-        item["jockey_roi_pct"] = jockey_roi.get(item["jockey"], 0.0)
-        item["trainer_roi_pct"] = trainer_roi.get(item["trainer"], 0.0)
-        # Attach finish position if results exist
+        found,
+    ).fetchall():
+        results_by_race[rr["race_id"]].append({"runner_id": rr["runner_id"], "finish_pos": rr["finish_pos"], "horse_name": rr["horse_name"]})
+
+    boards: dict[int, dict] = {}
+    for race_id in race_ids:
+        if race_id not in races or race_id in boards:
+            continue
+        by_runner = by_race[race_id]
+        results = results_by_race[race_id]
+        finish_by_runner: dict[int, int] = {}
         for rr in results:
-            if rr["runner_id"] == rid:
-                item["finish_pos"] = rr["finish_pos"]
-                break
+            finish_by_runner.setdefault(rr["runner_id"], rr["finish_pos"])
+        for rid, item in by_runner.items():
+            item.update(extras[rid])
+            # Attach finish position if results exist
+            if rid in finish_by_runner:
+                item["finish_pos"] = finish_by_runner[rid]
+
+        board = list(by_runner.values())
+        for item in board:
+            item["qualifies"] = item["edge_pct"] >= min_edge
+        board.sort(key=lambda x: x["edge_pct"], reverse=True)
+        totals = {
+            "model_pct_total": round(sum(x["model_prob_pct"] for x in board), 2),
+            "bookmaker_pct_total": round(sum(x["bookmaker_pct"] for x in board), 2),
+        }
+        boards[race_id] = {
+            "race": races[race_id],
+            "min_edge": min_edge,
+            "selected_books": selected_books,
+            "rows": board,
+            "totals": totals,
+            "results": results,
+        }
+    return boards, race_probs
 
-    board = list(by_runner.values())
-    for item in board:
-        item["qualifies"] = item["edge_pct"] >= min_edge
-    board.sort(key=lambda x: x["edge_pct"], reverse=True)
-    totals = {
-        "model_pct_total": round(sum(x["model_prob_pct"] for x in board), 2),
-        "bookmaker_pct_total": round(sum(x["bookmaker_pct"] for x in board), 2),
-    }
-    return {"race": dict(race), "min_edge": min_edge, "selected_books": selected_books, "rows": board, "totals": totals, "results": results}
+
+@app.get("/api/races/boards")
+def get_race_boards(
+    race_ids: Optional[str] = Query(default=None),
+    race_date: Optional[str] = Query(default=None),
+    track: Optional[str] = Query(default=None),
+    min_edge: float = Query(default=0.0),
+    books: Optional[str] = Query(default=None),
+    fields: Optional[str] = None,
+):
+    selected_books = parse_selected_books(books)
+    selected_fields = parse_fields(fields, BOARD_FIELDS, ("runner_id",))
+    conn = get_conn()
+    try:
+        if race_ids:
+            try:
+                ids = [int(x) for x in race_ids.split(",") if x.strip()]
+            except ValueError:
+                raise HTTPException(status_code=400, detail="race_ids must be a comma-separated list of integers.")
+        elif race_date:
+            ids = [r["id"] for r in list_races(conn, race_date, track)]
+        else:
+            raise HTTPException(status_code=400, detail="Provide race_ids or race_date.")
+        if len(ids) > MAX_BATCH_RACES:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_RACES} races per request.")
+        boards, _ = race_boards(conn, ids, selected_books, min_edge, fields=selected_fields)
+        for board in boards.values():
+            board["rows"] = select_fields(board["rows"], selected_fields)
+        missing = [race_id for race_id in ids if race_id not in boards]
+        # Archived races fall back to the per-race path, which reads through the archive.
+        for race_id in missing:
+            boards[race_id] = race_board(conn, race_id, selected_books, min_edge, fields=selected_fields)
+    finally:
+        conn.close()
+    return {"boards": [boards[race_id] for race_id in dict.fromkeys(ids)]}
 
 
 @app.get("/api/race-signals")
@@ -1206,11 +2170,24 @@ def get_race_signals(
     rec_edge: float = Query(default=1.0),
 ):
     day = race_date or datetime.now().date().isoformat()
-    selected_books = BOOKMAKERS if not books else [b.strip() for b in books.split(",") if b.strip()]
-    if not selected_books:
-        raise HTTPException(status_code=400, detail="At least one bookmaker must be selected.")
-
+    selected_books = parse_selected_books(books)
+    key = (day, tuple(selected_books), rec_edge)
+    cached = cached_signals(key)
+    if cached is not None:
+        return cached
     conn = get_conn()
+    try:
+        conn.execute("BEGIN")
+        versions = data_versions(conn)
+        signals = race_signals(conn, day, selected_books, rec_edge)
+        conn.commit()
+    finally:
+        conn.close()
+    store_signals(key, versions, signals)
+    return signals
+
+
+def race_signals(conn: sqlite3.Connection, day: str, selected_books: list[str], rec_edge: float) -> dict:
     races = conn.execute(
         """
         SELECT id
@@ -1220,11 +2197,11 @@ def get_race_signals(
         """,
         (day,),
     ).fetchall()
-    conn.close()
 
+    boards, _ = race_boards(conn, [race["id"] for race in races], selected_books, fields={"edge_pct"})
     signals = {}
     for race in races:
-        board = get_race_board(race_id=race["id"], min_edge=0.0, books=",".join(selected_books))
+        board = boards[race["id"]]
         qualifying = [r for r in board["rows"] if r["edge_pct"] >= rec_edge]
         signals[str(race["id"])] = {
             "has_tip": len(qualifying) > 0,
@@ -1240,13 +2217,25 @@ def get_daily_tips(
     race_date: Optional[str] = Query(default=None),
     min_edge: float = Query(default=0.0),
     books: Optional[str] = Query(default=None),
+    fields: Optional[str] = None,
 ):
     day = race_date or datetime.now().date().isoformat()
-    selected_books = BOOKMAKERS if not books else [b.strip() for b in books.split(",") if b.strip()]
-    if not selected_books:
-        raise HTTPException(status_code=400, detail="At least one bookmaker must be selected.")
-
+    selected_books = parse_selected_books(books)
+    selected_fields = parse_fields(fields, TIP_FIELDS, ("race_id", "runner_id"))
     conn = get_conn()
+    try:
+        return daily_tips(conn, day, selected_books, min_edge, selected_fields)
+    finally:
+        conn.close()
+
+
+def daily_tips(
+    conn: sqlite3.Connection,
+    day: str,
+    selected_books: list[str],
+    min_edge: float,
+    fields: Optional[set[str]] = None,
+) -> dict:
     races = conn.execute(
         """
         SELECT id, race_date, track, race_number, distance_m, jump_time,
@@ -1258,27 +2247,31 @@ def get_daily_tips(
         (day,),
     ).fetchall()
 
+    all_books = set(selected_books) == set(BOOKMAKERS)
     all_tips = []
     for race in races:
-        placeholders = ",".join("?" for _ in selected_books)
-        query = f"""
-            SELECT
-                r.id AS runner_id,
-                r.horse_number,
-                r.horse_name,
-                r.barrier,
-                r.trainer,
-                r.jockey,
-                r.predicted_price,
-                o.bookmaker,
-                o.current_odds,
-                o.bet_url
-            FROM runners r
-            JOIN odds o ON o.runner_id = r.id
-            WHERE r.race_id = ?
-              AND o.bookmaker IN ({placeholders})
-        """
-        rows = conn.execute(query, [race["id"], *selected_books]).fetchall()
+        if all_books:
+            rows = conn.execute(BEST_PRICE_RUNNERS_SQL.format(race_ph="?"), (race["id"],)).fetchall()
+        else:
+            placeholders = ",".join("?" for _ in selected_books)
+            query = f"""
+                SELECT
+                    r.id AS runner_id,
+                    r.horse_number,
+                    r.horse_name,
+                    r.barrier,
+                    r.trainer,
+                    r.jockey,
+                    r.predicted_price,
+                    o.bookmaker,
+                    o.current_odds,
+                    o.bet_url
+                FROM runners r
+                JOIN odds o ON o.runner_id = r.id
+                WHERE r.race_id = ?
+                  AND o.bookmaker IN ({placeholders})
+            """
+            rows = conn.execute(query, [race["id"], *selected_books]).fetchall()
         by_runner = {}
         for row in rows:
             rid = row["runner_id"]
@@ -1298,33 +2291,7 @@ def get_daily_tips(
                     "bet_url": row["bet_url"],
                 }
 
-        # Form strings for runners in this race
-        race_runner_ids = list(by_runner.keys())
-        race_form_map: dict[int, list[int]] = {}
-        if race_runner_ids:
-            fph = ",".join("?" for _ in race_runner_ids)
-            frows = conn.execute(
-                f"SELECT runner_id, finish_pos FROM runner_history WHERE runner_id IN ({fph}) ORDER BY runner_id, run_date DESC",
-                race_runner_ids,
-            ).fetchall()
-            for fr in frows:
-                rid2 = fr["runner_id"]
-                race_form_map.setdefault(rid2, [])
-                if len(race_form_map[rid2]) < 5:
-                    race_form_map[rid2].append(fr["finish_pos"])
-
-        race_jockeys = list({item["jockey"] for item in by_runner.values()})
-        race_trainers = list({item["trainer"] for item in by_runner.values()})
-        jroi: dict[str, float] = {}
-        if race_jockeys:
-            jph2 = ",".join("?" for _ in race_jockeys)
-            for jr in conn.execute(f"SELECT jockey, COUNT(*) AS runs, SUM(CASE WHEN finish_pos = 1 THEN starting_price ELSE 0 END) AS returns FROM jockey_history WHERE jockey IN ({jph2}) GROUP BY jockey", race_jockeys).fetchall():
-                jroi[jr["jockey"]] = round(((jr["returns"] - jr["runs"]) / max(jr["runs"], 1)) * 100.0, 1)
-        troi: dict[str, float] = {}
-        if race_trainers:
-            tph2 = ",".join("?" for _ in race_trainers)
-            for tr2 in conn.execute(f"SELECT trainer, COUNT(*) AS runs, SUM(CASE WHEN finish_pos = 1 THEN starting_price ELSE 0 END) AS returns FROM trainer_history WHERE trainer IN ({tph2}) GROUP BY trainer", race_trainers).fetchall():
-                troi[tr2["trainer"]] = round(((tr2["returns"] - tr2["runs"]) / max(tr2["runs"], 1)) * 100.0, 1)
+        extras = runner_form_and_roi(conn, list(by_runner.values()), fields)
 
         probs = normalized_probs_from_prices(
             {rid: item["predicted_price"] for rid, item in by_runner.items()}
@@ -1332,33 +2299,27 @@ def get_daily_tips(
         for rid, item in by_runner.items():
             model_prob = probs.get(rid, 0.0)
             edge = round(calc_edge_pct(model_prob, item["market_odds"]), 2)
-            positions = race_form_map.get(rid, [])
-            form_str = "".join(str(p) if p < 10 else "x" for p in reversed(positions))
             if edge >= min_edge:
-                all_tips.append(
-                    {
-                        "race_id": race["id"],
-                        "race_date": race["race_date"],
-                        "track": race["track"],
-                        "race_number": race["race_number"],
-                        "jump_time": race["jump_time"],
-                        **item,
-                        "model_prob_pct": round(model_prob * 100.0, 2),
-                        "bookmaker_pct": round((1.0 / max(item["market_odds"], 1.01)) * 100.0, 2),
-                        "edge_pct": edge,
-                        "form_last5": form_str,
-                        "jockey_roi_pct": jroi.get(item["jockey"], 0.0),
-                        "trainer_roi_pct": troi.get(item["trainer"], 0.0),
-                    }
-                )
+                tip = {
+                    "race_id": race["id"],
+                    "race_date": race["race_date"],
+                    "track": race["track"],
+                    "race_number": race["race_number"],
+                    "jump_time": race["jump_time"],
+                    **item,
+                    "model_prob_pct": round(model_prob * 100.0, 2),
+                    "bookmaker_pct": round((1.0 / max(item["market_odds"], 1.01)) * 100.0, 2),
+                    "edge_pct": edge,
+                }
+                tip.update(extras[rid])
+                all_tips.append(tip)
 
-    conn.close()
     all_tips.sort(key=lambda x: x["edge_pct"], reverse=True)
     return {
         "date": day,
         "min_edge": min_edge,
         "selected_books": selected_books,
-        "tips": all_tips,
+        "tips": select_fields(all_tips, fields),
     }
 
 
@@ -1385,6 +2346,8 @@ def simulate_odds_move(race_id: int):
                     (new_odds, datetime.utcnow().isoformat(), row["id"]),
                 )
 
+    refresh_best_prices(conn, [race_id])
+    evaluate_alerts(conn)
     conn.commit()
     conn.close()
     return {"status": "ok", "message": "Dummy odds updated."}
@@ -1394,7 +2357,7 @@ def simulate_odds_move(race_id: int):
 def simulate_race_result(race_id: int):
     conn = get_conn()
     meta = publish_dummy_race_result(conn, race_id)
-    settlement = settle_pending_tips(conn, user_id="demo")
+    settlement = settle_pending_tips(conn)
     conn.commit()
     conn.close()
     return {"status": "ok", "result": meta, "settlement": settlement}
@@ -1435,9 +2398,15 @@ def track_tip(payload: TrackTipRequest):
 
 @app.get("/api/tips/tracked")
 def tracked_tips():
-    conn = get_conn()
-    settlement = settle_pending_tips(conn, user_id="demo")
+    conn = get_conn(with_archive=True)
+    settlement = settle_pending_tips(conn)
     conn.commit()
+    tips = tracked_tip_rows(conn)
+    conn.close()
+    return {"tips": tips, "auto_settlement": settlement}
+
+
+def tracked_tip_rows(conn: sqlite3.Connection) -> list[dict]:
     rows = conn.execute(
         """
         SELECT
@@ -1455,16 +2424,15 @@ def tracked_tips():
           t.result,
           t.settled_at,
           t.tracked_at
-        FROM tracked_tips t
-        JOIN runners r ON r.id = t.runner_id
-        JOIN races ra ON ra.id = t.race_id
+        FROM tracked_tips_all t
+        JOIN runners_all r ON r.id = t.runner_id
+        JOIN races_all ra ON ra.id = t.race_id
         WHERE t.user_id = 'demo'
         ORDER BY t.tracked_at DESC
         LIMIT 200
         """
     ).fetchall()
-    conn.close()
-    return {"tips": [dict(r) for r in rows], "auto_settlement": settlement}
+    return [dict(r) for r in rows]
 
 
 @app.post("/api/tips/tracked/{bet_id}/update")
@@ -1473,15 +2441,16 @@ def update_tracked_tip(bet_id: int, payload: UpdateTrackedTipRequest):
         raise HTTPException(status_code=400, detail="Odds must be greater than 1.0")
     if payload.stake < 0:
         raise HTTPException(status_code=400, detail="Stake must be non-negative")
-    conn = get_conn()
-    conn.execute(
-        """
-        UPDATE tracked_tips
-        SET odds_at_tip = ?, stake = ?
-        WHERE id = ? AND user_id = 'demo'
-        """,
-        (payload.odds_at_tip, payload.stake, bet_id),
-    )
+    conn = get_conn(with_archive=True)
+    for table in tracked_tips_tables(conn):
+        conn.execute(
+            f"""
+            UPDATE {table}
+            SET odds_at_tip = ?, stake = ?
+            WHERE id = ? AND user_id = 'demo'
+            """,
+            (payload.odds_at_tip, payload.stake, bet_id),
+        )
     conn.commit()
     conn.close()
     return {"status": "ok"}
@@ -1489,14 +2458,15 @@ def update_tracked_tip(bet_id: int, payload: UpdateTrackedTipRequest):
 
 @app.delete("/api/tips/tracked/{bet_id}")
 def delete_tracked_tip(bet_id: int):
-    conn = get_conn()
-    conn.execute(
-        """
-        DELETE FROM tracked_tips
-        WHERE id = ? AND user_id = 'demo'
-        """,
-        (bet_id,),
-    )
+    conn = get_conn(with_archive=True)
+    for table in tracked_tips_tables(conn):
+        conn.execute(
+            f"""
+            DELETE FROM {table}
+            WHERE id = ? AND user_id = 'demo'
+            """,
+            (bet_id,),
+        )
     conn.commit()
     conn.close()
     return {"status": "ok"}
@@ -1906,33 +2876,53 @@ def import_user_settings(payload: ImportSettingsRequest):
     return {"status": "ok"}
 
 
+# /api/user/bets column -> (SQL expression, join it needs); the runner and race
+# joins through the archive views are only made when one of their columns is
+# requested.
+USER_BET_COLUMNS = {
+    "id": ("t.id", None),
+    "tracked_at": ("t.tracked_at", None),
+    "race_id": ("t.race_id", None),
+    "track": ("ra.track", "ra"),
+    "race_number": ("ra.race_number", "ra"),
+    "distance_m": ("ra.distance_m", "ra"),
+    "back_number": ("r.horse_number AS back_number", "r"),
+    "barrier": ("r.barrier", "r"),
+    "horse_name": ("r.horse_name", "r"),
+    "bookmaker": ("t.bookmaker", None),
+    "edge_pct": ("t.edge_pct", None),
+    "odds_at_tip": ("t.odds_at_tip", None),
+    "stake": ("t.stake", None),
+    "settled_at": ("t.settled_at", None),
+    "result": ("t.result", None),
+}
+USER_BET_JOINS = {
+    "r": "JOIN runners_all r ON r.id = t.runner_id",
+    "ra": "JOIN races_all ra ON ra.id = t.race_id",
+}
+# A join whose columns aren't selected still filters, as a semi-join, so the
+# rows don't depend on `fields`.
+USER_BET_SEMI_JOINS = {
+    "r": "EXISTS (SELECT 1 FROM runners_all r WHERE r.id = t.runner_id)",
+    "ra": "EXISTS (SELECT 1 FROM races_all ra WHERE ra.id = t.race_id)",
+}
+
+
 @app.get("/api/user/bets")
-def get_user_bets():
-    conn = get_conn()
-    settlement = settle_pending_tips(conn, user_id="demo")
+def get_user_bets(fields: Optional[str] = None):
+    selected_fields = parse_fields(fields, tuple(USER_BET_COLUMNS), ("id",))
+    columns = [name for name in USER_BET_COLUMNS if selected_fields is None or name in selected_fields]
+    joins = {USER_BET_COLUMNS[name][1] for name in columns} - {None}
+    conn = get_conn(with_archive=True)
+    settlement = settle_pending_tips(conn)
     conn.commit()
     rows = conn.execute(
-        """
-        SELECT
-          t.id,
-          t.tracked_at,
-          t.race_id,
-          ra.track,
-          ra.race_number,
-          ra.distance_m,
-          r.horse_number AS back_number,
-          r.barrier,
-          r.horse_name,
-          t.bookmaker,
-          t.edge_pct,
-          t.odds_at_tip,
-          t.stake,
-          t.settled_at,
-          t.result
-        FROM tracked_tips t
-        JOIN runners r ON r.id = t.runner_id
-        JOIN races ra ON ra.id = t.race_id
+        f"""
+        SELECT {", ".join(USER_BET_COLUMNS[name][0] for name in columns)}
+        FROM tracked_tips_all t
+        {" ".join(USER_BET_JOINS[alias] for alias in ("r", "ra") if alias in joins)}
         WHERE t.user_id = 'demo'
+        {" ".join(f"AND {USER_BET_SEMI_JOINS[alias]}" for alias in ("r", "ra") if alias not in joins)}
         ORDER BY t.tracked_at DESC
         LIMIT 1000
         """
@@ -1944,7 +2934,7 @@ def get_user_bets():
 @app.post("/api/user/bets/settle-pending")
 def settle_pending_bets():
     conn = get_conn()
-    settlement = settle_pending_tips(conn, user_id="demo")
+    settlement = settle_pending_tips(conn)
     conn.commit()
     conn.close()
     return {"status": "ok", "settlement": settlement}
@@ -1952,8 +2942,8 @@ def settle_pending_bets():
 
 @app.get("/api/user/bets/analytics")
 def get_user_bets_analytics():
-    conn = get_conn()
-    settlement = settle_pending_tips(conn, user_id="demo")
+    conn = get_conn(with_archive=True)
+    settlement = settle_pending_tips(conn)
     conn.commit()
     rows = conn.execute(
         """
@@ -1967,9 +2957,9 @@ def get_user_bets_analytics():
           t.result,
           ra.track,
           rr.closing_odds
-        FROM tracked_tips t
-        JOIN races ra ON ra.id = t.race_id
-        LEFT JOIN race_results rr ON rr.race_id = t.race_id
+        FROM tracked_tips_all t
+        JOIN races_all ra ON ra.id = t.race_id
+        LEFT JOIN race_results_all rr ON rr.race_id = t.race_id
           AND rr.runner_id = t.runner_id
         WHERE t.user_id = 'demo'
         ORDER BY t.tracked_at ASC
@@ -2104,11 +3094,11 @@ def get_user_bets_analytics():
 
 @app.get("/api/stats/filters")
 def get_stats_filters():
-    conn = get_conn()
+    conn = get_conn(with_archive=True)
     tracks = conn.execute(
         """
         SELECT DISTINCT track
-        FROM races
+        FROM races_all
         ORDER BY track
         """
     ).fetchall()
@@ -2126,7 +3116,7 @@ def get_stats_dashboard(
     min_back_number: Optional[int] = Query(default=None),
     max_back_number: Optional[int] = Query(default=None),
 ):
-    conn = get_conn()
+    conn = get_conn(with_archive=True)
 
     def build_filters(track_col: str, distance_col: str, runner_col_prefix: str):
         clauses = []
@@ -2171,9 +3161,9 @@ def get_stats_dashboard(
           ROUND(AVG(ra.prize_pool), 2) AS avg_prize_pool,
           ROUND(AVG(CASE WHEN ra.track_rating LIKE 'Good%' THEN 1.0 ELSE 0.0 END) * 100.0, 2) AS good_rate_pct,
           ROUND(AVG(CASE WHEN ra.track_rating LIKE 'Soft%' THEN 1.0 ELSE 0.0 END) * 100.0, 2) AS soft_rate_pct
-        FROM races ra
-        JOIN runners r ON r.race_id = ra.id
-        JOIN runner_history h ON h.runner_id = r.id
+        FROM races_all ra
+        JOIN runners_all r ON r.race_id = ra.id
+        JOIN runner_history_all h ON h.runner_id = r.id
         {track_filter}
         GROUP BY ra.track
         ORDER BY races DESC, ra.track
@@ -2198,8 +3188,8 @@ def get_stats_dashboard(
           ROUND(((SUM(CASE WHEN h.finish_pos = 1 THEN h.starting_price ELSE 0 END) - COUNT(*)) * 100.0) / COUNT(*), 2) AS roi_pct,
           ROUND(AVG(h.finish_pos), 2) AS avg_finish_pos,
           ROUND((SUM(CASE WHEN h.finish_pos = 1 THEN 1 ELSE 0 END) * 100.0) / COUNT(*), 2) AS strike_rate_pct
-        FROM runner_history h
-        JOIN runners r ON r.id = h.runner_id
+        FROM runner_history_all h
+        JOIN runners_all r ON r.id = h.runner_id
         {bias_filter}
         GROUP BY h.track, barrier_bucket
         ORDER BY h.track, barrier_bucket
@@ -2239,8 +3229,8 @@ def get_stats_dashboard(
               ) / SUM(CASE WHEN h.starting_price <= 3.0 THEN 1 ELSE 0 END)
             END, 2
           ) AS short_fav_roi_pct
-        FROM runner_history h
-        JOIN runners r ON r.id = h.runner_id
+        FROM runner_history_all h
+        JOIN runners_all r ON r.id = h.runner_id
         {bias_filter}
         GROUP BY h.jockey
         ORDER BY wins DESC, strike_rate_pct DESC
@@ -2281,8 +3271,8 @@ def get_stats_dashboard(
               ) / SUM(CASE WHEN h.starting_price <= 3.0 THEN 1 ELSE 0 END)
             END, 2
           ) AS short_fav_roi_pct
-        FROM runner_history h
-        JOIN runners r ON r.id = h.runner_id
+        FROM runner_history_all h
+        JOIN runners_all r ON r.id = h.runner_id
         {bias_filter}
         GROUP BY r.trainer
         ORDER BY wins DESC, strike_rate_pct DESC
@@ -2298,8 +3288,8 @@ def get_stats_dashboard(
           SUM(CASE WHEN h.finish_pos = 1 THEN 1 ELSE 0 END) AS wins,
           COUNT(*) AS runs,
           ROUND((SUM(CASE WHEN h.finish_pos = 1 THEN 1 ELSE 0 END) * 100.0) / COUNT(*), 2) AS strike_rate_pct
-        FROM runner_history h
-        JOIN runners r ON r.id = h.runner_id
+        FROM runner_history_all h
+        JOIN runners_all r ON r.id = h.runner_id
         {bias_filter}
         GROUP BY h.jockey
         ORDER BY wins DESC, strike_rate_pct DESC
@@ -2315,8 +3305,8 @@ def get_stats_dashboard(
           SUM(CASE WHEN h.finish_pos = 1 THEN 1 ELSE 0 END) AS wins,
           COUNT(*) AS runs,
           ROUND((SUM(CASE WHEN h.finish_pos = 1 THEN 1 ELSE 0 END) * 100.0) / COUNT(*), 2) AS strike_rate_pct
-        FROM runner_history h
-        JOIN runners r ON r.id = h.runner_id
+        FROM runner_history_all h
+        JOIN runners_all r ON r.id = h.runner_id
         {bias_filter}
         GROUP BY r.trainer
         ORDER BY wins DESC, strike_rate_pct DESC
@@ -2341,16 +3331,23 @@ def get_stats_dashboard(
 
 @app.post("/api/user/bets/{bet_id}/result")
 def update_bet_result(bet_id: int, payload: UpdateBetResultRequest):
-    settled_at = datetime.utcnow().isoformat() if payload.result in {"won", "lost"} else None
-    conn = get_conn()
-    conn.execute(
-        """
-        UPDATE tracked_tips
-        SET result = ?, settled_at = ?
-        WHERE id = ? AND user_id = 'demo'
-        """,
-        (payload.result, settled_at, bet_id),
-    )
+    manual = payload.result in {"won", "lost"}
+    settled_at = datetime.utcnow().isoformat() if manual else None
+    conn = get_conn(with_archive=True)
+    for table in tracked_tips_tables(conn):
+        conn.execute(
+            f"""
+            UPDATE {table}
+            SET result = ?, settled_at = ?, manual_result = ?
+            WHERE id = ? AND user_id = 'demo'
+            """,
+            (payload.result, settled_at, int(manual), bet_id),
+        )
+    if not manual:
+        # Back to pending: the next pass settles it from the race's results, if any.
+        tip = conn.execute("SELECT race_id FROM main.tracked_tips WHERE id = ? AND user_id = 'demo'", (bet_id,)).fetchone()
+        if tip:
+            conn.execute(SETTLEMENT_QUEUE_SQL.format(race="?", forced=0), (tip["race_id"],))
     conn.commit()
     conn.close()
     return {"status": "ok"}
@@ -2358,11 +3355,11 @@ def update_bet_result(bet_id: int, payload: UpdateBetResultRequest):
 
 @app.get("/api/runners/{runner_id}/history")
 def runner_history(runner_id: int):
-    conn = get_conn()
+    conn = get_conn(with_archive=True)
     runner = conn.execute(
         """
         SELECT id, horse_number, horse_name, barrier, trainer, jockey
-        FROM runners
+        FROM runners_all
         WHERE id = ?
         """,
         (runner_id,),
@@ -2374,9 +3371,9 @@ def runner_history(runner_id: int):
     rows = conn.execute(
         """
         SELECT run_date, track, distance_m, finish_pos, starting_price, carried_weight_kg, jockey
-        FROM runner_history
+        FROM runner_history_all
         WHERE runner_id = ?
-        ORDER BY run_date DESC
+        ORDER BY run_day DESC
         LIMIT 20
         """,
         (runner_id,),
@@ -2451,13 +3448,13 @@ def trainer_history(
     track: Optional[str] = None,
     runs_back: Optional[int] = None,
 ):
-    conn = get_conn()
+    conn = get_conn(with_archive=True)
     rows = conn.execute(
         """
         SELECT run_date, horse_name, track, distance_m, finish_pos, starting_price
-        FROM trainer_history
+        FROM trainer_history_all
         WHERE trainer = ?
-        ORDER BY run_date DESC
+        ORDER BY run_day DESC
         """,
         (name,),
     ).fetchall()
@@ -2484,13 +3481,13 @@ def jockey_history(
     track: Optional[str] = None,
     runs_back: Optional[int] = None,
 ):
-    conn = get_conn()
+    conn = get_conn(with_archive=True)
     rows = conn.execute(
         """
         SELECT run_date, horse_name, track, distance_m, finish_pos, starting_price
-        FROM jockey_history
+        FROM jockey_history_all
         WHERE jockey = ?
-        ORDER BY run_date DESC
+        ORDER BY run_day DESC
         """,
         (name,),
     ).fetchall()
@@ -2508,3 +3505,3054 @@ def jockey_history(
         "runs": display_rows,
         "available_tracks": available_tracks,
     }
+
+
+# ---------------------------------------------------------------------------
+# Compact storage
+# ---------------------------------------------------------------------------
+
+# odds and runner_history are the two bulk tables. Rows are stored with
+# dictionary-encoded bookmakers/tracks/people, prices in integer ticks, dates
+# as epoch days and timestamps as epoch microseconds; same-named views decode
+# them back to the original columns, and INSTEAD OF triggers encode writes,
+# so every reader, writer and JSON shape stays as it was.
+PRICE_TICKS = 100
+WEIGHT_TICKS = 10  # carried weight in hectograms (0.1 kg)
+EPOCH = datetime(1970, 1, 1)  # for encoding in Python: (dt - EPOCH) in days or microseconds
+
+
+def sql_ticks(expr: str, per_unit: int = PRICE_TICKS) -> str:
+    return f"CAST(ROUND(({expr}) * {per_unit}) AS INTEGER)"
+
+
+def sql_epoch_day(expr: str) -> str:
+    return f"(unixepoch({expr}) / 86400)"
+
+
+def sql_iso_date(expr: str) -> str:
+    return f"date(({expr}) * 86400, 'unixepoch')"
+
+
+def sql_epoch_us(expr: str) -> str:
+    # Round-trips datetime.isoformat(), including the optional microseconds.
+    return (
+        f"(unixepoch({expr}) * 1000000 + CASE WHEN substr({expr}, 20, 1) = '.' "
+        f"THEN CAST(substr(substr({expr}, 21) || '00000', 1, 6) AS INTEGER) ELSE 0 END)"
+    )
+
+
+def sql_iso_timestamp(expr: str) -> str:
+    return (
+        f"(strftime('%Y-%m-%dT%H:%M:%S', ({expr}) / 1000000, 'unixepoch') || "
+        f"CASE WHEN ({expr}) % 1000000 THEN printf('.%06d', ({expr}) % 1000000) ELSE '' END)"
+    )
+
+
+def sql_default_bet_url(book: str, runner_id: str, runners: str = "runners") -> str:
+    return (
+        f"'https://example.com/bet/' || {book} || '/' || "
+        f"(SELECT race_id FROM {runners} WHERE id = {runner_id}) || '/' || {runner_id}"
+    )
+
+
+# `{db}` is a schema prefix and `{src}` a table suffix: ("", "") for the
+# permanent views, ("", "_all") for attach_archive()'s temp views, and
+# ("{db}.", "") for per-schema export queries.
+COMPACT_VIEWS = {
+    "odds": f"""
+        SELECT
+          o.id,
+          o.runner_id,
+          b.code AS bookmaker,
+          o.price_ticks / {PRICE_TICKS}.0 AS current_odds,
+          COALESCE(o.bet_url, {sql_default_bet_url("b.code", "o.runner_id", "{db}runners{src}")}) AS bet_url,
+          {sql_iso_timestamp("o.updated_us")} AS updated_at,
+          o.price_rank
+        FROM {{db}}odds_data{{src}} o
+        JOIN bookmakers b ON b.id = o.bookmaker_id
+    """,
+    "runner_history": f"""
+        SELECT
+          h.id,
+          h.runner_id,
+          {sql_iso_date("h.run_day")} AS run_date,
+          h.run_day,
+          t.name AS track,
+          h.distance_m,
+          h.finish_pos,
+          h.sp_ticks / {PRICE_TICKS}.0 AS starting_price,
+          h.carried_weight_hg / {WEIGHT_TICKS}.0 AS carried_weight_kg,
+          p.name AS jockey,
+          h.jockey_id
+        FROM {{db}}runner_history_data{{src}} h
+        JOIN tracks t ON t.id = h.track_id
+        JOIN people p ON p.id = h.jockey_id
+    """,
+}
+ODDS_ROW_VALUES = f"""
+      (SELECT id FROM bookmakers WHERE code = new.bookmaker),
+      {sql_ticks("new.current_odds")},
+      NULLIF(new.bet_url, {sql_default_bet_url("new.bookmaker", "new.runner_id")}),
+      {sql_epoch_us("new.updated_at")},
+      new.price_rank
+"""
+HISTORY_ROW_VALUES = f"""
+      {sql_epoch_day("new.run_date")},
+      (SELECT id FROM tracks WHERE name = new.track),
+      new.distance_m,
+      new.finish_pos,
+      {sql_ticks("new.starting_price")},
+      {sql_ticks("new.carried_weight_kg", WEIGHT_TICKS)},
+      (SELECT id FROM people WHERE name = new.jockey)
+"""
+HISTORY_ROW_DIMENSIONS = """
+      INSERT OR IGNORE INTO tracks (name) VALUES (new.track);
+      INSERT OR IGNORE INTO people (name) VALUES (new.jockey);
+      INSERT OR IGNORE INTO search_names (kind, name) VALUES ('jockey', new.jockey);
+"""
+COMPACT_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_odds_insert INSTEAD OF INSERT ON odds BEGIN
+      INSERT OR IGNORE INTO bookmakers (code) VALUES (new.bookmaker);
+      INSERT INTO odds_data (id, runner_id, bookmaker_id, price_ticks, bet_url, updated_us, price_rank)
+      VALUES (new.id, new.runner_id, {ODDS_ROW_VALUES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_odds_update INSTEAD OF UPDATE ON odds BEGIN
+      INSERT OR IGNORE INTO bookmakers (code) VALUES (new.bookmaker);
+      UPDATE odds_data
+      SET (runner_id, bookmaker_id, price_ticks, bet_url, updated_us, price_rank) = (new.runner_id, {ODDS_ROW_VALUES})
+      WHERE id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_odds_delete INSTEAD OF DELETE ON odds BEGIN
+      DELETE FROM odds_data WHERE id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_runner_history_insert INSTEAD OF INSERT ON runner_history BEGIN
+      {HISTORY_ROW_DIMENSIONS}
+      INSERT INTO runner_history_data (
+        id, runner_id, run_day, track_id, distance_m, finish_pos, sp_ticks, carried_weight_hg, jockey_id
+      )
+      VALUES (new.id, new.runner_id, {HISTORY_ROW_VALUES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_runner_history_update INSTEAD OF UPDATE ON runner_history BEGIN
+      {HISTORY_ROW_DIMENSIONS}
+      UPDATE runner_history_data
+      SET (runner_id, run_day, track_id, distance_m, finish_pos, sp_ticks, carried_weight_hg, jockey_id)
+        = (new.runner_id, {HISTORY_ROW_VALUES})
+      WHERE id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_runner_history_delete INSTEAD OF DELETE ON runner_history BEGIN
+      DELETE FROM runner_history_data WHERE id = old.id;
+    END
+    """,
+]
+
+
+def migrate_compact_storage(conn, schema: str = "main") -> dict:
+    """Convert legacy TEXT/REAL odds and runner_history tables in `schema`
+    into odds_data/runner_history_data, then drop them."""
+    legacy = {
+        r[0]
+        for r in conn.execute(
+            f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table' AND name IN ('odds', 'runner_history')"
+        ).fetchall()
+    }
+    moved: dict[str, int] = {}
+    if "odds" in legacy:
+        cols = set(table_columns(conn, schema, "odds"))
+        bet_url = (
+            f"NULLIF(o.bet_url, {sql_default_bet_url('o.bookmaker', 'o.runner_id', f'{schema}.runners')})"
+            if "bet_url" in cols
+            else "'https://example.com/bet/' || o.bookmaker || '/legacy/' || o.runner_id"
+        )
+        price_rank = "o.price_rank" if "price_rank" in cols else "NULL"
+        conn.execute(f"INSERT OR IGNORE INTO main.bookmakers (code) SELECT DISTINCT bookmaker FROM {schema}.odds")
+        moved["odds"] = conn.execute(
+            f"""
+            INSERT OR REPLACE INTO {schema}.odds_data (id, runner_id, bookmaker_id, price_ticks, bet_url, updated_us, price_rank)
+            SELECT o.id, o.runner_id, b.id, {sql_ticks("o.current_odds")}, {bet_url},
+                   {sql_epoch_us("o.updated_at")}, {price_rank}
+            FROM {schema}.odds o
+            JOIN main.bookmakers b ON b.code = o.bookmaker
+            """
+        ).rowcount
+        conn.execute(f"DROP TABLE {schema}.odds")
+    if "runner_history" in legacy:
+        conn.execute(f"INSERT OR IGNORE INTO main.tracks (name) SELECT DISTINCT track FROM {schema}.runner_history")
+        conn.execute(f"INSERT OR IGNORE INTO main.people (name) SELECT DISTINCT jockey FROM {schema}.runner_history")
+        moved["runner_history"] = conn.execute(
+            f"""
+            INSERT OR REPLACE INTO {schema}.runner_history_data (
+                id, runner_id, run_day, track_id, distance_m, finish_pos, sp_ticks, carried_weight_hg, jockey_id
+            )
+            SELECT h.id, h.runner_id, {sql_epoch_day("h.run_date")}, t.id, h.distance_m, h.finish_pos,
+                   {sql_ticks("h.starting_price")}, {sql_ticks("h.carried_weight_kg", WEIGHT_TICKS)}, p.id
+            FROM {schema}.runner_history h
+            JOIN main.tracks t ON t.name = h.track
+            JOIN main.people p ON p.name = h.jockey
+            """
+        ).rowcount
+        conn.execute(f"DROP TABLE {schema}.runner_history")
+    return moved
+
+
+def ensure_view(cur: sqlite3.Cursor, name: str, body: str) -> None:
+    """Create view `name`, replacing one left by an older definition (its
+    INSTEAD OF triggers go with it and must be recreated afterwards)."""
+    sql = f"CREATE VIEW {name} AS {body}"
+    current = cur.execute("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = ?", (name,)).fetchone()
+    if current and current[0] == sql:
+        return
+    if current:
+        cur.execute(f"DROP VIEW {name}")
+    cur.execute(sql)
+
+
+def ensure_compact_storage(cur: sqlite3.Cursor) -> dict:
+    moved = migrate_compact_storage(cur)
+    for view, body in COMPACT_VIEWS.items():
+        ensure_view(cur, view, body.format(db='', src=''))
+    for trigger_sql in COMPACT_TRIGGERS:
+        cur.execute(trigger_sql)
+    return moved
+
+
+# ---------------------------------------------------------------------------
+# History dimensions
+# ---------------------------------------------------------------------------
+
+# trainer_history / jockey_history used to be full copies of runner_history
+# rebuilt on every startup. They are now views keyed through the horses and
+# people dimensions; `{src}` is "" for the hot views and "_all" for the
+# archive-aware temp views created by attach_archive().
+HISTORY_VIEWS = {
+    "trainer_history": """
+        SELECT h.id, p.name AS trainer, h.run_date, h.run_day, hs.name AS horse_name,
+               h.track, h.distance_m, h.finish_pos, h.starting_price
+        FROM people p
+        JOIN runners{src} r ON r.trainer_id = p.id
+        JOIN runner_history{src} h ON h.runner_id = r.id
+        JOIN horses hs ON hs.id = r.horse_id
+    """,
+    "jockey_history": """
+        SELECT h.id, p.name AS jockey, h.run_date, h.run_day, hs.name AS horse_name,
+               h.track, h.distance_m, h.finish_pos, h.starting_price
+        FROM people p
+        JOIN runner_history{src} h ON h.jockey_id = p.id
+        JOIN runners{src} r ON r.id = h.runner_id
+        JOIN horses hs ON hs.id = r.horse_id
+    """,
+}
+HISTORY_KEY_COLUMNS = [
+    # (table, key column, name column, dimension)
+    ("runners", "horse_id", "horse_name", "horses"),
+    ("runners", "trainer_id", "trainer", "people"),
+]
+HISTORY_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_runners_dimension_insert AFTER INSERT ON runners BEGIN
+      INSERT OR IGNORE INTO horses (name) VALUES (new.horse_name);
+      INSERT OR IGNORE INTO people (name) VALUES (new.trainer);
+      UPDATE runners
+      SET horse_id = (SELECT id FROM horses WHERE name = new.horse_name),
+          trainer_id = (SELECT id FROM people WHERE name = new.trainer)
+      WHERE id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_runners_dimension_update AFTER UPDATE OF horse_name, trainer ON runners BEGIN
+      INSERT OR IGNORE INTO horses (name) VALUES (new.horse_name);
+      INSERT OR IGNORE INTO people (name) VALUES (new.trainer);
+      UPDATE runners
+      SET horse_id = (SELECT id FROM horses WHERE name = new.horse_name),
+          trainer_id = (SELECT id FROM people WHERE name = new.trainer)
+      WHERE id = new.id;
+    END
+    """,
+]
+
+
+def backfill_dimension_keys(conn, schema: str = "main") -> None:
+    """Fill missing horse/trainer/jockey keys on `schema` rows (pre-migration
+    data, or an archive written before the dimensions existed)."""
+    for table, key_col, name_col, dimension in HISTORY_KEY_COLUMNS:
+        conn.execute(
+            f"INSERT OR IGNORE INTO main.{dimension} (name) "
+            f"SELECT DISTINCT {name_col} FROM {schema}.{table} WHERE {key_col} IS NULL"
+        )
+        conn.execute(
+            f"""
+            UPDATE {schema}.{table}
+            SET {key_col} = (SELECT d.id FROM main.{dimension} d WHERE d.name = {table}.{name_col})
+            WHERE {key_col} IS NULL
+            """
+        )
+
+
+def ensure_history_schema(cur: sqlite3.Cursor) -> None:
+    # Keys carry no REFERENCES clause: archived copies of runners and
+    # runner_history live in a separate DB file without the dimensions.
+    for table, key_col, _name_col, _dimension in HISTORY_KEY_COLUMNS:
+        if key_col not in {r[1] for r in cur.execute(f"PRAGMA table_info({table})").fetchall()}:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {key_col} INTEGER")
+    backfill_dimension_keys(cur)
+    for view, body in HISTORY_VIEWS.items():
+        legacy = cur.execute("SELECT type FROM sqlite_master WHERE name = ?", (view,)).fetchone()
+        if legacy and legacy[0] == "table":
+            cur.execute(f"DROP TABLE {view}")
+        ensure_view(cur, view, body.format(src=''))
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_runners_trainer ON runners(trainer_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_runner_history_runner ON runner_history_data(runner_id, run_day)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_runner_history_jockey ON runner_history_data(jockey_id)")
+    for trigger_sql in HISTORY_TRIGGERS:
+        cur.execute(trigger_sql)
+
+
+# ---------------------------------------------------------------------------
+# Page bootstrap
+# ---------------------------------------------------------------------------
+
+# One request per page load instead of a chain of serial round trips. Each
+# payload matches its standalone endpoint and is read on one connection
+# inside one transaction, so the pieces agree with each other.
+
+
+@app.get("/api/bootstrap/board")
+def bootstrap_board(
+    race_date: Optional[str] = Query(default=None),
+    books: Optional[str] = Query(default=None),
+    race_id: Optional[int] = Query(default=None),
+    rec_edge: float = Query(default=1.0),
+):
+    day = race_date or datetime.now().date().isoformat()
+    selected_books = parse_selected_books(books)
+    conn = get_conn(with_archive=True)
+    try:
+        settlement = settle_pending_tips(conn)
+        conn.commit()
+        conn.execute("BEGIN")
+        races = list_races(conn, day, cold=day < archive_cutoff())
+        signals = race_signals(conn, day, selected_books, rec_edge)
+        if race_id not in {r["id"] for r in races}:
+            race_id = races[0]["id"] if races else None
+        board = race_board(conn, race_id, selected_books) if race_id else None
+        tips = tracked_tip_rows(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    return {
+        "bookmakers": get_bookmakers(),
+        "races": {"date": day, "races": races},
+        "signals": signals,
+        "board": board,
+        "tracked": {"tips": tips, "auto_settlement": settlement},
+    }
+
+
+@app.get("/api/bootstrap/dashboard")
+def bootstrap_dashboard(
+    race_date: Optional[str] = Query(default=None),
+    min_edge: float = Query(default=1.0),
+    books: Optional[str] = Query(default=None),
+):
+    day = race_date or datetime.now().date().isoformat()
+    selected_books = parse_selected_books(books)
+    conn = get_conn(with_archive=True)
+    try:
+        settlement = settle_pending_tips(conn)
+        conn.commit()
+        conn.execute("BEGIN")
+        races = list_races(conn, day, cold=day < archive_cutoff())
+        tips = daily_tips(conn, day, selected_books, min_edge)
+        tracked = tracked_tip_rows(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    return {
+        "races": {"date": day, "races": races},
+        "tips": tips,
+        "tracked": {"tips": tracked, "auto_settlement": settlement},
+    }
+
+
+# ---------------------------------------------------------------------------
+# Board deltas
+# ---------------------------------------------------------------------------
+
+# Every price or result write bumps a single board clock and stamps the runner
+# with it, so "what changed in race R since version V" is one indexed range read
+# of runner_changes. Triggers do the stamping, whichever path writes odds or
+# results; history-derived fields (form, ROI) never change with either.
+
+BOARD_DELTA_FIELDS = (
+    "runner_id", "predicted_price", "model_prob_pct", "market_odds", "best_bookmaker", "best_book_symbol", "bet_url",
+    "bookmaker_pct", "edge_pct", "qualifies", "finish_pos",
+)
+BOARD_CHANGE_MARK = """
+    UPDATE board_clock SET version = version + 1 WHERE id = 1;
+    INSERT INTO runner_changes (runner_id, race_id, version)
+    SELECT r.id, r.race_id, c.version FROM runners r, board_clock c WHERE r.id = {runner} AND c.id = 1
+    ON CONFLICT(runner_id) DO UPDATE SET version = excluded.version;
+"""
+BOARD_CHANGE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS board_change_odds_insert AFTER INSERT ON odds_data BEGIN
+    {BOARD_CHANGE_MARK.format(runner="NEW.runner_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS board_change_odds_update AFTER UPDATE OF price_ticks, bet_url ON odds_data
+    WHEN OLD.price_ticks IS NOT NEW.price_ticks OR OLD.bet_url IS NOT NEW.bet_url BEGIN
+    {BOARD_CHANGE_MARK.format(runner="NEW.runner_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS board_change_result_insert AFTER INSERT ON race_results BEGIN
+    {BOARD_CHANGE_MARK.format(runner="NEW.runner_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS board_change_result_update AFTER UPDATE ON race_results BEGIN
+    {BOARD_CHANGE_MARK.format(runner="NEW.runner_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS board_change_result_delete AFTER DELETE ON race_results BEGIN
+    {BOARD_CHANGE_MARK.format(runner="OLD.runner_id")}
+    END
+    """,
+    # Archived runners leave the hot DB along with their change stamps.
+    """
+    CREATE TRIGGER IF NOT EXISTS board_change_runner_delete AFTER DELETE ON runners BEGIN
+        DELETE FROM runner_changes WHERE runner_id = OLD.id;
+    END
+    """,
+]
+
+
+def ensure_board_change_schema(cur: sqlite3.Cursor) -> None:
+    cur.execute("CREATE TABLE IF NOT EXISTS board_clock (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)")
+    cur.execute("INSERT OR IGNORE INTO board_clock (id, version) VALUES (1, 0)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS runner_changes (
+            runner_id INTEGER PRIMARY KEY,
+            race_id INTEGER NOT NULL,
+            version INTEGER NOT NULL
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_runner_changes_race ON runner_changes(race_id, version)")
+    for trigger_sql in BOARD_CHANGE_TRIGGERS:
+        cur.execute(trigger_sql)
+
+
+@app.get("/api/races/{race_id}/board/delta")
+def get_race_board_delta(
+    race_id: int,
+    since: Optional[int] = Query(default=None, ge=0),
+    min_edge: float = Query(default=0.0),
+    books: Optional[str] = Query(default=None),
+    fields: Optional[str] = None,
+    response: Response = None,
+):
+    selected_books = parse_selected_books(books)
+    selected_fields = parse_fields(fields, BOARD_FIELDS, ("runner_id",))
+    conn = get_conn()
+    try:
+        conn.execute("BEGIN")
+        delta = race_board_delta(conn, race_id, selected_books, min_edge, since, selected_fields)
+        conn.commit()
+    finally:
+        conn.close()
+    set_max_age(response, delta["refresh_after_s"])
+    return delta
+
+
+def race_board_delta(
+    conn: sqlite3.Connection,
+    race_id: int,
+    selected_books: list[str],
+    min_edge: float,
+    since: Optional[int],
+    fields: Optional[set[str]] = None,
+) -> dict:
+    """Rows whose price, edge or result changed after version `since`, plus the
+    version to pass next time. Without `since` (or with one from a reset DB)
+    this is the full board with `full: true`; archived races always are.
+    `refresh_after_s` is the recommended wait before the next poll."""
+    version = conn.execute("SELECT version FROM board_clock WHERE id = 1").fetchone()[0]
+    hot = conn.execute(
+        """
+        SELECT race_date, jump_time, EXISTS(SELECT 1 FROM race_results rr WHERE rr.race_id = races.id) AS resulted
+        FROM races
+        WHERE id = ?
+        """,
+        (race_id,),
+    ).fetchone()
+    if since is None or since > version or not hot:
+        board = race_board(conn, race_id, selected_books, min_edge, fields=fields)
+        return {
+            **board,
+            "version": version,
+            "since": since,
+            "full": True,
+            "refresh_after_s": board_refresh_after_s(board),
+        }
+
+    changed = {
+        row["runner_id"]
+        for row in conn.execute(
+            "SELECT runner_id FROM runner_changes WHERE race_id = ? AND version > ?",
+            (race_id, since),
+        ).fetchall()
+    }
+    delta = {
+        "race_id": race_id,
+        "version": version,
+        "since": since,
+        "full": False,
+        "refresh_after_s": refresh_after_s(hot["race_date"], hot["jump_time"], bool(hot["resulted"])),
+        "rows": [],
+    }
+    if changed:
+        board = race_board(conn, race_id, selected_books, min_edge, fields=fields or set(BOARD_DELTA_FIELDS))
+        delta["rows"] = [row for row in board["rows"] if row["runner_id"] in changed]
+        delta["totals"] = board["totals"]
+        delta["results"] = board["results"]
+    return delta
+
+
+# ---------------------------------------------------------------------------
+# Alerts
+# ---------------------------------------------------------------------------
+
+# Users with notifications_enabled get an alert when a runner's edge reaches
+# their notify_min_edge. Each tick evaluates only the runners stamped in
+# runner_changes since the last tick (the cursor lives in alert_state, so any
+# worker can run it) and only in races still to be run. Events are queued in
+# alert_events, one per user and runner: a pending event is refreshed with
+# the latest price and a delivered one is not sent again until the runner
+# drops back under the threshold, which clears it.
+
+alert_tick_log: deque = deque(maxlen=ALERT_TICK_LOG_SIZE)
+alert_tick_lock = threading.Lock()
+
+
+def ensure_alert_schema(cur: sqlite3.Cursor) -> None:
+    cur.execute("CREATE TABLE IF NOT EXISTS alert_state (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)")
+    cur.execute("INSERT OR IGNORE INTO alert_state (id, version) VALUES (1, 0)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_runner_changes_version ON runner_changes(version)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS alert_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            race_id INTEGER NOT NULL,
+            runner_id INTEGER NOT NULL,
+            bookmaker TEXT NOT NULL,
+            market_odds REAL NOT NULL,
+            edge_pct REAL NOT NULL,
+            threshold REAL NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            delivered_at TEXT,
+            UNIQUE(user_id, runner_id)
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_alert_events_pending ON alert_events(user_id, delivered_at)")
+
+
+def evaluate_alerts(conn: sqlite3.Connection) -> Optional[dict]:
+    """Run one tick in the caller's transaction. Returns the tick's stats, or
+    None when nothing has changed since the last one."""
+    start = time.perf_counter()
+    from_version = conn.execute("SELECT version FROM alert_state WHERE id = 1").fetchone()[0]
+    to_version = conn.execute("SELECT version FROM board_clock WHERE id = 1").fetchone()[0]
+    if to_version <= from_version:
+        return None
+
+    changed = conn.execute(
+        """
+        SELECT c.runner_id, c.race_id
+        FROM runner_changes c
+        JOIN races ra ON ra.id = c.race_id
+        WHERE c.version > ? AND c.version <= ?
+          AND ra.race_date >= ?
+          AND NOT EXISTS (SELECT 1 FROM race_results rr WHERE rr.race_id = c.race_id)
+        """,
+        (from_version, to_version, datetime.now().date().isoformat()),
+    ).fetchall()
+    users = conn.execute(
+        "SELECT user_id, notify_min_edge FROM user_settings WHERE notifications_enabled = 1"
+    ).fetchall()
+
+    events = []
+    cleared = []
+    race_ids = sorted({row["race_id"] for row in changed})
+    if changed and users:
+        changed_runners = {row["runner_id"] for row in changed}
+        now = datetime.utcnow().isoformat()
+        # Whole races are read because model probabilities normalize per race.
+        # The edge is the board's (normalized model_prob), which the user lands
+        # on from an alert; daily tips normalize predicted_price instead.
+        boards, _ = race_boards(conn, race_ids, BOOKMAKERS, fields={"edge_pct"})
+        for race_id, board in boards.items():
+            for row in board["rows"]:
+                if row["runner_id"] not in changed_runners:
+                    continue
+                for user in users:
+                    if row["edge_pct"] < user["notify_min_edge"]:
+                        cleared.append((user["user_id"], row["runner_id"]))
+                        continue
+                    events.append(
+                        (
+                            user["user_id"], race_id, row["runner_id"], row["best_bookmaker"], row["market_odds"],
+                            row["edge_pct"], user["notify_min_edge"], now, now,
+                        )
+                    )
+        conn.executemany("DELETE FROM alert_events WHERE user_id = ? AND runner_id = ?", cleared)
+        conn.executemany(
+            """
+            INSERT INTO alert_events (
+                user_id, race_id, runner_id, bookmaker, market_odds, edge_pct, threshold, created_at, updated_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, runner_id) DO UPDATE SET
+              bookmaker = excluded.bookmaker,
+              market_odds = excluded.market_odds,
+              edge_pct = excluded.edge_pct,
+              threshold = excluded.threshold,
+              updated_at = excluded.updated_at
+            WHERE alert_events.delivered_at IS NULL
+            """,
+            events,
+        )
+    conn.execute("UPDATE alert_state SET version = ? WHERE id = 1", (to_version,))
+
+    tick = {
+        "from_version": from_version,
+        "to_version": to_version,
+        "runners": len(changed),
+        "races": len(race_ids),
+        "users": len(users),
+        "events": len(events),
+        "cleared": len(cleared),
+        "duration_ms": round((time.perf_counter() - start) * 1000.0, 3),
+        "evaluated_at": datetime.utcnow().isoformat(),
+    }
+    with alert_tick_lock:
+        alert_tick_log.append(tick)
+    return tick
+
+
+@app.get("/api/user/alerts")
+def get_user_alerts(limit: int = Query(default=50, ge=1, le=500)):
+    """Pending alerts for the user, oldest first; returned alerts are marked
+    delivered so each one is handed out once."""
+    conn = get_conn()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        evaluate_alerts(conn)
+        rows = conn.execute(
+            """
+            SELECT a.id, a.race_id, a.runner_id, ra.track, ra.race_number, ra.race_date, ra.jump_time,
+                   r.horse_name, a.bookmaker, a.market_odds, a.edge_pct, a.threshold, a.created_at, a.updated_at
+            FROM alert_events a
+            JOIN runners r ON r.id = a.runner_id
+            JOIN races ra ON ra.id = a.race_id
+            WHERE a.user_id = 'demo' AND a.delivered_at IS NULL
+            ORDER BY a.created_at, a.id
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE alert_events SET delivered_at = ? WHERE id = ?",
+            [(datetime.utcnow().isoformat(), row["id"]) for row in rows],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return {"alerts": [dict(r) for r in rows]}
+
+
+# ---------------------------------------------------------------------------
+# Board cache
+# ---------------------------------------------------------------------------
+
+# Race boards are cached per process and kept coherent with writes from any
+# process. A dedicated watcher connection polls PRAGMA data_version, which
+# only moves when another connection has committed, so the common "nothing
+# changed" check is a single pragma. When it moves, the board clock and
+# runner_changes stamps (see Board deltas) name the races to drop; a bump of
+# the history version (form/ROI inputs) drops everything. Entries also record
+# the versions they were read at, so a board computed while a write landed
+# is never served past that write. Day-level race signals are cached the same
+# way but are dropped on any board or history change.
+
+RACE_STAMP_SQL = """
+    UPDATE board_clock SET version = version + 1 WHERE id = 1;
+    INSERT INTO runner_changes (runner_id, race_id, version)
+    SELECT r.id, r.race_id, c.version FROM runners r, board_clock c WHERE r.race_id = {race} AND c.id = 1
+    ON CONFLICT(runner_id) DO UPDATE SET version = excluded.version;
+"""
+HISTORY_BUMP_SQL = "UPDATE data_versions SET version = version + 1 WHERE name = 'history';"
+CACHE_VERSION_TRIGGERS = [
+    # Predicted prices normalize per race, and race metadata is part of every
+    # board, so these stamp the whole race.
+    f"""
+    CREATE TRIGGER IF NOT EXISTS board_change_runner_update
+    AFTER UPDATE OF horse_number, horse_name, barrier, trainer, jockey, model_prob, predicted_price ON runners BEGIN
+    {RACE_STAMP_SQL.format(race="NEW.race_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS board_change_race_update AFTER UPDATE ON races BEGIN
+    {RACE_STAMP_SQL.format(race="NEW.id")}
+    END
+    """,
+    # Trainer and jockey history are joined through runners, so moving one
+    # runner to another person changes that person's ROI on every race.
+    f"""
+    CREATE TRIGGER IF NOT EXISTS history_version_runner_people
+    AFTER UPDATE OF horse_name, trainer, jockey, horse_id, trainer_id ON runners
+    WHEN OLD.horse_name IS NOT NEW.horse_name OR OLD.trainer IS NOT NEW.trainer OR OLD.jockey IS NOT NEW.jockey
+      OR OLD.horse_id IS NOT NEW.horse_id OR OLD.trainer_id IS NOT NEW.trainer_id
+    BEGIN {HISTORY_BUMP_SQL} END
+    """,
+    f"CREATE TRIGGER IF NOT EXISTS history_version_insert AFTER INSERT ON runner_history_data BEGIN {HISTORY_BUMP_SQL} END",
+    f"CREATE TRIGGER IF NOT EXISTS history_version_update AFTER UPDATE ON runner_history_data BEGIN {HISTORY_BUMP_SQL} END",
+    f"CREATE TRIGGER IF NOT EXISTS history_version_delete AFTER DELETE ON runner_history_data BEGIN {HISTORY_BUMP_SQL} END",
+]
+
+board_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+signals_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+board_cache_lock = threading.Lock()
+board_cache_state = {
+    "watcher": None,
+    "data_version": None,
+    "board_version": 0,
+    "history_version": 0,
+    "race_versions": {},
+    "hits": 0,
+    "misses": 0,
+    "invalidations": 0,
+}
+
+
+def ensure_cache_version_schema(cur: sqlite3.Cursor) -> None:
+    cur.execute("CREATE TABLE IF NOT EXISTS data_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+    cur.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES ('history', 0)")
+    for trigger_sql in CACHE_VERSION_TRIGGERS:
+        cur.execute(trigger_sql)
+
+
+def data_versions(conn: sqlite3.Connection) -> tuple[int, int]:
+    """(board clock, history version) as seen by `conn`."""
+    row = conn.execute(
+        "SELECT (SELECT version FROM board_clock WHERE id = 1), (SELECT version FROM data_versions WHERE name = 'history')"
+    ).fetchone()
+    return row[0], row[1]
+
+
+def sync_board_cache() -> None:
+    """Drop cached boards for races written since the last sync, by this
+    process or any other. Call with board_cache_lock held."""
+    state = board_cache_state
+    if state["watcher"] is None:
+        state["watcher"] = get_conn(check_same_thread=False)
+    watcher = state["watcher"]
+    data_version = watcher.execute("PRAGMA data_version").fetchone()[0]
+    if data_version == state["data_version"]:
+        return
+    watcher.execute("BEGIN")
+    board_version, history_version = data_versions(watcher)
+    changed = watcher.execute(
+        "SELECT race_id, MAX(version) AS version FROM runner_changes WHERE version > ? GROUP BY race_id",
+        (state["board_version"],),
+    ).fetchall()
+    watcher.commit()
+    state["data_version"] = data_version
+    if changed or history_version != state["history_version"]:
+        signals_cache.clear()
+    if history_version != state["history_version"]:
+        state["invalidations"] += len(board_cache)
+        board_cache.clear()
+        state["race_versions"].clear()
+    elif changed:
+        race_versions = state["race_versions"]
+        for row in changed:
+            race_versions[row["race_id"]] = row["version"]
+        stale = [key for key in board_cache if key[0] in race_versions]
+        for key in stale:
+            del board_cache[key]
+        state["invalidations"] += len(stale)
+    state["board_version"] = board_version
+    state["history_version"] = history_version
+
+
+def cached_board(key: tuple) -> Optional[dict]:
+    if BOARD_CACHE_SIZE <= 0:
+        return None
+    with board_cache_lock:
+        sync_board_cache()
+        entry = board_cache.get(key)
+        if entry is not None:
+            board_cache.move_to_end(key)
+            board_cache_state["hits"] += 1
+            return entry[2]
+        board_cache_state["misses"] += 1
+    return None
+
+
+def store_board(key: tuple, versions: tuple[int, int], board: dict) -> None:
+    if BOARD_CACHE_SIZE <= 0:
+        return
+    board_version, history_version = versions
+    with board_cache_lock:
+        sync_board_cache()
+        # Read before a write this process has already seen: not cacheable.
+        if history_version != board_cache_state["history_version"]:
+            return
+        if board_version < board_cache_state["race_versions"].get(key[0], 0):
+            return
+        board_cache[key] = (board_version, history_version, board)
+        while len(board_cache) > BOARD_CACHE_SIZE:
+            board_cache.popitem(last=False)
+
+
+def cached_signals(key: tuple) -> Optional[dict]:
+    if BOARD_CACHE_SIZE <= 0:
+        return None
+    with board_cache_lock:
+        sync_board_cache()
+        entry = signals_cache.get(key)
+        if entry is not None:
+            signals_cache.move_to_end(key)
+            board_cache_state["hits"] += 1
+            return entry[2]
+        board_cache_state["misses"] += 1
+    return None
+
+
+def store_signals(key: tuple, versions: tuple[int, int], signals: dict) -> None:
+    if BOARD_CACHE_SIZE <= 0:
+        return
+    with board_cache_lock:
+        sync_board_cache()
+        # Signals span every race of the day, so only an exact version match is safe.
+        if versions != (board_cache_state["board_version"], board_cache_state["history_version"]):
+            return
+        signals_cache[key] = (*versions, signals)
+        while len(signals_cache) > BOARD_CACHE_SIZE:
+            signals_cache.popitem(last=False)
+
+
+# ---------------------------------------------------------------------------
+# Jump index and scheduler
+# ---------------------------------------------------------------------------
+
+# Unresulted races are kept in memory as a list of (jump datetime, race_id)
+# sorted by jump, so "what jumps next" is a bisect rather than a query and
+# sort of the day's races. Triggers stamp every race that is added, moved,
+# resulted or removed into race_changes with the schedule version, and the
+# index applies just those races whenever PRAGMA data_version says another
+# connection has committed.
+#
+# Boards matter most just before the jump, so a background scheduler walks the
+# front of the index every tick and pre-computes the default board for each
+# race inside the warm window plus the day's signals, so the first poll after
+# a price move is a cache hit. The same jump times drive the recommended
+# refresh interval published as Cache-Control max-age on boards.
+
+SCHEDULE_STAMP_SQL = """
+    UPDATE data_versions SET version = version + 1 WHERE name = 'schedule';
+    INSERT INTO race_changes (race_id, version)
+    SELECT {race}, version FROM data_versions WHERE name = 'schedule'
+    ON CONFLICT(race_id) DO UPDATE SET version = excluded.version;
+"""
+JUMP_INDEX_TRIGGERS = [
+    ("race_schedule_insert", "AFTER INSERT ON races", "NEW.id"),
+    ("race_schedule_update", "AFTER UPDATE OF race_date, jump_time ON races", "NEW.id"),
+    ("race_schedule_delete", "AFTER DELETE ON races", "OLD.id"),
+    ("race_schedule_result_insert", "AFTER INSERT ON race_results", "NEW.race_id"),
+    ("race_schedule_result_delete", "AFTER DELETE ON race_results", "OLD.race_id"),
+]
+
+# (seconds to jump below which, poll interval in seconds), nearest first.
+REFRESH_STEPS = ((5 * 60, 5), (15 * 60, 10), (60 * 60, 30), (3 * 60 * 60, 60))
+REFRESH_FAR_S = 300
+# Jumped but not yet resulted: results can land any moment.
+REFRESH_AWAITING_RESULT_S = 10
+REFRESH_RESULTED_S = 600
+# The scheduler keeps warming races this long after their jump (until resulted).
+JUMP_GRACE_S = 30 * 60
+# Runner fields listed under each race by /api/races/next-to-jump.
+NEXT_TO_JUMP_FIELDS = ("runner_id", "horse_number", "horse_name", "market_odds", "best_bookmaker", "edge_pct")
+
+jump_schedule_lock = threading.Lock()
+jump_schedule = {
+    "watcher": None,
+    "data_version": None,
+    "version": None,
+    "index": [],
+    "jump_at": {},
+    "applied": 0,
+    "thread": None,
+    "ticks": 0,
+    "last_tick": None,
+    "last_error": None,
+}
+
+
+def ensure_jump_index_schema(cur: sqlite3.Cursor) -> None:
+    cur.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES ('schedule', 0)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS race_changes (
+            race_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_race_changes_version ON race_changes(version)")
+    for name, event, race in JUMP_INDEX_TRIGGERS:
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {SCHEDULE_STAMP_SQL.format(race=race)} END")
+
+
+def jump_datetime(race_date: str, jump_time: str) -> datetime:
+    return datetime.strptime(f"{race_date} {jump_time}", "%Y-%m-%d %H:%M")
+
+
+def refresh_after_s(race_date: str, jump_time: str, resulted: bool, now: Optional[datetime] = None) -> int:
+    """Recommended poll interval for a race board."""
+    if resulted:
+        return REFRESH_RESULTED_S
+    to_jump = (jump_datetime(race_date, jump_time) - (now or datetime.now())).total_seconds()
+    if to_jump <= 0:
+        return REFRESH_AWAITING_RESULT_S
+    for below_s, interval_s in REFRESH_STEPS:
+        if to_jump < below_s:
+            return interval_s
+    return REFRESH_FAR_S
+
+
+def set_max_age(response: Optional[Response], seconds: int) -> None:
+    if response is not None:
+        response.headers["Cache-Control"] = f"private, max-age={seconds}"
+
+
+def index_race(race_id: int, jump_at: Optional[datetime]) -> None:
+    """Move `race_id` to `jump_at` in the index (None removes it). Call with
+    jump_schedule_lock held."""
+    index, positions = jump_schedule["index"], jump_schedule["jump_at"]
+    previous = positions.pop(race_id, None)
+    if previous is not None:
+        del index[bisect.bisect_left(index, (previous, race_id))]
+    if jump_at is not None:
+        bisect.insort(index, (jump_at, race_id))
+        positions[race_id] = jump_at
+
+
+def sync_jump_index() -> None:
+    """Apply races added, moved, resulted or removed since the last sync, by
+    this process or any other. Call with jump_schedule_lock held."""
+    state = jump_schedule
+    if state["watcher"] is None:
+        state["watcher"] = get_conn(check_same_thread=False)
+    watcher = state["watcher"]
+    data_version = watcher.execute("PRAGMA data_version").fetchone()[0]
+    if data_version == state["data_version"]:
+        return
+    watcher.execute("BEGIN")
+    version = watcher.execute("SELECT version FROM data_versions WHERE name = 'schedule'").fetchone()[0]
+    if state["version"] is None:
+        state["index"].clear()
+        state["jump_at"].clear()
+        changed = watcher.execute(
+            """
+            SELECT id AS race_id, race_date, jump_time, 0 AS resulted
+            FROM races
+            WHERE NOT EXISTS (SELECT 1 FROM race_results rr WHERE rr.race_id = races.id)
+            """
+        ).fetchall()
+    elif version != state["version"]:
+        changed = watcher.execute(
+            """
+            SELECT c.race_id, r.race_date, r.jump_time,
+                   EXISTS(SELECT 1 FROM race_results rr WHERE rr.race_id = c.race_id) AS resulted
+            FROM race_changes c
+            LEFT JOIN races r ON r.id = c.race_id
+            WHERE c.version > ?
+            """,
+            (state["version"],),
+        ).fetchall()
+    else:
+        changed = []
+    watcher.commit()
+    for row in changed:
+        upcoming = row["race_date"] is not None and not row["resulted"]
+        index_race(row["race_id"], jump_datetime(row["race_date"], row["jump_time"]) if upcoming else None)
+    state["applied"] += len(changed)
+    state["data_version"] = data_version
+    state["version"] = version
+
+
+def next_jumps(after: datetime, limit: Optional[int] = None, until: Optional[datetime] = None) -> list[tuple[datetime, int]]:
+    """Indexed (jump_at, race_id) pairs jumping at or after `after`, earliest
+    first, stopping at `until` and/or `limit` entries."""
+    with jump_schedule_lock:
+        sync_jump_index()
+        index = jump_schedule["index"]
+        start = bisect.bisect_left(index, (after,))
+        stop = len(index) if until is None else bisect.bisect_right(index, (until, float("inf")))
+        if limit is not None:
+            stop = min(stop, start + limit)
+        return index[start:stop]
+
+
+@app.get("/api/races/next-to-jump")
+def get_next_to_jump(
+    limit: int = Query(default=8, ge=1, le=100),
+    top: int = Query(default=3, ge=0, le=20),
+    min_edge: float = Query(default=0.0),
+    books: Optional[str] = Query(default=None),
+):
+    """The next `limit` unresulted races across all tracks with their `top`
+    runners by edge, read from the jump index and the board cache."""
+    now = datetime.now()
+    races = []
+    for jump_at, race_id in next_jumps(now, limit):
+        try:
+            board = get_race_board(race_id, min_edge=0.0, books=books)
+        except HTTPException as exc:
+            if exc.status_code != 404:
+                raise
+            continue  # Archived or removed since the index was read.
+        ranked = sorted((row for row in board["rows"] if row["edge_pct"] >= min_edge), key=lambda row: row["edge_pct"], reverse=True)
+        races.append(
+            {
+                **board["race"],
+                "jump_at": jump_at.isoformat(),
+                "seconds_to_jump": int((jump_at - now).total_seconds()),
+                "top_edges": [
+                    {field: row[field] for field in NEXT_TO_JUMP_FIELDS}
+                    for row in ranked[:top]
+                ],
+            }
+        )
+    return {"as_of": now.isoformat(timespec="seconds"), "min_edge": min_edge, "races": races}
+
+
+def run_scheduler_tick(now: Optional[datetime] = None, warm_ahead_s: Optional[float] = None) -> dict:
+    """Warm boards and signals for the races jumping within `warm_ahead_s`
+    (or jumped in the last JUMP_GRACE_S and still unresulted)."""
+    now = now or datetime.now()
+    warm_until = now + timedelta(seconds=SCHEDULER_WARM_AHEAD_S if warm_ahead_s is None else warm_ahead_s)
+    started = time.perf_counter()
+    due = next_jumps(now - timedelta(seconds=JUMP_GRACE_S), until=warm_until)
+    days = set()
+    for jump_at, race_id in due:
+        get_race_board(race_id, min_edge=0.0, books=None)
+        days.add(jump_at.date().isoformat())
+    for day in sorted(days):
+        get_race_signals(race_date=day, books=None, rec_edge=1.0)
+    upcoming = next_jumps(now, 1)
+
+    tick = {
+        "at": now.isoformat(timespec="seconds"),
+        "warmed": [race_id for _, race_id in due],
+        "next_jump": {"race_id": upcoming[0][1], "jump_at": upcoming[0][0].isoformat()} if upcoming else None,
+        "duration_ms": round((time.perf_counter() - started) * 1000.0, 3),
+    }
+    with jump_schedule_lock:
+        jump_schedule["ticks"] += 1
+        jump_schedule["last_tick"] = tick
+    return tick
+
+
+def jump_scheduler_loop() -> None:
+    while True:
+        try:
+            run_scheduler_tick()
+            jump_schedule["last_error"] = None
+        except Exception as exc:  # Keep ticking; the next one starts from a fresh index.
+            jump_schedule["last_error"] = repr(exc)
+            with jump_schedule_lock:
+                jump_schedule["data_version"] = jump_schedule["version"] = None
+        time.sleep(SCHEDULER_TICK_S)
+
+
+def start_jump_scheduler() -> None:
+    if not SCHEDULER_ENABLED or BOARD_CACHE_SIZE <= 0:
+        return
+    thread = jump_schedule["thread"]
+    if thread is not None and thread.is_alive():
+        return
+    thread = threading.Thread(target=jump_scheduler_loop, name="jump-scheduler", daemon=True)
+    jump_schedule["thread"] = thread
+    thread.start()
+
+
+# ---------------------------------------------------------------------------
+# Name search
+# ---------------------------------------------------------------------------
+
+# Matches scored per query; ranking every hit of a one-letter prefix across
+# hundreds of thousands of names would blow the autocomplete latency budget.
+SEARCH_CANDIDATES = 200
+SEARCH_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_search_names_insert AFTER INSERT ON search_names BEGIN
+      INSERT INTO search_names_fts(rowid, name, kind) VALUES (new.id, new.name, new.kind);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_search_names_delete AFTER DELETE ON search_names BEGIN
+      INSERT INTO search_names_fts(search_names_fts, rowid, name, kind) VALUES ('delete', old.id, old.name, old.kind);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_runners_search_insert AFTER INSERT ON runners BEGIN
+      INSERT OR IGNORE INTO search_names (kind, name)
+      VALUES ('horse', new.horse_name), ('jockey', new.jockey), ('trainer', new.trainer);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_runners_search_update AFTER UPDATE OF horse_name, jockey, trainer ON runners BEGIN
+      INSERT OR IGNORE INTO search_names (kind, name)
+      VALUES ('horse', new.horse_name), ('jockey', new.jockey), ('trainer', new.trainer);
+    END
+    """,
+]
+
+
+def ensure_search_schema(cur: sqlite3.Cursor) -> None:
+    # One row per distinct (kind, name); the FTS5 table indexes it as external
+    # content and triggers keep both in step with every insert into runners
+    # and runner_history, whichever ingest path writes them.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS search_names (
+            id INTEGER PRIMARY KEY,
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            UNIQUE(kind, name)
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_names_fts USING fts5(
+            name,
+            kind,
+            content='search_names',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='1 2 3'
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_runners_horse_name ON runners(horse_name)")
+    for trigger_sql in SEARCH_TRIGGERS:
+        cur.execute(trigger_sql)
+
+
+def rebuild_search_index(only_if_empty: bool = False) -> dict:
+    conn = get_conn(with_archive=True)
+    if only_if_empty and conn.execute("SELECT 1 FROM search_names LIMIT 1").fetchone():
+        conn.close()
+        return {"rebuilt": False}
+    conn.execute("DELETE FROM search_names")
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO search_names (kind, name)
+        SELECT 'horse', horse_name FROM runners_all
+        UNION SELECT 'jockey', jockey FROM runners_all
+        UNION SELECT 'trainer', trainer FROM runners_all
+        UNION SELECT 'jockey', jockey FROM runner_history_all
+        """
+    )
+    conn.execute("INSERT INTO search_names_fts(search_names_fts) VALUES ('optimize')")
+    count = conn.execute("SELECT COUNT(*) FROM search_names").fetchone()[0]
+    conn.commit()
+    conn.close()
+    return {"rebuilt": True, "names": count}
+
+
+def build_prefix_query(q: str, kind: Optional[str] = None) -> Optional[str]:
+    tokens = SEARCH_TOKEN_RE.findall(q)
+    if not tokens:
+        return None
+    # Every token must match as a prefix, e.g. "gol com" -> name : ("gol"* "com"*).
+    match = "name : (" + " ".join(f'"{t}"*' for t in tokens[:8]) + ")"
+    if kind:
+        match += f' AND kind : "{kind}"'
+    return match
+
+
+@app.get("/api/search")
+def search_names(
+    q: str = Query(..., min_length=1, max_length=100),
+    kind: Optional[Literal["horse", "jockey", "trainer"]] = Query(default=None),
+    limit: int = Query(default=10, ge=1, le=50),
+):
+    started = time.perf_counter()
+    match = build_prefix_query(q, kind)
+    if match is None:
+        return {"query": q, "results": [], "elapsed_ms": 0.0}
+    conn = get_conn()
+    rows = conn.execute(
+        """
+        SELECT
+          s.kind,
+          s.name,
+          CASE WHEN s.kind = 'horse'
+            THEN (SELECT MAX(r.id) FROM runners r WHERE r.horse_name = s.name)
+          END AS runner_id
+        FROM (
+          SELECT rowid AS id, rank
+          FROM search_names_fts
+          WHERE search_names_fts MATCH ?
+          ORDER BY rank
+          LIMIT ?
+        ) m
+        JOIN search_names s ON s.id = m.id
+        ORDER BY m.rank, length(s.name), s.name
+        LIMIT ?
+        """,
+        (match, SEARCH_CANDIDATES, limit),
+    ).fetchall()
+    conn.close()
+    return {
+        "query": q,
+        "results": [dict(r) for r in rows],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 2),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Streaming exports
+# ---------------------------------------------------------------------------
+
+EXPORT_CHUNK_ROWS = 1000
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def parse_export_date(value: Optional[str], field: str) -> Optional[str]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{field} must be YYYY-MM-DD.")
+
+
+def stream_export_rows(sql_template: str, params: list, fmt: str) -> Iterator[str]:
+    """Yield encoded chunks of EXPORT_CHUNK_ROWS rows straight off the cursor.
+
+    `sql_template` names its tables as `{db}.<table>` and is run once per
+    schema (archive first, then hot), so each pass is a plain indexed query
+    over base tables rather than a join across the union views.
+    """
+    # The response body is iterated from threadpool workers, one chunk at a time.
+    conn = get_conn(check_same_thread=False)
+    try:
+        schemas = ["main"]
+        if ARCHIVE_DB_PATH.exists():
+            conn.execute("ATTACH DATABASE ? AS archive", (str(ARCHIVE_DB_PATH),))
+            schemas.insert(0, "archive")
+        wrote_header = False
+        for db in schemas:
+            cur = conn.execute(sql_template.format(db=db), params)
+            columns = [d[0] for d in cur.description]
+            if fmt == "csv" and not wrote_header:
+                buf = io.StringIO()
+                csv.writer(buf).writerow(columns)
+                wrote_header = True
+                yield buf.getvalue()
+            while True:
+                rows = cur.fetchmany(EXPORT_CHUNK_ROWS)
+                if not rows:
+                    break
+                if fmt == "csv":
+                    buf = io.StringIO()
+                    csv.writer(buf).writerows(tuple(r) for r in rows)
+                    yield buf.getvalue()
+                else:
+                    yield "".join(json.dumps(dict(zip(columns, r))) + "\n" for r in rows)
+    finally:
+        conn.close()
+
+
+def export_response(sql_template: str, params: list, fmt: str, basename: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream_export_rows(sql_template, params, fmt),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{basename}.{fmt}"'},
+    )
+
+
+@app.get("/api/user/bets/export")
+def export_user_bets(
+    fmt: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format"),
+    start_date: Optional[str] = Query(default=None),
+    end_date: Optional[str] = Query(default=None),
+    track: Optional[str] = Query(default=None),
+):
+    clauses = ["t.user_id = 'demo'"]
+    params: list = []
+    start = parse_export_date(start_date, "start_date")
+    end = parse_export_date(end_date, "end_date")
+    if start:
+        clauses.append("ra.race_date >= ?")
+        params.append(start)
+    if end:
+        clauses.append("ra.race_date <= ?")
+        params.append(end)
+    if track:
+        clauses.append("ra.track = ?")
+        params.append(track)
+
+    sql = f"""
+        SELECT
+          t.id,
+          t.tracked_at,
+          t.race_id,
+          ra.race_date,
+          ra.track,
+          ra.race_number,
+          ra.distance_m,
+          r.horse_number AS back_number,
+          r.barrier,
+          r.horse_name,
+          t.bookmaker,
+          t.edge_pct,
+          t.odds_at_tip,
+          t.stake,
+          t.result,
+          t.settled_at,
+          rr.closing_odds
+        FROM {{db}}.tracked_tips t
+        JOIN {{db}}.runners r ON r.id = t.runner_id
+        JOIN {{db}}.races ra ON ra.id = t.race_id
+        LEFT JOIN {{db}}.race_results rr ON rr.race_id = t.race_id
+          AND rr.runner_id = t.runner_id
+        WHERE {' AND '.join(clauses)}
+        ORDER BY t.id
+    """
+    return export_response(sql, params, fmt, "bets")
+
+
+@app.get("/api/form/export")
+def export_form_history(
+    fmt: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format"),
+    start_date: Optional[str] = Query(default=None),
+    end_date: Optional[str] = Query(default=None),
+    track: Optional[str] = Query(default=None),
+    horse: Optional[str] = Query(default=None),
+    trainer: Optional[str] = Query(default=None),
+    jockey: Optional[str] = Query(default=None),
+):
+    clauses = []
+    params: list = []
+    start = parse_export_date(start_date, "start_date")
+    end = parse_export_date(end_date, "end_date")
+    # Filter on the stored day number so the range is not an expression per row.
+    if start:
+        clauses.append("h.run_day >= ?")
+        params.append((datetime.strptime(start, "%Y-%m-%d") - EPOCH).days)
+    if end:
+        clauses.append("h.run_day <= ?")
+        params.append((datetime.strptime(end, "%Y-%m-%d") - EPOCH).days)
+    if track:
+        clauses.append("h.track = ?")
+        params.append(track)
+    if horse:
+        clauses.append("r.horse_name = ?")
+        params.append(horse)
+    if trainer:
+        clauses.append("r.trainer = ?")
+        params.append(trainer)
+    if jockey:
+        clauses.append("h.jockey = ?")
+        params.append(jockey)
+    where_sql = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    sql = f"""
+        SELECT
+          h.runner_id,
+          r.horse_name,
+          r.trainer,
+          h.jockey,
+          h.run_date,
+          h.track,
+          h.distance_m,
+          h.finish_pos,
+          h.starting_price,
+          h.carried_weight_kg
+        FROM ({COMPACT_VIEWS["runner_history"].format(db="{db}.", src="")}) h
+        JOIN {{db}}.runners r ON r.id = h.runner_id
+        {where_sql}
+        ORDER BY h.id
+    """
+    return export_response(sql, params, fmt, "form-history")
+
+
+# ---------------------------------------------------------------------------
+# Form import
+# ---------------------------------------------------------------------------
+
+# Historical runs are streamed from CSV, NDJSON or JSON-array files and
+# written straight to runner_history_data in batches of FORM_IMPORT_BATCH_ROWS,
+# one transaction each, so memory stays bounded by the batch whatever the file
+# size. A run is form for the runner entries of its horse whose race comes
+# after it (or for `runner_id` when the row names one, as /api/form/export
+# rows do). The natural key is (horse, run_date, track): an existing run with
+# that key is updated in place, within a batch the last row wins, and
+# re-importing a file changes nothing.
+
+def resolve_form_import_dir() -> Path:
+    dir_value = os.getenv("HORSE_FORM_IMPORT_DIR", "imports").strip()
+    import_dir = Path(dir_value)
+    if not import_dir.is_absolute():
+        import_dir = PROJECT_DIR / import_dir
+    return import_dir.resolve()
+
+
+# The import endpoint only reads files under this directory.
+FORM_IMPORT_DIR = resolve_form_import_dir()
+FORM_IMPORT_BATCH_ROWS = 20000
+FORM_IMPORT_READ_BYTES = 1 << 20
+FORM_IMPORT_NAME_CHUNK = 500
+# Accepted column names per field; the first is what /api/form/export writes.
+FORM_IMPORT_COLUMNS = {
+    "runner_id": ("runner_id",),
+    "horse": ("horse_name", "horse"),
+    "run_date": ("run_date", "date"),
+    "track": ("track",),
+    "distance_m": ("distance_m", "distance"),
+    "finish_pos": ("finish_pos", "position"),
+    "starting_price": ("starting_price", "sp"),
+    "carried_weight_kg": ("carried_weight_kg", "weight"),
+    "jockey": ("jockey",),
+}
+
+form_import_status: dict = {}
+form_import_lock = threading.Lock()
+
+
+def iter_form_records(stream, fmt: str) -> Iterator[tuple[int, Optional[dict]]]:
+    """(record number, record) pairs read incrementally from a binary stream;
+    records that can't be decoded come through as None."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(text), start=2):
+            yield number, row
+        return
+    if fmt == "ndjson":
+        for number, line in enumerate(text, start=1):
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except ValueError:
+                    yield number, None
+        return
+    # JSON array: decode one element at a time out of a sliding buffer.
+    decoder = json.JSONDecoder()
+    buf = text.read(FORM_IMPORT_READ_BYTES).lstrip()
+    if not buf.startswith("["):
+        raise HTTPException(status_code=400, detail="JSON form files must be an array of objects.")
+    buf, pos, number = buf[1:], 0, 0
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        try:
+            record, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            chunk = text.read(FORM_IMPORT_READ_BYTES)
+            if not chunk:
+                if buf[pos:].strip():
+                    yield number + 1, None
+                return
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+        number += 1
+        yield number, record
+        pos = end
+        if pos > FORM_IMPORT_READ_BYTES:
+            buf, pos = buf[pos:], 0
+
+
+def parse_form_record(record: dict) -> tuple:
+    """(runner_id, horse, run_day, track, distance_m, finish_pos, sp_ticks,
+    carried_weight_hg, jockey); raises KeyError/ValueError/TypeError."""
+    values = {}
+    for field, names in FORM_IMPORT_COLUMNS.items():
+        values[field] = next((record[n] for n in names if record.get(n) not in (None, "")), None)
+    horse, track, jockey = (str(values[f] or "").strip() for f in ("horse", "track", "jockey"))
+    if not horse or not track or not jockey or values["run_date"] is None:
+        raise ValueError("horse, run_date, track and jockey are required")
+
+    def convert(field: str, to):
+        # Name the field, not the value: errors end up in API responses.
+        try:
+            return to(values[field])
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid {field}") from None
+
+    return (
+        convert("runner_id", int) if values["runner_id"] is not None else None,
+        horse,
+        convert("run_date", lambda v: (datetime.strptime(str(v)[:10], "%Y-%m-%d") - EPOCH).days),
+        track,
+        convert("distance_m", int),
+        convert("finish_pos", int),
+        convert("starting_price", lambda v: round(float(v) * PRICE_TICKS)),
+        convert("carried_weight_kg", lambda v: round(float(v) * WEIGHT_TICKS)),
+        jockey,
+    )
+
+
+def name_ids(conn: sqlite3.Connection, table: str, names: set[str]) -> dict[str, int]:
+    ids = {}
+    names_list = list(names)
+    for i in range(0, len(names_list), FORM_IMPORT_NAME_CHUNK):
+        chunk = names_list[i : i + FORM_IMPORT_NAME_CHUNK]
+        ph = ",".join("?" for _ in chunk)
+        ids.update({row[1]: row[0] for row in conn.execute(f"SELECT id, name FROM {table} WHERE name IN ({ph})", chunk)})
+    return ids
+
+
+def write_form_batch(conn: sqlite3.Connection, records: list[tuple]) -> dict:
+    # Every runner entry of each horse, with its race day, to attach runs to.
+    horses = {r[1] for r in records if r[0] is None}
+    entries: dict[str, list[tuple[int, int]]] = {}
+    horse_list = list(horses)
+    for i in range(0, len(horse_list), FORM_IMPORT_NAME_CHUNK):
+        chunk = horse_list[i : i + FORM_IMPORT_NAME_CHUNK]
+        ph = ",".join("?" for _ in chunk)
+        for row in conn.execute(
+            f"""
+            SELECT hs.name, r.id, {sql_epoch_day("ra.race_date")} AS race_day
+            FROM horses hs
+            JOIN runners r ON r.horse_id = hs.id
+            JOIN races ra ON ra.id = r.race_id
+            WHERE hs.name IN ({ph})
+            """,
+            chunk,
+        ):
+            entries.setdefault(row[0], []).append((row[1], row[2]))
+    explicit = {r[0] for r in records if r[0] is not None}
+    known_runners = set()
+    explicit_list = list(explicit)
+    for i in range(0, len(explicit_list), FORM_IMPORT_NAME_CHUNK):
+        chunk = explicit_list[i : i + FORM_IMPORT_NAME_CHUNK]
+        ph = ",".join("?" for _ in chunk)
+        known_runners.update(row[0] for row in conn.execute(f"SELECT id FROM runners WHERE id IN ({ph})", chunk))
+
+    tracks = {r[3] for r in records}
+    jockeys = {r[8] for r in records}
+    conn.executemany("INSERT OR IGNORE INTO tracks (name) VALUES (?)", [(t,) for t in tracks])
+    conn.executemany("INSERT OR IGNORE INTO people (name) VALUES (?)", [(j,) for j in jockeys])
+    conn.executemany("INSERT OR IGNORE INTO search_names (kind, name) VALUES ('jockey', ?)", [(j,) for j in jockeys])
+    track_ids = name_ids(conn, "tracks", tracks)
+    jockey_ids = name_ids(conn, "people", jockeys)
+
+    rows: dict[tuple, tuple] = {}
+    unmatched = 0
+    for runner_id, horse, run_day, track, distance_m, finish_pos, sp_ticks, weight_hg, jockey in records:
+        if runner_id is not None:
+            targets = [runner_id] if runner_id in known_runners else []
+        else:
+            targets = [rid for rid, race_day in entries.get(horse, ()) if race_day > run_day]
+        if not targets:
+            unmatched += 1
+        for target in targets:
+            key = (target, run_day, track_ids[track])
+            rows[key] = (distance_m, finish_pos, sp_ticks, weight_hg, jockey_ids[jockey], *key)
+
+    updated = conn.executemany(
+        """
+        UPDATE runner_history_data
+        SET distance_m = ?, finish_pos = ?, sp_ticks = ?, carried_weight_hg = ?, jockey_id = ?
+        WHERE runner_id = ? AND run_day = ? AND track_id = ?
+        """,
+        list(rows.values()),
+    ).rowcount
+    inserted = conn.executemany(
+        """
+        INSERT INTO runner_history_data (distance_m, finish_pos, sp_ticks, carried_weight_hg, jockey_id, runner_id, run_day, track_id)
+        SELECT ?, ?, ?, ?, ?, ?, ?, ?
+        WHERE NOT EXISTS (SELECT 1 FROM runner_history_data WHERE runner_id = ?6 AND run_day = ?7 AND track_id = ?8)
+        """,
+        list(rows.values()),
+    ).rowcount
+    conn.commit()
+    return {"inserted": inserted, "updated": updated, "unmatched": unmatched}
+
+
+def import_form_history(stream, fmt: str, batch_rows: int = FORM_IMPORT_BATCH_ROWS, progress=None) -> dict:
+    """Import a form file from a binary stream. `progress` is called with the
+    running totals after every batch."""
+    start = time.perf_counter()
+    stats = {"records": 0, "inserted": 0, "updated": 0, "unmatched": 0, "rejected": 0, "batches": 0}
+    errors: list[str] = []
+    batch: list[tuple] = []
+    conn = get_conn()
+
+    def flush() -> None:
+        for key, value in write_form_batch(conn, batch).items():
+            stats[key] += value
+        stats["batches"] += 1
+        batch.clear()
+        if progress:
+            elapsed = time.perf_counter() - start
+            progress({**stats, "elapsed_s": round(elapsed, 3), "rows_per_min": round(stats["records"] / elapsed * 60.0) if elapsed else None})
+
+    try:
+        for number, record in iter_form_records(stream, fmt):
+            stats["records"] += 1
+            try:
+                if not isinstance(record, dict):
+                    raise ValueError("not an object")
+                batch.append(parse_form_record(record))
+            except (KeyError, ValueError, TypeError) as exc:
+                stats["rejected"] += 1
+                if len(errors) < 20:
+                    errors.append(f"record {number}: {exc}")
+                continue
+            if len(batch) >= batch_rows:
+                flush()
+        if batch:
+            flush()
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - start
+    return {
+        **stats,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_min": round(stats["records"] / elapsed * 60.0) if elapsed else None,
+        "errors": errors,
+    }
+
+
+class FormImportRequest(BaseModel):
+    path: str
+    format: Optional[Literal["csv", "ndjson", "json"]] = None
+    batch_rows: int = FORM_IMPORT_BATCH_ROWS
+
+
+def form_file_format(path: Path, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    suffix = path.suffix.lower().lstrip(".")
+    if suffix not in {"csv", "ndjson", "json", "jsonl"}:
+        raise HTTPException(status_code=400, detail="Can't tell the file format; pass format=csv|ndjson|json.")
+    return "ndjson" if suffix == "jsonl" else suffix
+
+
+@app.post("/api/admin/form/import")
+def run_form_import(payload: FormImportRequest):
+    """Import a form file from the server's filesystem (it can be gigabytes;
+    uploading it through the API is not the point). Relative paths are taken
+    from FORM_IMPORT_DIR and nothing outside it is read."""
+    path = (FORM_IMPORT_DIR / payload.path).resolve()
+    if not path.is_relative_to(FORM_IMPORT_DIR):
+        raise HTTPException(status_code=400, detail="Form files must be inside the import directory.")
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Form file not found.")
+    if payload.batch_rows < 1:
+        raise HTTPException(status_code=400, detail="batch_rows must be positive.")
+    fmt = form_file_format(path, payload.format)
+
+    def report(status: dict) -> None:
+        with form_import_lock:
+            form_import_status.update(status, path=str(path), running=True)
+
+    with form_import_lock:
+        form_import_status.clear()
+        form_import_status.update(path=str(path), running=True)
+    try:
+        with path.open("rb") as stream:
+            result = import_form_history(stream, fmt, payload.batch_rows, report)
+    finally:
+        with form_import_lock:
+            form_import_status["running"] = False
+    with form_import_lock:
+        form_import_status.update(result)
+    return result
+
+
+@app.get("/api/admin/form/import")
+def get_form_import_status():
+    with form_import_lock:
+        return dict(form_import_status)
+
+
+# ---------------------------------------------------------------------------
+# Portfolio staking
+# ---------------------------------------------------------------------------
+
+
+def kelly_race_fractions(probs: list[float], odds: list[float]) -> list[float]:
+    """Full-Kelly bankroll fractions for simultaneous win bets in one race.
+
+    Runners in a race are mutually exclusive, so stakes are solved jointly
+    (Smoczynski & Tomkins): add runners in order of expected return p*o while
+    it beats the reserve rate R = (1 - sum p) / (1 - sum 1/o) of the set so
+    far, then stake f = p - R/o on each runner in the set.
+    """
+    order = sorted(range(len(probs)), key=lambda i: probs[i] * odds[i], reverse=True)
+    chosen: list[int] = []
+    p_sum = 0.0
+    inv_sum = 0.0
+    reserve = 1.0
+    for i in order:
+        if probs[i] * odds[i] <= reserve:
+            break
+        chosen.append(i)
+        p_sum += probs[i]
+        inv_sum += 1.0 / odds[i]
+        reserve = (1.0 - p_sum) / (1.0 - inv_sum) if inv_sum < 1.0 else 0.0
+    fractions = [0.0] * len(probs)
+    for i in chosen:
+        fractions[i] = max(probs[i] - (reserve / odds[i]), 0.0)
+    return fractions
+
+
+def optimize_portfolio(tips: list[dict], bankroll: float, kelly_fraction: float, max_exposure_pct: float) -> list[dict]:
+    """Fractional-Kelly stakes for a day's tips, solved race by race and then
+    scaled down together if the whole card would exceed max_exposure_pct."""
+    by_race: dict[int, list[dict]] = {}
+    for tip in tips:
+        by_race.setdefault(tip["race_id"], []).append(tip)
+
+    staked: list[dict] = []
+    for race_tips in by_race.values():
+        fractions = kelly_race_fractions(
+            [t["model_prob_pct"] / 100.0 for t in race_tips],
+            [t["market_odds"] for t in race_tips],
+        )
+        for tip, fraction in zip(race_tips, fractions):
+            if fraction > 0:
+                staked.append({**tip, "kelly_fraction_pct": fraction * kelly_fraction * 100.0})
+
+    exposure_pct = sum(t["kelly_fraction_pct"] for t in staked)
+    scale = min(1.0, max_exposure_pct / exposure_pct) if exposure_pct > 0 else 1.0
+    for tip in staked:
+        tip["kelly_fraction_pct"] = round(tip["kelly_fraction_pct"] * scale, 3)
+        tip["stake_units"] = round(bankroll * tip["kelly_fraction_pct"] / 100.0, 2)
+        tip["expected_profit_units"] = round(
+            tip["stake_units"] * ((tip["model_prob_pct"] / 100.0) * tip["market_odds"] - 1.0), 3
+        )
+    staked.sort(key=lambda t: t["stake_units"], reverse=True)
+    return staked
+
+
+@app.get("/api/tips/portfolio")
+def get_tips_portfolio(
+    race_date: Optional[str] = Query(default=None),
+    min_edge: Optional[float] = Query(default=None),
+    books: Optional[str] = Query(default=None),
+    kelly_fraction: float = Query(default=0.25, gt=0, le=1),
+    max_exposure_pct: float = Query(default=50.0, gt=0, le=100),
+):
+    started = time.perf_counter()
+    conn = get_conn()
+    settings = conn.execute(
+        "SELECT bankroll_units, default_min_edge FROM user_settings WHERE user_id = 'demo'"
+    ).fetchone()
+    conn.close()
+    bankroll = float(settings["bankroll_units"]) if settings else DEFAULT_USER_SETTINGS["bankroll_units"]
+    if min_edge is None:
+        min_edge = float(settings["default_min_edge"]) if settings else DEFAULT_USER_SETTINGS["default_min_edge"]
+
+    daily = get_daily_tips(race_date=race_date, min_edge=max(min_edge, 0.0), books=books)
+    stakes = optimize_portfolio(daily["tips"], bankroll, kelly_fraction, max_exposure_pct)
+    total_stake = sum(t["stake_units"] for t in stakes)
+    return {
+        "date": daily["date"],
+        "min_edge": min_edge,
+        "selected_books": daily["selected_books"],
+        "bankroll_units": bankroll,
+        "kelly_fraction": kelly_fraction,
+        "total_stake_units": round(total_stake, 2),
+        "exposure_pct": round((total_stake / bankroll) * 100.0, 2) if bankroll > 0 else 0.0,
+        "expected_profit_units": round(sum(t["expected_profit_units"] for t in stakes), 3),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 1),
+        "stakes": stakes,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Exotic pricing
+# ---------------------------------------------------------------------------
+
+# Bump when the model producing runners.model_prob changes; cached prices are keyed on it.
+MODEL_VERSION = os.getenv("HORSE_MODEL_VERSION", "1")
+# Benter's discounts for the 2nd/3rd place legs; (1.0, 1.0) is plain Harville.
+EXOTIC_DISCOUNTS = {"harville": (1.0, 1.0), "benter": (0.81, 0.65)}
+EXOTIC_CACHE_SIZE = 512
+
+exotic_cache: "OrderedDict[tuple, dict]" = OrderedDict()
+exotic_cache_lock = threading.Lock()
+
+
+def place_positions_for_field(field_size: int) -> int:
+    # Australian tote place terms.
+    if field_size <= 4:
+        return 0
+    return 2 if field_size <= 7 else 3
+
+
+def ordering_probabilities(win_probs: np.ndarray, variant: str) -> tuple[np.ndarray, np.ndarray]:
+    """Harville-style first-two and first-three ordering probabilities.
+
+    Returns (P2, P3) where P2[i, j] = P(i 1st, j 2nd) and
+    P3[i, j, k] = P(i 1st, j 2nd, k 3rd), computed as dense O(n^3) array
+    operations instead of enumerating permutations.
+    """
+    lambda2, lambda3 = EXOTIC_DISCOUNTS[variant]
+    p1 = win_probs / win_probs.sum()
+    p2 = p1 ** lambda2
+    p2 /= p2.sum()
+    p3 = p1 ** lambda3
+    p3 /= p3.sum()
+    n = len(p1)
+    eye = np.eye(n, dtype=bool)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        second = p2[None, :] / (1.0 - p2)[:, None]
+        pair2 = np.where(eye, 0.0, p1[:, None] * second)
+        remaining3 = 1.0 - p3[:, None] - p3[None, :]
+        third = p3[None, None, :] / remaining3[:, :, None]
+    distinct = ~(eye[:, :, None] | eye[:, None, :] | eye[None, :, :])
+    pair3 = np.where(distinct, pair2[:, :, None] * np.nan_to_num(third), 0.0)
+    return np.nan_to_num(pair2), pair3
+
+
+def compute_exotics(race_id: int, runners: list[dict], variant: str = "harville", limit: int = 20) -> dict:
+    """Fair place/quinella/trifecta prices for `runners` (each with runner_id,
+    horse_number and a normalized win_prob), memoized per race, model version
+    and input probabilities."""
+    key = (race_id, MODEL_VERSION, variant, limit, tuple((r["runner_id"], round(r["win_prob"], 10)) for r in runners))
+    with exotic_cache_lock:
+        cached = exotic_cache.get(key)
+        if cached is not None:
+            exotic_cache.move_to_end(key)
+            return cached
+
+    n = len(runners)
+    places = place_positions_for_field(n)
+    result: dict = {"variant": variant, "model_version": MODEL_VERSION, "place_positions": places, "place": [], "quinella": [], "trifecta": []}
+    if n >= 2:
+        win = np.array([max(r["win_prob"], 1e-9) for r in runners])
+        pair2, pair3 = ordering_probabilities(win, variant)
+        p1 = win / win.sum()
+        top2 = p1 + pair2.sum(axis=0)
+        top3 = top2 + pair3.sum(axis=(0, 1))
+        place_probs = top3 if places == 3 else top2
+
+        def fair(prob: float) -> Optional[float]:
+            return round(1.0 / prob, 2) if prob > 0 else None
+
+        numbers = [r["horse_number"] for r in runners]
+        for i, r in enumerate(runners):
+            prob = float(place_probs[i]) if places else 0.0
+            result["place"].append(
+                {
+                    "runner_id": r["runner_id"],
+                    "horse_number": r["horse_number"],
+                    "place_prob_pct": round(prob * 100.0, 2),
+                    "fair_place_price": fair(prob),
+                }
+            )
+
+        quinella = np.triu(pair2 + pair2.T, k=1)
+        q_idx = np.argsort(quinella, axis=None)[::-1][: min(limit, n * (n - 1) // 2)]
+        for flat in q_idx:
+            i, j = divmod(int(flat), n)
+            prob = float(quinella[i, j])
+            result["quinella"].append(
+                {"runners": [numbers[i], numbers[j]], "prob_pct": round(prob * 100.0, 3), "fair_price": fair(prob)}
+            )
+
+        if n >= 3:
+            t_idx = np.argsort(pair3, axis=None)[::-1][: min(limit, n * (n - 1) * (n - 2))]
+            for flat in t_idx:
+                i, rest = divmod(int(flat), n * n)
+                j, k = divmod(rest, n)
+                prob = float(pair3[i, j, k])
+                result["trifecta"].append(
+                    {"runners": [numbers[i], numbers[j], numbers[k]], "prob_pct": round(prob * 100.0, 3), "fair_price": fair(prob)}
+                )
+
+    with exotic_cache_lock:
+        exotic_cache[key] = result
+        while len(exotic_cache) > EXOTIC_CACHE_SIZE:
+            exotic_cache.popitem(last=False)
+    return result
+
+
+@app.get("/api/races/{race_id}/exotics")
+def get_race_exotics(
+    race_id: int,
+    variant: Literal["harville", "benter"] = Query(default="harville"),
+    limit: int = Query(default=20, ge=1, le=200),
+):
+    conn = get_conn()
+    rows = conn.execute(
+        """
+        SELECT id, horse_number, model_prob
+        FROM runners
+        WHERE race_id = ?
+        ORDER BY horse_number
+        """,
+        (race_id,),
+    ).fetchall()
+    conn.close()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Race not found.")
+    total = sum(float(r["model_prob"] or 0.0) for r in rows) or 1.0
+    runners = [
+        {"runner_id": r["id"], "horse_number": r["horse_number"], "win_prob": float(r["model_prob"] or 0.0) / total}
+        for r in rows
+    ]
+    return {"race_id": race_id, **compute_exotics(race_id, runners, variant, limit)}
+
+
+# ---------------------------------------------------------------------------
+# Race simulation
+# ---------------------------------------------------------------------------
+
+SIMULATION_SEED = int(os.getenv("HORSE_SIMULATION_SEED", "20260216"))
+SIMULATION_BATCH = 20000
+SIMULATION_CACHE_SIZE = 512
+
+simulation_cache: "OrderedDict[tuple, dict]" = OrderedDict()
+simulation_cache_lock = threading.Lock()
+
+
+def simulate_finishing_positions(strengths: np.ndarray, sims: int, seed: int) -> np.ndarray:
+    """Return a (runners x runners) matrix of finishing-position probabilities.
+
+    Each simulated race is a Plackett-Luce draw from the runner strengths,
+    sampled in vectorized batches with the Gumbel-max trick: sorting
+    log(strength) + Gumbel noise gives an exact Plackett-Luce ordering.
+    """
+    n = len(strengths)
+    log_strength = np.log(np.clip(strengths / strengths.sum(), 1e-12, None))
+    rng = np.random.default_rng(seed)
+    counts = np.zeros(n * n, dtype=np.int64)
+    runner_offsets = np.arange(n) * n
+    remaining = sims
+    while remaining > 0:
+        batch = min(remaining, SIMULATION_BATCH)
+        keys = log_strength + rng.gumbel(size=(batch, n))
+        order = np.argsort(-keys, axis=1)
+        positions = np.empty_like(order)
+        np.put_along_axis(positions, order, np.arange(n)[None, :], axis=1)
+        counts += np.bincount((positions + runner_offsets).ravel(), minlength=n * n)
+        remaining -= batch
+    return counts.reshape(n, n) / float(sims)
+
+
+def simulate_race(conn: sqlite3.Connection, race_id: int, sims: int, seed: int) -> dict:
+    runners = conn.execute(
+        """
+        SELECT id, horse_number, horse_name, model_prob
+        FROM runners
+        WHERE race_id = ?
+        ORDER BY horse_number
+        """,
+        (race_id,),
+    ).fetchall()
+    if not runners:
+        raise HTTPException(status_code=404, detail="Race not found.")
+
+    # Keyed on the inputs themselves, so a change to any model_prob misses the cache.
+    key = (race_id, sims, seed, tuple((r["id"], float(r["model_prob"] or 0.0)) for r in runners))
+    with simulation_cache_lock:
+        cached = simulation_cache.get(key)
+        if cached is not None:
+            simulation_cache.move_to_end(key)
+            return {**cached, "cached": True}
+
+    strengths = np.array([max(float(r["model_prob"] or 0.0), 0.0) for r in runners])
+    if strengths.sum() <= 0:
+        strengths = np.ones(len(runners))
+    position_probs = simulate_finishing_positions(strengths, sims, seed)
+    places = np.arange(1, len(runners) + 1)
+    result = {
+        "race_id": race_id,
+        "simulations": sims,
+        "seed": seed,
+        "runners": [
+            {
+                "runner_id": r["id"],
+                "horse_number": r["horse_number"],
+                "horse_name": r["horse_name"],
+                "win_prob_pct": round(float(position_probs[i, 0]) * 100.0, 2),
+                "top3_prob_pct": round(float(position_probs[i, :3].sum()) * 100.0, 2),
+                "expected_position": round(float((position_probs[i] * places).sum()), 2),
+                "position_probs": [round(float(p), 4) for p in position_probs[i]],
+            }
+            for i, r in enumerate(runners)
+        ],
+    }
+    with simulation_cache_lock:
+        simulation_cache[key] = result
+        while len(simulation_cache) > SIMULATION_CACHE_SIZE:
+            simulation_cache.popitem(last=False)
+    return {**result, "cached": False}
+
+
+@app.get("/api/races/{race_id}/simulation")
+def get_race_simulation(
+    race_id: int,
+    sims: int = Query(default=20000, ge=100, le=1000000),
+    seed: Optional[int] = Query(default=None),
+):
+    conn = get_conn()
+    try:
+        return simulate_race(conn, race_id, sims, SIMULATION_SEED + race_id if seed is None else seed)
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Backtesting
+# ---------------------------------------------------------------------------
+
+# Sweeps with fewer strategies than this run inline; pool start-up costs more.
+BACKTEST_POOL_MIN_STRATEGIES = 8
+BACKTEST_MAX_WORKERS = max(1, min(int(os.getenv("HORSE_BACKTEST_WORKERS", str(os.cpu_count() or 1))), 32))
+
+backtest_dataset: list = []
+
+
+class BacktestRequest(BaseModel):
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    track: Optional[str] = None
+    min_edges: list[float] = [1.0]
+    book_sets: list[list[str]] = []
+    staking: list[Literal["flat", "kelly"]] = ["flat"]
+    flat_stake: float = 1.0
+    kelly_fraction: float = 0.25
+    bankroll: float = 100.0
+
+
+def load_backtest_races(conn: sqlite3.Connection, start_date: Optional[str], end_date: Optional[str], track: Optional[str]) -> list[tuple]:
+    """Resulted races in jump order as compact, picklable tuples:
+    (race_id, race_date, ((runner_id, model_prob, finish_pos, closing_odds, ((book, odds), ...)), ...)).
+
+    Model probabilities are normalized per race, as on the board. Prices are
+    each book's current odds snapshot, not a price frozen at the jump: odds
+    writes don't stop once a race has results, so avg_clv_pct compares that
+    snapshot with the recorded closing odds rather than measuring true CLV.
+    """
+    clauses = ["EXISTS (SELECT 1 FROM race_results_all x WHERE x.race_id = ra.id)"]
+    params: list = []
+    if start_date:
+        clauses.append("ra.race_date >= ?")
+        params.append(start_date)
+    if end_date:
+        clauses.append("ra.race_date <= ?")
+        params.append(end_date)
+    if track:
+        clauses.append("ra.track = ?")
+        params.append(track)
+    rows = conn.execute(
+        f"""
+        SELECT ra.id AS race_id, ra.race_date, r.id AS runner_id, r.model_prob,
+               rr.finish_pos, rr.closing_odds, o.bookmaker, o.current_odds
+        FROM races_all ra
+        JOIN runners_all r ON r.race_id = ra.id
+        JOIN race_results_all rr ON rr.race_id = ra.id AND rr.runner_id = r.id
+        JOIN odds_all o ON o.runner_id = r.id
+        WHERE {' AND '.join(clauses)}
+        ORDER BY ra.race_date, ra.jump_time, ra.id, r.id
+        """,
+        params,
+    ).fetchall()
+
+    races: list[tuple] = []
+    current_race = None
+    runners: dict[int, list] = {}
+    for row in rows:
+        if current_race is None or row["race_id"] != current_race[0]:
+            if current_race is not None:
+                races.append(pack_backtest_race(current_race, runners))
+            current_race = (row["race_id"], row["race_date"])
+            runners = {}
+        entry = runners.setdefault(
+            row["runner_id"],
+            [float(row["model_prob"] or 0.0), int(row["finish_pos"]), float(row["closing_odds"] or 0.0), []],
+        )
+        entry[3].append((row["bookmaker"], float(row["current_odds"])))
+    if current_race is not None:
+        races.append(pack_backtest_race(current_race, runners))
+    return races
+
+
+def pack_backtest_race(race: tuple, runners: dict[int, list]) -> tuple:
+    total = sum(entry[0] for entry in runners.values()) or 1.0
+    packed = tuple(
+        (rid, entry[0] / total, entry[1], entry[2], tuple(entry[3]))
+        for rid, entry in runners.items()
+    )
+    return (race[0], race[1], packed)
+
+
+def run_backtest(races: list[tuple], strategy: dict) -> dict:
+    """Replay `races` in order under one strategy and report ROI, drawdown and CLV."""
+    min_edge = float(strategy["min_edge"])
+    books = set(strategy["books"])
+    staking = strategy["staking"]
+    flat_stake = float(strategy["flat_stake"])
+    kelly_fraction = float(strategy["kelly_fraction"])
+    bankroll = float(strategy["bankroll"])
+
+    equity = bankroll
+    peak = bankroll
+    max_drawdown = 0.0
+    max_drawdown_ratio = 0.0
+    bets = wins = 0
+    staked = 0.0
+    clv_total = 0.0
+    clv_count = 0
+    for _, _, runners in races:
+        # Stakes for one race are sized off the bankroll before it jumps.
+        race_start = equity
+        race_pnl = 0.0
+        picks = []
+        for _, prob, finish_pos, closing_odds, prices in runners:
+            best = 0.0
+            for book, odds in prices:
+                if book in books and odds > best:
+                    best = odds
+            if best > 1.0 and calc_edge_pct(prob, best) >= min_edge:
+                picks.append((prob, best, finish_pos, closing_odds))
+        if staking == "kelly":
+            # Runners in a race are mutually exclusive: size the race's bets together.
+            fractions = kelly_race_fractions([p[0] for p in picks], [p[1] for p in picks])
+            stakes = [race_start * kelly_fraction * f for f in fractions]
+        else:
+            stakes = [flat_stake] * len(picks)
+        for (_, best, finish_pos, closing_odds), stake in zip(picks, stakes):
+            if stake <= 0:
+                continue
+            bets += 1
+            staked += stake
+            if finish_pos == 1:
+                wins += 1
+                race_pnl += stake * (best - 1.0)
+            else:
+                race_pnl -= stake
+            if closing_odds > 1.0:
+                clv_total += ((best / closing_odds) - 1.0) * 100.0
+                clv_count += 1
+        equity += race_pnl
+        peak = max(peak, equity)
+        max_drawdown = max(max_drawdown, peak - equity)
+        if peak > 0:
+            max_drawdown_ratio = max(max_drawdown_ratio, min((peak - equity) / peak, 1.0))
+
+    profit = equity - bankroll
+    return {
+        **strategy,
+        "books": sorted(books),
+        "races": len(races),
+        "bets": bets,
+        "wins": wins,
+        "strike_rate_pct": round((wins / bets) * 100.0, 2) if bets else 0.0,
+        "staked_units": round(staked, 2),
+        "profit_units": round(profit, 2),
+        "roi_pct": round((profit / staked) * 100.0, 2) if staked else 0.0,
+        "final_bankroll": round(equity, 2),
+        "max_drawdown_units": round(max_drawdown, 2),
+        "max_drawdown_pct": round(max_drawdown_ratio * 100.0, 2),
+        "avg_clv_pct": round(clv_total / clv_count, 2) if clv_count else 0.0,
+    }
+
+
+def init_backtest_worker(races: list[tuple]) -> None:
+    # Each pool worker receives the dataset once, not once per strategy.
+    global backtest_dataset
+    backtest_dataset = races
+
+
+def run_backtest_in_worker(strategy: dict) -> dict:
+    return run_backtest(backtest_dataset, strategy)
+
+
+def run_backtest_sweep(races: list[tuple], strategies: list[dict], workers: int = BACKTEST_MAX_WORKERS) -> list[dict]:
+    if workers <= 1 or len(strategies) < BACKTEST_POOL_MIN_STRATEGIES:
+        return [run_backtest(races, strategy) for strategy in strategies]
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(strategies)),
+        initializer=init_backtest_worker,
+        initargs=(races,),
+    ) as pool:
+        chunksize = max(1, len(strategies) // (workers * 4))
+        return list(pool.map(run_backtest_in_worker, strategies, chunksize=chunksize))
+
+
+@app.post("/api/backtest")
+def backtest_strategies(payload: BacktestRequest):
+    book_sets = payload.book_sets or [BOOKMAKERS]
+    for book_set in book_sets:
+        if not book_set or any(b not in BOOKMAKERS for b in book_set):
+            raise HTTPException(status_code=400, detail="Each book set must list known bookmakers.")
+    if not payload.min_edges or not payload.staking:
+        raise HTTPException(status_code=400, detail="At least one min_edge and staking plan is required.")
+    if payload.bankroll <= 0 or payload.flat_stake <= 0 or not (0 < payload.kelly_fraction <= 1):
+        raise HTTPException(status_code=400, detail="bankroll and flat_stake must be positive, kelly_fraction in (0, 1].")
+    strategies = [
+        {
+            "min_edge": min_edge,
+            "books": sorted(set(book_set)),
+            "staking": staking,
+            "flat_stake": payload.flat_stake,
+            "kelly_fraction": payload.kelly_fraction,
+            "bankroll": payload.bankroll,
+        }
+        for min_edge in payload.min_edges
+        for book_set in book_sets
+        for staking in payload.staking
+    ]
+    if len(strategies) > 5000:
+        raise HTTPException(status_code=400, detail="Sweep is limited to 5000 strategies.")
+
+    conn = get_conn(with_archive=True)
+    races = load_backtest_races(conn, payload.start_date, payload.end_date, payload.track)
+    conn.close()
+
+    started = time.perf_counter()
+    results = run_backtest_sweep(races, strategies)
+    results.sort(key=lambda r: (r["roi_pct"], r["profit_units"]), reverse=True)
+    return {
+        "races": len(races),
+        "strategies": len(strategies),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 1),
+        "results": results,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Bankroll simulator
+# ---------------------------------------------------------------------------
+
+# Replays a user's settled bets under alternative staking plans. Each resample
+# is a bootstrap path of bets drawn with replacement from their own history;
+# all resamples for a plan are one (resamples x bets) array, so equity curves
+# are a cumsum (flat stakes) or cumprod (bankroll-proportional stakes) along
+# the bet axis and drawdowns a running maximum, with no per-bet Python loop.
+# Every plan sees the same resampled paths, so plans differ only by staking.
+
+SIM_MAX_CELLS = 50_000_000
+# Resample rows are processed in chunks of about this many cells to bound memory.
+SIM_CHUNK_CELLS = 2_000_000
+SIM_CURVE_POINTS = 50
+SIM_DRAWDOWN_BINS = 10
+
+
+class StakingPlan(BaseModel):
+    staking: Literal["flat", "percent", "kelly"]
+    # Units per bet (flat), percent of current bankroll (percent) or Kelly multiplier (kelly).
+    value: float
+
+
+class BankrollSimRequest(BaseModel):
+    plans: list[StakingPlan] = []
+    bankroll: Optional[float] = None
+    resamples: int = 1000
+    bets: Optional[int] = None
+    ruin_pct: float = 0.0
+    seed: Optional[int] = None
+
+
+def staking_steps(plan: StakingPlan, odds: np.ndarray, won: np.ndarray, edge_pct: np.ndarray) -> tuple[bool, np.ndarray]:
+    """(additive, per-bet step): P&L in units for flat stakes, otherwise the
+    bankroll growth factor of each bet."""
+    if plan.staking == "flat":
+        return True, np.where(won, plan.value * (odds - 1.0), -plan.value)
+    if plan.staking == "percent":
+        fraction = np.full(odds.shape, plan.value / 100.0)
+    else:
+        # Full Kelly for a single win bet: (p*o - 1) / (o - 1), with p*o - 1 the recorded edge.
+        fraction = plan.value * np.clip((edge_pct / 100.0) / (odds - 1.0), 0.0, 1.0)
+    return False, np.where(won, 1.0 + fraction * (odds - 1.0), 1.0 - fraction)
+
+
+def equity_paths(additive: bool, steps: np.ndarray, bankroll: float, ruin_level: float) -> tuple[np.ndarray, np.ndarray]:
+    """Equity after every bet for each row of `steps` (overwritten), frozen
+    from the first bet that takes it to `ruin_level` or below, plus the
+    per-row ruin flags."""
+    if additive:
+        equity = np.cumsum(steps, axis=1, out=steps)
+        equity += bankroll
+    else:
+        equity = np.cumprod(steps, axis=1, out=steps)
+        equity *= bankroll
+    below = equity <= ruin_level
+    ruined = below.any(axis=1)
+    rows = np.flatnonzero(ruined)
+    if len(rows):
+        first = below[rows].argmax(axis=1)
+        frozen = equity[rows]
+        np.copyto(frozen, frozen[np.arange(len(rows)), first][:, None], where=np.arange(equity.shape[1]) > first[:, None])
+        equity[rows] = frozen
+    return equity, ruined
+
+
+def max_drawdown_pct(equity: np.ndarray, bankroll: float) -> np.ndarray:
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, bankroll, out=peak)
+    # Deepest point relative to the running peak: 1 - min(equity / peak).
+    np.divide(equity, peak, out=peak)
+    # Flat stakes can overdraw past zero on the ruining bet; count that as 100%.
+    return np.clip(1.0 - peak.min(axis=1).astype(float), 0.0, 1.0) * 100.0
+
+
+def percentiles(values: np.ndarray, points: tuple[int, ...]) -> dict:
+    return {f"p{p}": round(float(v), 2) for p, v in zip(points, np.percentile(values, points))}
+
+
+def simulate_bankroll(
+    odds: np.ndarray,
+    won: np.ndarray,
+    edge_pct: np.ndarray,
+    plans: list[StakingPlan],
+    bankroll: float,
+    resamples: int,
+    path_bets: int,
+    ruin_pct: float = 0.0,
+    seed: Optional[int] = None,
+) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    ruin_level = bankroll * ruin_pct / 100.0
+    # float32 halves memory traffic; bootstrap noise dwarfs its rounding error.
+    steps = [(additive, step.astype(np.float32)) for additive, step in (staking_steps(p, odds, won, edge_pct) for p in plans)]
+    checkpoints = np.unique(np.linspace(0, path_bets - 1, min(path_bets, SIM_CURVE_POINTS)).round().astype(int))
+    finals = np.empty((len(plans), resamples))
+    drawdowns = np.empty((len(plans), resamples))
+    ruined = np.empty((len(plans), resamples), dtype=bool)
+    curves = np.empty((len(plans), resamples, len(checkpoints)))
+
+    rows = max(1, SIM_CHUNK_CELLS // path_bets)
+    for start in range(0, resamples, rows):
+        stop = min(start + rows, resamples)
+        sample = rng.integers(0, len(odds), size=(stop - start, path_bets), dtype=np.int32)
+        for i, (additive, step) in enumerate(steps):
+            equity, ruined[i, start:stop] = equity_paths(additive, step[sample], bankroll, ruin_level)
+            finals[i, start:stop] = equity[:, -1]
+            drawdowns[i, start:stop] = max_drawdown_pct(equity, bankroll)
+            curves[i, start:stop] = equity[:, checkpoints]
+
+    results = []
+    for i, plan in enumerate(plans):
+        realized, realized_ruin = equity_paths(steps[i][0], steps[i][1][None, :].copy(), bankroll, ruin_level)
+        histogram, _ = np.histogram(drawdowns[i], bins=SIM_DRAWDOWN_BINS, range=(0.0, 100.0))
+        bands = np.percentile(curves[i], (5, 50, 95), axis=0)
+        results.append(
+            {
+                "staking": plan.staking,
+                "value": plan.value,
+                "realized": {
+                    "final_bankroll": round(float(realized[0, -1]), 2),
+                    "max_drawdown_pct": round(float(max_drawdown_pct(realized, bankroll)[0]), 2),
+                    "ruined": bool(realized_ruin[0]),
+                },
+                "final_bankroll": {
+                    "mean": round(float(finals[i].mean()), 2),
+                    **percentiles(finals[i], (5, 25, 50, 75, 95)),
+                },
+                "profit_probability_pct": round(float((finals[i] > bankroll).mean()) * 100.0, 2),
+                "ruin_probability_pct": round(float(ruined[i].mean()) * 100.0, 2),
+                "max_drawdown_pct": {
+                    "mean": round(float(drawdowns[i].mean()), 2),
+                    **percentiles(drawdowns[i], (50, 95, 99)),
+                },
+                # Share of resamples per 10-point band of max drawdown, 0-10% first.
+                "drawdown_histogram_pct": [round(float(c) * 100.0 / resamples, 2) for c in histogram],
+                "equity_curve": {
+                    "bet": (checkpoints + 1).tolist(),
+                    **{name: np.round(band, 2).tolist() for name, band in zip(("p5", "p50", "p95"), bands)},
+                },
+            }
+        )
+    return results
+
+
+@app.post("/api/user/bets/simulate")
+def simulate_user_bankroll(payload: BankrollSimRequest):
+    conn = get_conn(with_archive=True)
+    settlement = settle_pending_tips(conn)
+    conn.commit()
+    settings = conn.execute("SELECT default_stake, bankroll_units FROM user_settings WHERE user_id = 'demo'").fetchone()
+    rows = conn.execute(
+        """
+        SELECT odds_at_tip, edge_pct, result
+        FROM tracked_tips_all
+        WHERE user_id = 'demo' AND result IN ('won', 'lost') AND odds_at_tip > 1
+        ORDER BY tracked_at ASC
+        """
+    ).fetchall()
+    conn.close()
+    if not rows:
+        raise HTTPException(status_code=400, detail="No settled bets to simulate.")
+
+    default_stake = float(settings["default_stake"]) if settings else DEFAULT_USER_SETTINGS["default_stake"]
+    bankroll = payload.bankroll or (float(settings["bankroll_units"]) if settings else DEFAULT_USER_SETTINGS["bankroll_units"])
+    plans = payload.plans or [
+        StakingPlan(staking="flat", value=default_stake),
+        StakingPlan(staking="percent", value=round(default_stake / bankroll * 100.0, 3)),
+        StakingPlan(staking="kelly", value=0.25),
+    ]
+    path_bets = payload.bets or len(rows)
+    if bankroll <= 0:
+        raise HTTPException(status_code=400, detail="bankroll must be positive.")
+    if not (1 <= payload.resamples <= 10000) or path_bets < 1:
+        raise HTTPException(status_code=400, detail="resamples must be 1-10000 and bets positive.")
+    if payload.resamples * path_bets * len(plans) > SIM_MAX_CELLS:
+        raise HTTPException(status_code=400, detail=f"resamples x bets x plans is limited to {SIM_MAX_CELLS:,}.")
+    if not (0 <= payload.ruin_pct < 100):
+        raise HTTPException(status_code=400, detail="ruin_pct must be in [0, 100).")
+    for plan in plans:
+        if plan.value <= 0 or (plan.staking == "percent" and plan.value > 100) or (plan.staking == "kelly" and plan.value > 1):
+            raise HTTPException(
+                status_code=400,
+                detail="Plan values must be positive: flat in units, percent up to 100, kelly up to 1.",
+            )
+
+    started = time.perf_counter()
+    results = simulate_bankroll(
+        np.array([float(r["odds_at_tip"]) for r in rows]),
+        np.array([r["result"] == "won" for r in rows]),
+        np.array([float(r["edge_pct"]) for r in rows]),
+        plans,
+        bankroll,
+        payload.resamples,
+        path_bets,
+        payload.ruin_pct,
+        payload.seed,
+    )
+    return {
+        "auto_settlement": settlement,
+        "settled_bets": len(rows),
+        "bets": path_bets,
+        "resamples": payload.resamples,
+        "bankroll_units": bankroll,
+        "ruin_pct": payload.ruin_pct,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 1),
+        "plans": results,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Odds providers
+# ---------------------------------------------------------------------------
+
+# Live prices arrive through provider adapters. Each provider fetches one race
+# per request under its own concurrency limit and token-bucket rate limit, and
+# retries throttled (429), unavailable (5xx), timed-out or dropped requests with
+# jittered exponential backoff, honouring Retry-After. Fetched quotes go onto a
+# bounded queue drained by a single writer that applies them to odds_data in
+# batches, so a slow DB holds the fetchers back instead of buffering without
+# limit. HORSE_ODDS_FEEDS lists HTTP JSON feeds as `name=url,...`;
+# start_mock_odds_feed() serves the same protocol locally from the runners in
+# the DB (`python -m app.main mock-feed --port 8765`).
+
+ODDS_FEEDS = os.getenv("HORSE_ODDS_FEEDS", "")
+FEED_CONCURRENCY = int(os.getenv("HORSE_FEED_CONCURRENCY", "8"))
+FEED_RATE_PER_S = float(os.getenv("HORSE_FEED_RATE_PER_S", "20"))
+FEED_MAX_RETRIES = int(os.getenv("HORSE_FEED_MAX_RETRIES", "3"))
+FEED_TIMEOUT_S = float(os.getenv("HORSE_FEED_TIMEOUT_S", "5"))
+ODDS_INGEST_BATCH_ROWS = 2000
+ODDS_INGEST_QUEUE_SIZE = 64
+FEED_MAX_BACKOFF_S = 5.0
+
+
+class ProviderError(Exception):
+    def __init__(self, message: str, retryable: bool = True, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Token bucket shared by every request to one provider."""
+
+    def __init__(self, rate_per_s: float, burst: Optional[int] = None):
+        self.rate = rate_per_s
+        self.capacity = float(burst or max(1, int(rate_per_s)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+
+class OddsProvider(abc.ABC):
+    """Adapter base: subclasses implement fetch_race(), returning quotes as
+    dicts with runner_id, bookmaker and odds."""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = FEED_CONCURRENCY,
+        rate_per_s: float = FEED_RATE_PER_S,
+        max_retries: int = FEED_MAX_RETRIES,
+        timeout_s: float = FEED_TIMEOUT_S,
+        backoff_s: float = 0.25,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.rate_per_s = rate_per_s
+        self.max_retries = max_retries
+        self.timeout_s = timeout_s
+        self.backoff_s = backoff_s
+
+    @abc.abstractmethod
+    async def fetch_race(self, race_id: int) -> list[dict]:
+        ...
+
+
+async def http_get(url: str) -> tuple[int, dict[str, str], bytes]:
+    """Minimal HTTP/1.0 GET on asyncio streams (no client dependency)."""
+    parts = urllib.parse.urlsplit(url)
+    secure = parts.scheme == "https"
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or (443 if secure else 80), ssl=secure or None)
+    try:
+        target = parts.path or "/"
+        if parts.query:
+            target += f"?{parts.query}"
+        writer.write(f"GET {target} HTTP/1.0\r\nHost: {parts.netloc}\r\nAccept: application/json\r\n\r\n".encode())
+        await writer.drain()
+        raw = await reader.read()
+    finally:
+        writer.close()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        status = int(lines[0].split()[1])
+    except (IndexError, ValueError):
+        raise ProviderError(f"Malformed response from {parts.netloc}.")
+    headers = {}
+    for line in lines[1:]:
+        key, _, value = line.partition(":")
+        headers[key.strip().lower()] = value.strip()
+    return status, headers, body
+
+
+class HttpJsonOddsProvider(OddsProvider):
+    """GET {base_url}/odds?race_id=N -> {"race_id": N, "quotes": [{runner_id, bookmaker, odds}, ...]}."""
+
+    def __init__(self, name: str, base_url: str, **kwargs):
+        super().__init__(name, **kwargs)
+        self.base_url = base_url.rstrip("/")
+
+    async def fetch_race(self, race_id: int) -> list[dict]:
+        status, headers, body = await http_get(f"{self.base_url}/odds?race_id={race_id}")
+        if status == 429 or status >= 500:
+            retry_after = headers.get("retry-after")
+            raise ProviderError(
+                f"{self.name} returned {status} for race {race_id}.",
+                retry_after=float(retry_after) if retry_after else None,
+            )
+        if status != 200:
+            raise ProviderError(f"{self.name} returned {status} for race {race_id}.", retryable=False)
+        try:
+            quotes = json.loads(body)["quotes"]
+        except (ValueError, KeyError, TypeError):
+            raise ProviderError(f"{self.name} sent an unreadable body for race {race_id}.")
+        if not isinstance(quotes, list):
+            raise ProviderError(f"{self.name} sent no quote list for race {race_id}.", retryable=False)
+        return quotes
+
+
+def configured_odds_providers() -> dict[str, OddsProvider]:
+    providers = {}
+    for entry in ODDS_FEEDS.split(","):
+        name, _, url = entry.partition("=")
+        if name.strip() and url.strip():
+            providers[name.strip()] = HttpJsonOddsProvider(name.strip(), url.strip())
+    return providers
+
+
+def write_odds_batch(conn: sqlite3.Connection, quotes: list[tuple]) -> dict:
+    """Apply (runner_id, bookmaker, odds, received_at) quotes to odds_data in
+    one transaction, then refresh best prices and run an alert tick for the
+    races touched. Unknown runners are skipped."""
+    for book in {q[1] for q in quotes}:
+        conn.execute("INSERT OR IGNORE INTO bookmakers (code) VALUES (?)", (book,))
+    book_ids = {row["code"]: row["id"] for row in conn.execute("SELECT id, code FROM bookmakers")}
+    rows = [
+        (round(odds * PRICE_TICKS), (received_at - EPOCH) // timedelta(microseconds=1), runner_id, book_ids[book])
+        for runner_id, book, odds, received_at in quotes
+    ]
+    conn.executemany("UPDATE odds_data SET price_ticks = ?, updated_us = ? WHERE runner_id = ? AND bookmaker_id = ?", rows)
+    conn.executemany(
+        """
+        INSERT INTO odds_data (price_ticks, updated_us, runner_id, bookmaker_id)
+        SELECT ?, ?, ?, ?
+        WHERE EXISTS (SELECT 1 FROM runners WHERE id = ?3)
+          AND NOT EXISTS (SELECT 1 FROM odds_data WHERE runner_id = ?3 AND bookmaker_id = ?4)
+        """,
+        rows,
+    )
+    runner_ids = sorted({q[0] for q in quotes})
+    ph = ",".join("?" for _ in runner_ids)
+    race_ids = [row[0] for row in conn.execute(f"SELECT DISTINCT race_id FROM runners WHERE id IN ({ph})", runner_ids)]
+    refresh_best_prices(conn, race_ids)
+    evaluate_alerts(conn)
+    conn.commit()
+    return {"rows": len(rows), "races": len(race_ids)}
+
+
+def valid_quote(quote) -> bool:
+    try:
+        return (
+            isinstance(quote["runner_id"], int)
+            and quote["bookmaker"] in BOOKMAKERS
+            and 1.0 < float(quote["odds"]) < 10000.0
+        )
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+async def ingest_odds(
+    providers: list[OddsProvider],
+    race_ids: list[int],
+    batch_rows: int = ODDS_INGEST_BATCH_ROWS,
+    queue_size: int = ODDS_INGEST_QUEUE_SIZE,
+) -> dict:
+    start = time.perf_counter()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    stats = {p.name: {"requests": 0, "retries": 0, "failures": 0, "quotes": 0, "rejected": 0} for p in providers}
+    totals = {"rows_written": 0, "batches": 0, "max_queue_depth": 0}
+    errors: list[str] = []
+
+    async def fetch(provider: OddsProvider, race_id: int, slots: asyncio.Semaphore, limiter: RateLimiter) -> None:
+        provider_stats = stats[provider.name]
+        async with slots:
+            for attempt in range(provider.max_retries + 1):
+                await limiter.acquire()
+                provider_stats["requests"] += 1
+                try:
+                    quotes = await asyncio.wait_for(provider.fetch_race(race_id), provider.timeout_s)
+                    break
+                except (ProviderError, asyncio.TimeoutError, OSError) as exc:
+                    retryable = getattr(exc, "retryable", True)
+                    if not retryable or attempt == provider.max_retries:
+                        provider_stats["failures"] += 1
+                        errors.append(f"{provider.name} race {race_id}: {exc or type(exc).__name__}")
+                        return
+                    provider_stats["retries"] += 1
+                    delay = getattr(exc, "retry_after", None)
+                    if delay is None:
+                        delay = provider.backoff_s * (2 ** attempt) * random.uniform(0.5, 1.5)
+                    await asyncio.sleep(min(delay, FEED_MAX_BACKOFF_S))
+        if not isinstance(quotes, list):
+            # Any adapter's bad payload fails this race only, like other provider faults.
+            provider_stats["failures"] += 1
+            errors.append(f"{provider.name} race {race_id}: quotes is not a list")
+            return
+        received_at = datetime.utcnow()
+        accepted = [(q["runner_id"], q["bookmaker"], float(q["odds"]), received_at) for q in quotes if valid_quote(q)]
+        provider_stats["quotes"] += len(accepted)
+        provider_stats["rejected"] += len(quotes) - len(accepted)
+        # Blocks while the writer is behind: backpressure on the fetchers.
+        await queue.put(accepted)
+        totals["max_queue_depth"] = max(totals["max_queue_depth"], queue.qsize())
+
+    async def write() -> None:
+        conn = get_conn(check_same_thread=False)
+        pending: list[tuple] = []
+
+        async def flush() -> None:
+            result = await asyncio.to_thread(write_odds_batch, conn, pending[:])
+            totals["rows_written"] += result["rows"]
+            totals["batches"] += 1
+            pending.clear()
+
+        try:
+            while (item := await queue.get()) is not None:
+                pending.extend(item)
+                if len(pending) >= batch_rows:
+                    await flush()
+            if pending:
+                await flush()
+        finally:
+            conn.close()
+
+    writer = asyncio.create_task(write())
+    fetchers = []
+    for provider in providers:
+        slots = asyncio.Semaphore(provider.max_concurrency)
+        limiter = RateLimiter(provider.rate_per_s)
+        fetchers.extend(asyncio.create_task(fetch(provider, race_id, slots, limiter)) for race_id in race_ids)
+
+    async def feed() -> None:
+        await asyncio.gather(*fetchers)
+        await queue.put(None)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        # Watch the writer next to the fetchers: if it dies, fetchers blocked
+        # on the full queue would otherwise wait forever.
+        await asyncio.wait([feeder, writer], return_when=asyncio.FIRST_EXCEPTION)
+        for task in (writer, feeder):
+            if task.done():
+                task.result()
+    finally:
+        for task in (feeder, writer, *fetchers):
+            task.cancel()
+        # wait_for() can swallow a cancel that lands as a request completes,
+        # leaving that fetcher in queue.put(): drain until every task exits.
+        running = {feeder, writer, *fetchers}
+        while running:
+            _, running = await asyncio.wait(running, timeout=0.05)
+            while not queue.empty():
+                queue.get_nowait()
+
+    elapsed = time.perf_counter() - start
+    quotes = sum(s["quotes"] for s in stats.values())
+    return {
+        "races": len(race_ids),
+        "providers": stats,
+        **totals,
+        "quotes": quotes,
+        "elapsed_s": round(elapsed, 3),
+        "quotes_per_s": round(quotes / elapsed, 1) if elapsed > 0 else None,
+        "errors": errors[:20],
+    }
+
+
+class OddsIngestRequest(BaseModel):
+    race_date: Optional[str] = None
+    race_ids: list[int] = []
+    providers: list[str] = []
+
+
+@app.post("/api/admin/odds/ingest")
+def run_odds_ingest(payload: OddsIngestRequest):
+    available = configured_odds_providers()
+    names = payload.providers or list(available)
+    if not names:
+        raise HTTPException(status_code=400, detail="No odds providers configured (HORSE_ODDS_FEEDS).")
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown providers: {', '.join(unknown)}.")
+    race_ids = payload.race_ids
+    if not race_ids:
+        day = payload.race_date or datetime.now().date().isoformat()
+        conn = get_conn()
+        race_ids = [row["id"] for row in conn.execute("SELECT id FROM races WHERE race_date = ? ORDER BY id", (day,))]
+        conn.close()
+    if not race_ids:
+        raise HTTPException(status_code=404, detail="No races to ingest.")
+    return asyncio.run(ingest_odds([available[name] for name in names], race_ids))
+
+
+async def start_mock_odds_feed(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    latency_s: float = 0.0,
+    error_rate: float = 0.0,
+    max_inflight: Optional[int] = None,
+    seed: int = 0,
+) -> asyncio.AbstractServer:
+    """Local feed speaking HttpJsonOddsProvider's protocol: prices are a random
+    walk around each runner's predicted price for every bookmaker. Requests
+    beyond `max_inflight` get 429 and `error_rate` of the rest get 503, to
+    exercise throttling and retries offline."""
+    conn = get_conn()
+    runners_by_race: dict[int, list[tuple[int, float]]] = {}
+    for row in conn.execute("SELECT id, race_id, predicted_price FROM runners ORDER BY id"):
+        runners_by_race.setdefault(row["race_id"], []).append((row["id"], row["predicted_price"]))
+    conn.close()
+    rng = random.Random(seed)
+    inflight = 0
+
+    def respond(status: int, payload: dict, extra: str = "") -> bytes:
+        body = json.dumps(payload).encode()
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 429: "Too Many Requests", 503: "Service Unavailable"}[status]
+        head = f"HTTP/1.0 {status} {reason}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n{extra}\r\n"
+        return head.encode() + body
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        nonlocal inflight
+        inflight += 1
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            target = urllib.parse.urlsplit(request_line[1] if len(request_line) > 1 else "/")
+            query = urllib.parse.parse_qs(target.query)
+            if max_inflight is not None and inflight > max_inflight:
+                writer.write(respond(429, {"error": "busy"}, "Retry-After: 0.05\r\n"))
+            elif target.path.rstrip("/").split("/")[-1] != "odds" or not query.get("race_id", [""])[0].isdigit():
+                writer.write(respond(400, {"error": "expected /odds?race_id=N"}))
+            elif rng.random() < error_rate:
+                writer.write(respond(503, {"error": "unavailable"}))
+            else:
+                race_id = int(query["race_id"][0])
+                if latency_s:
+                    await asyncio.sleep(latency_s)
+                runners = runners_by_race.get(race_id)
+                if runners is None:
+                    writer.write(respond(404, {"error": "unknown race"}))
+                else:
+                    quotes = [
+                        {"runner_id": runner_id, "bookmaker": book, "odds": round(max(1.2, price * rng.uniform(0.9, 1.1)), 2)}
+                        for runner_id, price in runners
+                        for book in BOOKMAKERS
+                    ]
+                    writer.write(respond(200, {"race_id": race_id, "quotes": quotes}))
+            await writer.drain()
+        finally:
+            inflight -= 1
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+# ---------------------------------------------------------------------------
+# Admin diagnostics
+# ---------------------------------------------------------------------------
+
+
+@app.get("/api/admin/slow-queries")
+def get_slow_queries(limit: int = Query(default=50, ge=1, le=1000)):
+    with slow_query_lock:
+        entries = list(slow_query_log)
+    entries.reverse()
+    return {
+        "threshold_ms": SLOW_QUERY_MS,
+        "capacity": slow_query_log.maxlen,
+        "count": len(entries),
+        "queries": entries[:limit],
+    }
+
+
+@app.delete("/api/admin/slow-queries")
+def clear_slow_queries():
+    with slow_query_lock:
+        slow_query_log.clear()
+    return {"status": "ok"}
+
+
+@app.get("/api/admin/alerts/ticks")
+def get_alert_ticks(limit: int = Query(default=50, ge=1, le=1000)):
+    with alert_tick_lock:
+        ticks = list(alert_tick_log)
+    durations = sorted(t["duration_ms"] for t in ticks)
+    ticks.reverse()
+    return {
+        "capacity": alert_tick_log.maxlen,
+        "count": len(ticks),
+        "p50_ms": durations[len(durations) // 2] if durations else None,
+        "max_ms": durations[-1] if durations else None,
+        "ticks": ticks[:limit],
+    }
+
+
+@app.post("/api/admin/alerts/evaluate")
+def run_alert_tick():
+    conn = get_conn()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        tick = evaluate_alerts(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    return {"tick": tick}
+
+
+@app.get("/api/admin/settlements")
+def get_settlements(limit: int = Query(default=50, ge=1, le=1000)):
+    with settlement_lock:
+        passes = list(settlement_log)
+    durations = sorted(p["duration_ms"] for p in passes)
+    passes.reverse()
+    return {
+        "capacity": settlement_log.maxlen,
+        "count": len(passes),
+        "p50_ms": durations[len(durations) // 2] if durations else None,
+        "max_ms": durations[-1] if durations else None,
+        "tips_settled": sum(p["settled"] for p in passes),
+        "passes": passes[:limit],
+    }
+
+
+@app.get("/api/admin/board-cache")
+def get_board_cache_stats():
+    with board_cache_lock:
+        state = board_cache_state
+        return {
+            "capacity": BOARD_CACHE_SIZE,
+            "entries": len(board_cache),
+            "signal_entries": len(signals_cache),
+            "hits": state["hits"],
+            "misses": state["misses"],
+            "invalidations": state["invalidations"],
+            "data_version": state["data_version"],
+            "board_version": state["board_version"],
+            "history_version": state["history_version"],
+        }
+
+
+@app.get("/api/admin/scheduler")
+def get_scheduler_status(limit: int = Query(default=20, ge=1, le=500)):
+    now = datetime.now()
+    upcoming = next_jumps(now, limit)
+    with jump_schedule_lock:
+        thread = jump_schedule["thread"]
+        status = {
+            "enabled": SCHEDULER_ENABLED,
+            "running": thread is not None and thread.is_alive(),
+            "tick_s": SCHEDULER_TICK_S,
+            "warm_ahead_s": SCHEDULER_WARM_AHEAD_S,
+            "indexed": len(jump_schedule["index"]),
+            "applied_changes": jump_schedule["applied"],
+            "ticks": jump_schedule["ticks"],
+            "last_tick": jump_schedule["last_tick"],
+            "last_error": jump_schedule["last_error"],
+        }
+    status["upcoming"] = [
+        {
+            "race_id": race_id,
+            "jump_at": jump_at.isoformat(),
+            "refresh_after_s": refresh_after_s(jump_at.date().isoformat(), jump_at.strftime("%H:%M"), False, now),
+        }
+        for jump_at, race_id in upcoming
+    ]
+    return status
+
+
+@app.post("/api/admin/scheduler/tick")
+def run_scheduler_tick_now():
+    return {"tick": run_scheduler_tick()}
+
+
+@app.get("/api/admin/profiles")
+def list_profiles():
+    files = sorted(PROFILE_DIR.glob("*.prof"), key=lambda p: p.stat().st_mtime, reverse=True) if PROFILE_DIR.exists() else []
+    return {
+        "enabled": PROFILING_ENABLED,
+        "sample_rate": PROFILE_SAMPLE_RATE,
+        "keep": PROFILE_KEEP,
+        "profiles": [
+            {
+                "profile_id": f.stem,
+                "size_bytes": f.stat().st_size,
+                "created_at": datetime.utcfromtimestamp(f.stat().st_mtime).isoformat(),
+            }
+            for f in files
+        ],
+    }
+
+
+@app.get("/api/admin/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    sort: Literal["cumulative", "tottime", "calls"] = Query(default="cumulative"),
+    limit: int = Query(default=40, ge=1, le=500),
+    raw: bool = Query(default=False),
+):
+    if not PROFILE_ID_RE.match(profile_id):
+        raise HTTPException(status_code=400, detail="Invalid profile id.")
+    path = PROFILE_DIR / f"{profile_id}.prof"
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    if raw:
+        # pstats dump, loadable by snakeviz / gprof2dot for a full call graph.
+        return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
+    out = io.StringIO()
+    stats = pstats.Stats(str(path), stream=out)
+    stats.strip_dirs().sort_stats(sort)
+    stats.print_stats(limit)
+    stats.print_callees(limit)
+    return PlainTextResponse(out.getvalue())
+
+
+@app.post("/api/admin/archive")
+def run_archive(keep_days: int = Query(default=ARCHIVE_AFTER_DAYS, ge=1)):
+    return {"status": "ok", **archive_race_days(keep_days)}
+
+
+@app.post("/api/admin/search/rebuild")
+def run_search_rebuild():
+    return {"status": "ok", **rebuild_search_index()}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local mock odds feed (mock-feed) and form file import (import-form).")
+    parser.add_argument("command", choices=["mock-feed", "import-form"])
+    parser.add_argument("path", nargs="?", help="form file for import-form")
+    parser.add_argument("--format", choices=["csv", "ndjson", "json"], default=None)
+    parser.add_argument("--batch-rows", type=int, default=FORM_IMPORT_BATCH_ROWS)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-inflight", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "import-form":
+        import sys
+
+        if not args.path:
+            parser.error("import-form needs a file path")
+        form_path = Path(args.path)
+        with form_path.open("rb") as form_stream:
+            summary = import_form_history(
+                form_stream,
+                form_file_format(form_path, args.format),
+                args.batch_rows,
+                lambda status: print(
+                    f"{status['records']} records, {status['inserted']} inserted, {status['updated']} updated "
+                    f"({status['rows_per_min']}/min)",
+                    file=sys.stderr,
+                ),
+            )
+        print(json.dumps(summary, indent=2))
+        raise SystemExit(0)
+
+    async def serve_mock_feed() -> None:
+        server = await start_mock_odds_feed(args.host, args.port, args.latency_ms / 1000.0, args.error_rate, args.max_inflight)
+        print(f"Mock odds feed on http://{args.host}:{args.port} (HORSE_ODDS_FEEDS=mock=http://{args.host}:{args.port})")
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve_mock_feed())
@@ -53,6 +53,7 @@ let selectedRaceJumpIso = null;
 let selectedRaceHeaderMeta = null;
 let valueFilterActive = false;
 let lastBoardData = null;
+let boardVersion = null;
 let boardSortKey = "edge_pct";
 let boardSortAsc = false;
 let lastRefreshTime = null;
@@ -322,7 +323,10 @@ async function saveTrackedBetFromModal() {
 }
 
 async function loadBookmakers() {
-  const data = await jsonFetch("/api/bookmakers");
+  applyBookmakers(await jsonFetch("/api/bookmakers"));
+}
+
+function applyBookmakers(data) {
   bookmakers = data.bookmakers.map((b) => b.id);
   bookSymbol = Object.fromEntries(data.bookmakers.map((b) => [b.id, b.symbol]));
   selectedBooks = new Set(bookmakers);
@@ -354,6 +358,10 @@ async function loadRaceData() {
     jsonFetch(`/api/races?race_date=${date}`),
     jsonFetch(`/api/race-signals?race_date=${date}&books=${books}&rec_edge=1`),
   ]);
+  applyRaceData(racesResp, signalsResp);
+}
+
+function applyRaceData(racesResp, signalsResp) {
   racesForDay = racesResp.races;
   tipSignals = signalsResp.signals || {};
   lastRefreshTime = Date.now();
@@ -430,6 +438,7 @@ function renderMatrix() {
   matrixWrap.querySelectorAll("button[data-race-id]").forEach((btn) => {
     btn.addEventListener("click", async () => {
       selectedRaceId = Number(btn.getAttribute("data-race-id"));
+      saveFilter("board", "race", selectedRaceId);
       renderMatrix();
       await loadTipsForSelectedRace();
     });
@@ -720,6 +729,53 @@ async function loadTipsForSelectedRace() {
 
   const books = encodeURIComponent(selectedBookString());
   const data = await jsonFetch(`/api/races/${selectedRaceId}/board?min_edge=0&books=${books}`);
+  applyBoard(data);
+}
+
+// The board polls on its own timer, at the interval the server recommends for
+// the race (seconds apart near the jump, minutes apart for far-off races).
+let boardRefreshTimer = null;
+function scheduleBoardRefresh(seconds) {
+  clearTimeout(boardRefreshTimer);
+  boardRefreshTimer = setTimeout(() => {
+    refreshSelectedBoard().catch((err) => {
+      console.error(err);
+      scheduleBoardRefresh(30);
+    });
+  }, Math.max(5, Number(seconds) || 30) * 1000);
+}
+
+// Periodic refresh: only runners whose price, edge or result moved since the
+// last version we saw are downloaded and merged into the current board.
+async function refreshSelectedBoard() {
+  if (!selectedRaceId || !lastBoardData) {
+    scheduleBoardRefresh(30);
+    await loadTipsForSelectedRace();
+    return;
+  }
+  const books = selectedBookString();
+  const current = boardVersion && boardVersion.raceId === selectedRaceId && boardVersion.books === books
+    && lastBoardData.race.id === selectedRaceId;
+  const since = current ? `&since=${boardVersion.version}` : "";
+  const data = await jsonFetch(
+    `/api/races/${selectedRaceId}/board/delta?min_edge=0&books=${encodeURIComponent(books)}${since}`
+  );
+  boardVersion = { raceId: selectedRaceId, books, version: data.version };
+  scheduleBoardRefresh(data.refresh_after_s);
+  if (data.full) {
+    applyBoard(data);
+    return;
+  }
+  if (!data.rows.length) return;
+  const byRunner = new Map(lastBoardData.rows.map((row) => [row.runner_id, row]));
+  data.rows.forEach((row) => {
+    if (byRunner.has(row.runner_id)) Object.assign(byRunner.get(row.runner_id), row);
+    else lastBoardData.rows.push(row);
+  });
+  applyBoard({ ...lastBoardData, totals: data.totals, results: data.results });
+}
+
+function applyBoard(data) {
   lastBoardData = data;
 
   if (boardLoading) boardLoading.hidden = true;
@@ -753,7 +809,10 @@ async function loadTipsForSelectedRace() {
 }
 
 async function loadTracked() {
-  const data = await jsonFetch("/api/tips/tracked");
+  applyTracked(await jsonFetch("/api/tips/tracked"));
+}
+
+function applyTracked(data) {
   const prevCount = trackedTipsCache.length;
   trackedTipsCache = data.tips || [];
   renderBetSlip();
@@ -1015,17 +1074,44 @@ document.addEventListener("keydown", (e) => {
   }
 });
 
+// First paint in one round trip: bookmakers, races, signals, the first board
+// and the bet slip from a single snapshot.
+async function loadBootstrap() {
+  const date = raceDateInput.value || todayIso();
+  const raceParam = selectedRaceId ? `&race_id=${selectedRaceId}` : "";
+  let data;
+  try {
+    data = await jsonFetch(`/api/bootstrap/board?race_date=${date}&rec_edge=1${raceParam}`);
+  } catch (err) {
+    // Fall back to the standalone requests so one failing section doesn't
+    // blank the whole page.
+    console.error(err);
+    const report = (sectionErr) => {
+      console.error(sectionErr);
+      showToast(`Failed to load: ${sectionErr.message}`, "error");
+    };
+    await loadBookmakers();
+    await loadRaceData().catch(report);
+    await loadTipsForSelectedRace().catch(report);
+    await loadTracked().catch(report);
+    return;
+  }
+  applyBookmakers(data.bookmakers);
+  applyRaceData(data.races, data.signals);
+  if (data.board && String(data.board.race.id) === String(selectedRaceId)) applyBoard(data.board);
+  else await loadTipsForSelectedRace();
+  applyTracked(data.tracked);
+}
+
 async function init() {
   syncThemeMode();
   const savedDate = loadFilter("board", "date", "");
   raceDateInput.value = savedDate || todayIso();
-  await loadBookmakers();
-  await loadRaceData();
-  await loadTipsForSelectedRace();
-  await loadTracked();
+  selectedRaceId = Number(loadFilter("board", "race", "")) || null;
+  await loadBootstrap();
+  scheduleBoardRefresh(30);
   setInterval(async () => {
     await loadRaceData();
-    await loadTipsForSelectedRace();
     await loadTracked();
   }, 30000);
   setInterval(tickBetSlipCountdowns, 1000);
@@ -108,18 +108,31 @@ function tickCountdowns() {
   }
 }
 
+// One round trip when the bootstrap answers; otherwise each section is fetched
+// on its own so one failing section doesn't blank the whole dashboard.
+async function loadDashboardSections(today) {
+  try {
+    return await jsonFetch(`/api/bootstrap/dashboard?race_date=${today}&min_edge=1`);
+  } catch (err) {
+    console.error(err);
+    const [tips, tracked] = await Promise.all([
+      jsonFetch(`/api/tips/daily?race_date=${today}&min_edge=1&books=`).catch(() => ({ tips: [] })),
+      jsonFetch("/api/tips/tracked").catch(() => ({ tips: [] })),
+    ]);
+    return { tips, tracked };
+  }
+}
+
 async function loadDashboard() {
   const today = todayIso();
 
-  const [racesResp, tipsResp, betsResp] = await Promise.all([
-    jsonFetch(`/api/races?race_date=${today}`),
-    jsonFetch(`/api/tips/daily?race_date=${today}&min_edge=1&books=`).catch(() => ({ tips: [] })),
-    jsonFetch("/api/tips/tracked").catch(() => ({ tips: [] })),
+  const [{ tips: tipsResp, tracked: betsResp }, nextResp] = await Promise.all([
+    loadDashboardSections(today),
+    jsonFetch("/api/races/next-to-jump?limit=6&top=1").catch(() => ({ races: [] })),
   ]);
 
   lastRefreshTime = Date.now();
 
-  const races = racesResp.races || [];
   const tips = tipsResp.tips || [];
   const allBets = betsResp.tips || [];
 
@@ -130,11 +143,8 @@ async function loadDashboard() {
   if (kpiTipsCount) kpiTipsCount.textContent = String(tips.length);
   if (kpiHighEdgeSub) kpiHighEdgeSub.textContent = `${highEdge.length} high edge (≥5%)`;
 
-  // Next race
-  const now = Date.now();
-  const upcoming = races
-    .filter((r) => new Date(`${r.race_date}T${r.jump_time}:00`).getTime() > now - 60000)
-    .sort((a, b) => new Date(`${a.race_date}T${a.jump_time}:00`) - new Date(`${b.race_date}T${b.jump_time}:00`));
+  // Next race (the server keeps races ordered by jump time)
+  const upcoming = nextResp.races || [];
   const next = upcoming[0];
   const kpiNextRace = document.getElementById("kpiNextRace");
   const kpiNextRaceSub = document.getElementById("kpiNextRaceSub");
@@ -145,7 +155,7 @@ async function loadDashboard() {
       if (kpiNextRaceSub) kpiNextRaceSub.textContent = `${next.track} R${next.race_number}`;
     } else {
       kpiNextRace.textContent = "—";
-      if (kpiNextRaceSub) kpiNextRaceSub.textContent = "No more races today";
+      if (kpiNextRaceSub) kpiNextRaceSub.textContent = "No upcoming races";
     }
   }
 
@@ -208,15 +218,17 @@ async function loadDashboard() {
   if (dashNextRaces) {
     const nextFive = upcoming.slice(0, 6);
     if (!nextFive.length) {
-      dashNextRaces.innerHTML = `<div class="muted" style="font-size:var(--text-sm)">No more races today.</div>`;
+      dashNextRaces.innerHTML = `<div class="muted" style="font-size:var(--text-sm)">No upcoming races.</div>`;
     } else {
       dashNextRaces.innerHTML = nextFive.map((r) => {
         const iso = `${r.race_date}T${r.jump_time}:00`;
         const status = raceStatusClass(iso);
+        const best = r.top_edges[0];
+        const bestLabel = best ? ` · ${escapeHtml(best.horse_name)} ${best.edge_pct > 0 ? "+" : ""}${Number(best.edge_pct).toFixed(1)}%` : "";
         return `
           <div class="next-race-item">
             <div class="next-race-track">${escapeHtml(r.track)} R${r.race_number}</div>
-            <div class="next-race-details">${r.distance_m}m · ${r.track_rating}</div>
+            <div class="next-race-details">${r.distance_m}m · ${r.track_rating}${bestLabel}</div>
             <span class="race-status-badge ${status}" style="font-size:9px">${{ "status-upcoming": "Upcoming", "status-imminent": "Imminent", "status-live": "Live", "status-jumped": "Jumped" }[status]}</span>
             <div class="next-race-countdown" data-cd-iso="${iso}">${formatCountdown(iso)}</div>
           </div>
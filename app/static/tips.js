@@ -290,8 +290,6 @@ async function loadDailyTips() {
   tipsContainer.style.display = "flex";
   if (tipsEmpty) tipsEmpty.hidden = true;
 
-  notifyHighEdgeTips(tips);
-
   // Group tips by race
   const raceGroups = new Map();
   tips.forEach((tip) => {
@@ -423,13 +421,15 @@ document.addEventListener("keydown", (e) => {
   }
 });
 
-function notifyHighEdgeTips(tips) {
+// Alerts are evaluated server-side against the saved notify_min_edge as odds
+// move; each one is handed out once, so only fetch when we can show it.
+async function notifyAlerts() {
   if (!("Notification" in window)) return;
   if (Notification.permission !== "granted") return;
   const enabled = localStorage.getItem("horse_notifications_enabled");
   if (enabled === "0") return;
-  const minEdge = Number(localStorage.getItem("horse_notify_min_edge") || "5");
-  const hot = tips.filter((t) => Number(t.edge_pct) >= minEdge);
+  const data = await jsonFetch("/api/user/alerts");
+  const hot = [...(data.alerts || [])].sort((a, b) => Number(b.edge_pct) - Number(a.edge_pct));
   if (!hot.length) return;
   const top5 = hot.slice(0, 5);
   const body = top5.map((t) => `${t.track} R${t.race_number} ${t.horse_name} (${Number(t.edge_pct).toFixed(1)}%)`).join("\n");
@@ -454,8 +454,10 @@ async function init() {
   if (savedMinEdge) minEdgeInput.value = savedMinEdge;
   await loadBookmakers();
   await loadDailyTips();
+  notifyAlerts().catch(console.error);
   setInterval(() => {
     loadDailyTips().catch(console.error);
+    notifyAlerts().catch(console.error);
   }, 60000);
   setInterval(tickTipsCountdowns, 1000);
 }
@@ -1,15 +1,29 @@
+import asyncio
+import cProfile
+import csv
+import gzip
 import importlib
+import itertools
+import json
+import math
 import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
 import unittest
-from datetime import datetime
+from datetime import datetime, timedelta
+from pathlib import Path
 
-from fastapi import HTTPException
+import numpy as np
+from fastapi import HTTPException, Request, Response
 
 
 class Phase1ApiTests(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         os.environ["HORSE_DB_PATH"] = "horse.db"
+        os.environ["HORSE_SCHEDULER"] = "0"
 
         import app.main as main_module
 
@@ -176,6 +190,179 @@ class Phase1ApiTests(unittest.TestCase):
         self.assertIn(bet["result"], {"won", "lost"})
         self.assertIsNotNone(bet["settled_at"])
 
+    def test_bulk_settlement_across_users_and_result_corrections(self):
+        main = self.main
+        conn = main.get_conn()
+        race_id = conn.execute(
+            """
+            SELECT id FROM races
+            WHERE NOT EXISTS (SELECT 1 FROM race_results rr WHERE rr.race_id = races.id)
+            ORDER BY race_date DESC, jump_time DESC LIMIT 1
+            """
+        ).fetchone()[0]
+        runner_ids = [r[0] for r in conn.execute("SELECT id FROM runners WHERE race_id = ? ORDER BY id LIMIT 2", (race_id,))]
+        other = conn.execute("SELECT id, result, settled_at FROM tracked_tips WHERE race_id <> ? LIMIT 1", (race_id,)).fetchone()
+        tips = [(f"settle-user-{n}", runner_ids[n % 2]) for n in range(6)]
+        conn.executemany(
+            """
+            INSERT INTO tracked_tips (user_id, race_id, runner_id, bookmaker, edge_pct, odds_at_tip, stake, tracked_at)
+            VALUES (?, ?, ?, 'tab', 5.0, 3.0, 1.0, ?)
+            """,
+            [(user, race_id, runner, datetime.now().isoformat()) for user, runner in tips],
+        )
+        conn.commit()
+        try:
+            main.simulate_race_result(race_id)
+            results = dict(conn.execute("SELECT runner_id, finish_pos FROM race_results WHERE race_id = ?", (race_id,)).fetchall())
+            settled = main.get_settlements(limit=1)["passes"][0]
+            self.assertEqual(settled["race_ids"], [race_id])
+            self.assertEqual((settled["settled"], settled["users"], settled["resettled"]), (6, 6, 0))
+            rows = conn.execute("SELECT runner_id, result FROM tracked_tips WHERE user_id LIKE 'settle-user-%'").fetchall()
+            self.assertEqual(
+                sorted((r["runner_id"], r["result"]) for r in rows),
+                sorted((runner, "won" if results[runner] == 1 else "lost") for _, runner in tips),
+            )
+
+            # A correction makes the first runner the winner: only this race is re-settled.
+            previous = next(runner for runner, pos in results.items() if pos == 1)
+            conn.execute("UPDATE race_results SET finish_pos = ? WHERE race_id = ? AND runner_id = ?", (results[runner_ids[0]], race_id, previous))
+            conn.execute("UPDATE race_results SET finish_pos = 1 WHERE race_id = ? AND runner_id = ?", (race_id, runner_ids[0]))
+            conn.commit()
+            correction = main.settle_pending_bets()["settlement"]
+            flipped = 0 if previous == runner_ids[0] else sum(1 for _, runner in tips if runner in (previous, runner_ids[0]))
+            self.assertEqual((correction["races"], correction["resettled"]), (1, flipped))
+            won = conn.execute("SELECT runner_id FROM tracked_tips WHERE user_id LIKE 'settle-user-%' AND result = 'won'").fetchall()
+            self.assertEqual({r[0] for r in won}, {runner_ids[0]})
+            if other is not None:
+                self.assertEqual(
+                    tuple(conn.execute("SELECT result, settled_at FROM tracked_tips WHERE id = ?", (other["id"],)).fetchone()),
+                    (other["result"], other["settled_at"]),
+                )
+
+            # Withdrawn results put the tips back to pending.
+            conn.execute("DELETE FROM race_results WHERE race_id = ?", (race_id,))
+            conn.commit()
+            self.assertEqual(main.resettle_race(race_id)["settlement"]["unsettled"], 6)
+            pending = conn.execute("SELECT COUNT(*) FROM tracked_tips WHERE user_id LIKE 'settle-user-%' AND result = 'pending'").fetchone()[0]
+            self.assertEqual(pending, 6)
+        finally:
+            conn.execute("DELETE FROM tracked_tips WHERE user_id LIKE 'settle-user-%'")
+            conn.execute("DELETE FROM race_results WHERE race_id = ?", (race_id,))
+            conn.commit()
+            conn.close()
+
+    def test_settlement_respects_manual_results_until_forced(self):
+        main = self.main
+        conn = main.get_conn()
+        race_id = conn.execute(
+            """
+            SELECT id FROM races
+            WHERE NOT EXISTS (SELECT 1 FROM race_results rr WHERE rr.race_id = races.id)
+            ORDER BY race_date DESC, jump_time DESC LIMIT 1
+            """
+        ).fetchone()[0]
+        runner_id = conn.execute("SELECT MIN(id) FROM runners WHERE race_id = ?", (race_id,)).fetchone()[0]
+        tip_id = conn.execute(
+            """
+            INSERT INTO tracked_tips (user_id, race_id, runner_id, bookmaker, edge_pct, odds_at_tip, stake, tracked_at)
+            VALUES ('demo', ?, ?, 'tab', 5.0, 3.0, 1.0, ?)
+            """,
+            (race_id, runner_id, datetime.now().isoformat()),
+        ).lastrowid
+        conn.commit()
+
+        def result() -> str:
+            return conn.execute("SELECT result FROM tracked_tips WHERE id = ?", (tip_id,)).fetchone()[0]
+
+        try:
+            main.simulate_race_result(race_id)
+            derived = result()
+            flipped = "lost" if derived == "won" else "won"
+            self.assertIn(derived, {"won", "lost"})
+
+            # Set back to pending by hand: the race is queued again and the tip re-settles.
+            main.update_bet_result(tip_id, main.UpdateBetResultRequest(result="pending"))
+            self.assertEqual(result(), "pending")
+            main.settle_pending_bets()
+            self.assertEqual(result(), derived)
+
+            # A hand-set result survives passes triggered by other users' late tips...
+            main.update_bet_result(tip_id, main.UpdateBetResultRequest(result=flipped))
+            conn.execute(
+                """
+                INSERT INTO tracked_tips (user_id, race_id, runner_id, bookmaker, edge_pct, odds_at_tip, stake, tracked_at)
+                VALUES ('settle-late', ?, ?, 'tab', 5.0, 3.0, 1.0, ?)
+                """,
+                (race_id, runner_id, datetime.now().isoformat()),
+            )
+            conn.commit()
+            self.assertEqual(main.settle_pending_bets()["settlement"]["settled"], 1)
+            self.assertEqual(result(), flipped)
+
+            # ...but a result correction re-derives it, as does an explicit resettle.
+            conn.execute("UPDATE race_results SET finish_pos = finish_pos WHERE race_id = ? AND runner_id = ?", (race_id, runner_id))
+            conn.commit()
+            main.settle_pending_bets()
+            self.assertEqual(result(), derived)
+            main.update_bet_result(tip_id, main.UpdateBetResultRequest(result=flipped))
+            main.resettle_race(race_id)
+            self.assertEqual(result(), derived)
+            self.assertEqual(conn.execute("SELECT manual_result FROM tracked_tips WHERE id = ?", (tip_id,)).fetchone()[0], 0)
+        finally:
+            conn.execute("DELETE FROM tracked_tips WHERE id = ? OR user_id = 'settle-late'", (tip_id,))
+            conn.execute("DELETE FROM race_results WHERE race_id = ?", (race_id,))
+            conn.commit()
+            conn.close()
+
+    def test_bankroll_simulator_plans_and_ruin(self):
+        main = self.main
+        odds = np.full(40, 2.0)
+        losing = main.simulate_bankroll(
+            odds, np.zeros(40, dtype=bool), np.full(40, 5.0), [main.StakingPlan(staking="flat", value=10.0)], 100.0, 200, 40, seed=3
+        )[0]
+        self.assertEqual((losing["ruin_probability_pct"], losing["final_bankroll"]["p95"]), (100.0, 0.0))
+        self.assertEqual((losing["realized"]["ruined"], losing["max_drawdown_pct"]["p50"]), (True, 100.0))
+        self.assertEqual(losing["drawdown_histogram_pct"][-1], 100.0)
+
+        won = np.arange(40) % 2 == 0
+        plans = [main.StakingPlan(staking="percent", value=5.0), main.StakingPlan(staking="kelly", value=0.5)]
+        first = main.simulate_bankroll(odds, won, np.zeros(40), plans, 100.0, 300, 60, seed=11)
+        self.assertEqual(first, main.simulate_bankroll(odds, won, np.zeros(40), plans, 100.0, 300, 60, seed=11))
+        percent, kelly = first
+        # Zero recorded edge means Kelly stakes nothing.
+        self.assertEqual((kelly["final_bankroll"]["p5"], kelly["final_bankroll"]["p95"], kelly["max_drawdown_pct"]["p99"]), (100.0, 100.0, 0.0))
+        self.assertEqual(percent["realized"]["final_bankroll"], round(100.0 * (1.05 * 0.95) ** 20, 2))
+        self.assertEqual(len(percent["equity_curve"]["p50"]), len(percent["equity_curve"]["bet"]))
+        self.assertEqual(percent["equity_curve"]["bet"][-1], 60)
+        self.assertEqual(percent["ruin_probability_pct"], 0.0)
+
+        conn = main.get_conn()
+        race_id, runner_id = conn.execute(
+            """
+            SELECT r.race_id, r.id FROM runners r
+            WHERE NOT EXISTS (SELECT 1 FROM race_results rr WHERE rr.race_id = r.race_id)
+            LIMIT 1
+            """
+        ).fetchone()
+        conn.executemany(
+            """
+            INSERT INTO tracked_tips (user_id, race_id, runner_id, bookmaker, edge_pct, odds_at_tip, stake, result, tracked_at, settled_at)
+            VALUES ('demo', ?, ?, 'tab', 8.0, ?, 1.0, ?, ?, ?)
+            """,
+            [(race_id, runner_id, o, r, "2000-01-01", "2000-01-01") for o, r in ((3.0, "won"), (2.5, "lost"), (4.0, "lost"))],
+        )
+        conn.commit()
+        try:
+            payload = main.simulate_user_bankroll(main.BankrollSimRequest(resamples=100, bets=25, seed=5))
+            self.assertGreaterEqual(payload["settled_bets"], 3)
+            self.assertEqual([p["staking"] for p in payload["plans"]], ["flat", "percent", "kelly"])
+            with self.assertRaises(HTTPException):
+                main.simulate_user_bankroll(main.BankrollSimRequest(plans=[{"staking": "kelly", "value": 2.0}]))
+        finally:
+            conn.execute("DELETE FROM tracked_tips WHERE user_id = 'demo' AND tracked_at = '2000-01-01'")
+            conn.commit()
+            conn.close()
+
     def test_bets_analytics_payload(self):
         payload = self.main.get_user_bets_analytics()
         self.assertIn("summary", payload)
@@ -198,6 +385,1049 @@ class Phase1ApiTests(unittest.TestCase):
         ]:
             self.assertIn(key, summary)
 
+    def test_slow_query_log_captures_plan(self):
+        race_id, _ = self._first_race_and_runner()
+        original_threshold = self.main.SLOW_QUERY_MS
+        self.main.clear_slow_queries()
+        self.main.SLOW_QUERY_MS = 0.0001
+        try:
+            self.main.get_race_board(race_id=race_id, min_edge=0.0, books="sportsbet,tab")
+        finally:
+            self.main.SLOW_QUERY_MS = original_threshold
+
+        queries = self.main.get_slow_queries(limit=1000)["queries"]
+        board_query = next((q for q in queries if "JOIN odds o" in q["sql"]), None)
+        self.assertIsNotNone(board_query)
+        self.assertIn("IN (?, ...)", board_query["sql"])
+        self.assertEqual(board_query["param_count"], 3)
+        self.assertTrue(board_query["plan"])
+        self.main.clear_slow_queries()
+
+    def test_saved_profile_rotates_and_reports(self):
+        race_id, _ = self._first_race_and_runner()
+        original_dir, original_keep = self.main.PROFILE_DIR, self.main.PROFILE_KEEP
+        with tempfile.TemporaryDirectory() as tmp:
+            self.main.PROFILE_DIR = Path(tmp)
+            self.main.PROFILE_KEEP = 2
+            try:
+                profile_ids = []
+                for _ in range(3):
+                    profiler = cProfile.Profile()
+                    profiler.runcall(self.main.get_race_board, race_id=race_id, min_edge=0.0, books=None)
+                    profile_ids.append(self.main.save_profile([profiler], f"GET /api/races/{race_id}/board"))
+
+                listed = [p["profile_id"] for p in self.main.list_profiles()["profiles"]]
+                self.assertEqual(len(listed), 2)
+                self.assertNotIn(profile_ids[0], listed)
+
+                report = self.main.get_profile(profile_ids[-1], sort="cumulative", limit=20, raw=False)
+                self.assertIn("get_race_board", report.body.decode())
+            finally:
+                self.main.PROFILE_DIR, self.main.PROFILE_KEEP = original_dir, original_keep
+
+    def test_profile_query_param_profiles_one_request_through_the_route(self):
+        main = self.main
+        race_id, _ = self._first_race_and_runner()
+        route = next(r for r in main.app.routes if getattr(r, "path", None) == "/api/races/{race_id}/board")
+        handler = route.get_route_handler()
+
+        def request(query: str) -> Request:
+            return Request({
+                "type": "http",
+                "method": "GET",
+                "scheme": "http",
+                "server": ("testserver", 80),
+                "root_path": "",
+                "path": f"/api/races/{race_id}/board",
+                "query_string": query.encode(),
+                "headers": [],
+                "path_params": {"race_id": str(race_id)},
+                "app": main.app,
+            })
+
+        original = main.PROFILE_DIR, main.PROFILING_ENABLED
+        with tempfile.TemporaryDirectory() as tmp:
+            main.PROFILE_DIR, main.PROFILING_ENABLED = Path(tmp), True
+            try:
+                plain = asyncio.run(handler(request("")))
+                self.assertNotIn("x-profile-id", plain.headers)
+
+                response = asyncio.run(handler(request("profile=1")))
+                self.assertEqual(response.status_code, 200)
+                profile_id = response.headers["x-profile-id"]
+                self.assertEqual([p.name for p in Path(tmp).glob("*.prof")], [f"{profile_id}.prof"])
+                report = main.get_profile(profile_id, sort="cumulative", limit=50, raw=False).body.decode()
+                self.assertIn("get_race_board", report)
+
+                # A request arriving while another is being profiled is served unprofiled.
+                with main.profiling_lock:
+                    busy = asyncio.run(handler(request("profile=1")))
+                self.assertEqual(busy.status_code, 200)
+                self.assertNotIn("x-profile-id", busy.headers)
+            finally:
+                main.PROFILE_DIR, main.PROFILING_ENABLED = original
+
+    def test_archive_moves_settled_past_days_and_reads_through(self):
+        old_day = (datetime.now().date() - timedelta(days=60)).isoformat()
+        original_path = self.main.ARCHIVE_DB_PATH
+        with tempfile.TemporaryDirectory() as tmp:
+            self.main.ARCHIVE_DB_PATH = Path(tmp) / "archive.db"
+            try:
+                conn = self.main.get_conn()
+                race_id = conn.execute(
+                    """
+                    INSERT INTO races (
+                        race_date, track, race_number, distance_m, jump_time,
+                        race_name, starters, prize_pool, track_rating
+                    )
+                    VALUES (?, 'Flemington', 1, 1200, '12:00', 'Archive Test', 1, 1000.0, 'Good 4')
+                    """,
+                    (old_day,),
+                ).lastrowid
+                runner_id = conn.execute(
+                    """
+                    INSERT INTO runners (
+                        race_id, horse_number, horse_name, barrier, trainer, jockey, model_prob, predicted_price
+                    )
+                    VALUES (?, 1, 'Archive Runner', 1, 'Chris Waller', 'James McDonald', 1.0, 1.5)
+                    """,
+                    (race_id,),
+                ).lastrowid
+                conn.execute(
+                    """
+                    INSERT INTO odds (runner_id, bookmaker, current_odds, bet_url, updated_at)
+                    VALUES (?, 'tab', 1.6, 'https://example.com/bet/tab', ?)
+                    """,
+                    (runner_id, old_day),
+                )
+                conn.execute(
+                    """
+                    INSERT INTO race_results (race_id, runner_id, finish_pos, closing_odds, official_at)
+                    VALUES (?, ?, 1, 1.6, ?)
+                    """,
+                    (race_id, runner_id, old_day),
+                )
+                bet_id = conn.execute(
+                    """
+                    INSERT INTO tracked_tips (
+                        user_id, race_id, runner_id, bookmaker, edge_pct, odds_at_tip, stake, result, tracked_at, settled_at
+                    )
+                    VALUES ('demo', ?, ?, 'tab', 5.0, 1.6, 1.0, 'won', ?, ?)
+                    """,
+                    (race_id, runner_id, old_day, old_day),
+                ).lastrowid
+                conn.execute(
+                    """
+                    INSERT INTO alert_events (
+                        user_id, race_id, runner_id, bookmaker, market_odds, edge_pct, threshold, created_at, updated_at
+                    )
+                    VALUES ('demo', ?, ?, 'tab', 1.6, 5.0, 2.0, ?, ?)
+                    """,
+                    (race_id, runner_id, old_day, old_day),
+                )
+                conn.commit()
+                conn.close()
+
+                summary = self.main.archive_race_days(keep_days=14)
+                self.assertIn(old_day, summary["archived_days"])
+                self.assertEqual(summary["moved"]["tracked_tips"], 1)
+
+                conn = self.main.get_conn()
+                self.assertIsNone(conn.execute("SELECT id FROM races WHERE id = ?", (race_id,)).fetchone())
+                self.assertIsNone(conn.execute("SELECT id FROM alert_events WHERE runner_id = ?", (runner_id,)).fetchone())
+                conn.close()
+
+                races = self.main.get_races(race_date=old_day, track=None)["races"]
+                self.assertEqual([r["id"] for r in races], [race_id])
+                board = self.main.get_race_board(race_id=race_id, min_edge=0.0, books=None)
+                self.assertEqual(board["rows"][0]["runner_id"], runner_id)
+                self.assertEqual(board["results"][0]["runner_id"], runner_id)
+                self.assertIn(bet_id, [b["id"] for b in self.main.get_user_bets()["bets"]])
+
+                self.main.delete_tracked_tip(bet_id)
+                self.assertNotIn(bet_id, [b["id"] for b in self.main.get_user_bets()["bets"]])
+            finally:
+                self.main.ARCHIVE_DB_PATH = original_path
+
+    def test_form_history_export_streams_csv_and_ndjson(self):
+        conn = self.main.get_conn(with_archive=True)
+        expected = conn.execute("SELECT COUNT(*) FROM runner_history_all WHERE track = 'Randwick'").fetchone()[0]
+        conn.close()
+        # runner_history is a view in main only; read each schema's compact table as the export does.
+        sql = f"""
+            SELECT h.runner_id, r.horse_name, h.run_date, h.track, h.finish_pos
+            FROM ({self.main.COMPACT_VIEWS["runner_history"].format(db="{db}.", src="")}) h
+            JOIN {{db}}.runners r ON r.id = h.runner_id
+            WHERE h.track = ?
+            ORDER BY h.id
+        """
+
+        csv_chunks = list(self.main.stream_export_rows(sql, ["Randwick"], "csv"))
+        self.assertGreater(len(csv_chunks), 1)
+        csv_rows = list(csv.reader("".join(csv_chunks).splitlines()))
+        self.assertEqual(csv_rows[0], ["runner_id", "horse_name", "run_date", "track", "finish_pos"])
+        self.assertEqual(len(csv_rows) - 1, expected)
+
+        ndjson_lines = "".join(self.main.stream_export_rows(sql, ["Randwick"], "ndjson")).splitlines()
+        self.assertEqual(len(ndjson_lines), expected)
+        self.assertEqual(json.loads(ndjson_lines[0])["track"], "Randwick")
+
+        day = json.loads(ndjson_lines[0])["run_date"]
+        response = self.main.export_form_history(
+            fmt="ndjson", start_date=day, end_date=day, track="Randwick", horse=None, trainer=None, jockey=None
+        )
+
+        async def body():
+            return "".join([chunk async for chunk in response.body_iterator])
+
+        exported = [json.loads(line) for line in asyncio.run(body()).splitlines()]
+        self.assertTrue(exported)
+        self.assertEqual({r["run_date"] for r in exported}, {day})
+
+        # Form strings read newest-first straight off the (runner_id, run_day) index.
+        conn = self.main.get_conn()
+        plan = " ".join(
+            r[3] for r in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT runner_id, finish_pos FROM runner_history WHERE runner_id IN (1, 2) ORDER BY runner_id DESC, run_day DESC"
+            )
+        )
+        conn.close()
+        self.assertIn("idx_runner_history_runner", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+        with self.assertRaises(HTTPException) as ctx:
+            self.main.export_user_bets(fmt="csv", start_date="19-10-2026", end_date=None, track=None)
+        self.assertEqual(ctx.exception.status_code, 400)
+
+    def test_backtest_replays_races_and_sweeps_in_pool(self):
+        races = [
+            (1, "2026-01-01", (
+                (11, 0.5, 1, 2.0, (("tab", 2.4), ("neds", 2.2))),
+                (12, 0.5, 2, 2.0, (("tab", 1.8),)),
+            )),
+            (2, "2026-01-02", (
+                (21, 0.4, 3, 3.0, (("tab", 3.0), ("neds", 2.6))),
+                (22, 0.6, 1, 1.5, (("tab", 1.5),)),
+            )),
+        ]
+        flat = self.main.run_backtest(
+            races,
+            {"min_edge": 5.0, "books": ["tab", "neds"], "staking": "flat", "flat_stake": 1.0, "kelly_fraction": 0.25, "bankroll": 100.0},
+        )
+        # Backs runner 11 @ 2.4 (edge 20%, wins) and runner 21 @ 3.0 (edge 20%, loses).
+        self.assertEqual(flat["bets"], 2)
+        self.assertEqual(flat["wins"], 1)
+        self.assertAlmostEqual(flat["profit_units"], 0.4)
+        self.assertAlmostEqual(flat["roi_pct"], 20.0)
+        self.assertAlmostEqual(flat["max_drawdown_units"], 1.0)
+        self.assertAlmostEqual(flat["avg_clv_pct"], 10.0)
+
+        # The percentage is the deepest fall from the running peak, not the final peak.
+        swings = [
+            (day, f"2026-02-0{day}", ((day, 0.5, finish_pos, 0.0, (("tab", odds),)),))
+            for day, finish_pos, odds in ((1, 2, 3.0), (2, 1, 100.0), (3, 2, 3.0))
+        ]
+        swung = self.main.run_backtest(swings, {**flat, "flat_stake": 4.0, "bankroll": 10.0})
+        self.assertEqual((swung["max_drawdown_units"], swung["max_drawdown_pct"]), (4.0, 40.0))
+
+        # Kelly sizes a race's qualifying runners together, not one by one.
+        field = [(1, "2026-03-01", (
+            (31, 0.4, 1, 0.0, (("tab", 3.0),)),
+            (32, 0.4, 2, 0.0, (("tab", 3.0),)),
+            (33, 0.2, 3, 0.0, (("tab", 3.0),)),
+        ))]
+        joint = self.main.run_backtest(field, {**flat, "staking": "kelly", "kelly_fraction": 1.0, "min_edge": 0.0})
+        fractions = self.main.kelly_race_fractions([0.4, 0.4], [3.0, 3.0])
+        self.assertEqual(joint["bets"], 2)
+        self.assertAlmostEqual(joint["staked_units"], round(100.0 * sum(fractions), 2))
+        self.assertAlmostEqual(joint["profit_units"], round(100.0 * (fractions[0] * 2.0 - fractions[1]), 2))
+
+        neds_only = self.main.run_backtest(races, {**flat, "books": ["neds"]})
+        self.assertEqual(neds_only["bets"], 1)
+
+        strategies = [
+            {"min_edge": edge, "books": ["tab", "neds"], "staking": staking, "flat_stake": 1.0, "kelly_fraction": 0.5, "bankroll": 100.0}
+            for edge in (0.0, 5.0, 10.0, 25.0)
+            for staking in ("flat", "kelly")
+        ]
+        inline = self.main.run_backtest_sweep(races, strategies, workers=1)
+        pooled = self.main.run_backtest_sweep(races, strategies, workers=2)
+        self.assertEqual(inline, pooled)
+
+    def test_monte_carlo_positions_match_strengths_and_cache(self):
+        probs = self.main.simulate_finishing_positions(self.main.np.array([0.6, 0.3, 0.1]), sims=50000, seed=7)
+        self.assertAlmostEqual(float(probs[0, 0]), 0.6, delta=0.01)
+        self.assertAlmostEqual(float(probs[2, 0]), 0.1, delta=0.01)
+        for i in range(3):
+            self.assertAlmostEqual(float(probs[i].sum()), 1.0)
+            self.assertAlmostEqual(float(probs[:, i].sum()), 1.0)
+
+        race_id, runner = self._first_race_and_runner()
+        first = self.main.get_race_simulation(race_id, sims=5000, seed=11)
+        again = self.main.get_race_simulation(race_id, sims=5000, seed=11)
+        self.assertFalse(first["cached"])
+        self.assertTrue(again["cached"])
+        self.assertEqual(first["runners"], again["runners"])
+        self.assertTrue(all(r["top3_prob_pct"] >= r["win_prob_pct"] for r in first["runners"]))
+
+        conn = self.main.get_conn()
+        original = conn.execute("SELECT model_prob FROM runners WHERE id = ?", (runner["runner_id"],)).fetchone()[0]
+        conn.execute("UPDATE runners SET model_prob = ? WHERE id = ?", (original * 2, runner["runner_id"]))
+        conn.commit()
+        try:
+            self.assertFalse(self.main.get_race_simulation(race_id, sims=5000, seed=11)["cached"])
+        finally:
+            conn.execute("UPDATE runners SET model_prob = ? WHERE id = ?", (original, runner["runner_id"]))
+            conn.commit()
+            conn.close()
+
+    def test_harville_orderings_match_permutation_enumeration(self):
+        win = [0.4, 0.25, 0.15, 0.1, 0.06, 0.04]
+        pair2, pair3 = self.main.ordering_probabilities(self.main.np.array(win), "harville")
+        for i, j, k in itertools.permutations(range(len(win)), 3):
+            expected = win[i] * (win[j] / (1 - win[i])) * (win[k] / (1 - win[i] - win[j]))
+            self.assertAlmostEqual(float(pair3[i, j, k]), expected)
+        self.assertAlmostEqual(float(pair2.sum()), 1.0)
+        self.assertAlmostEqual(float(pair3.sum()), 1.0)
+
+        runners = [{"runner_id": 100 + i, "horse_number": i + 1, "win_prob": p} for i, p in enumerate(win)]
+        exotics = self.main.compute_exotics(-1, runners, "benter", limit=5)
+        self.assertEqual(exotics["place_positions"], 2)
+        self.assertAlmostEqual(sum(p["place_prob_pct"] for p in exotics["place"]), 200.0, delta=0.1)
+        self.assertEqual(exotics["trifecta"][0]["runners"], [1, 2, 3])
+        self.assertEqual(len(exotics["quinella"]), 5)
+        self.assertIs(self.main.compute_exotics(-1, runners, "benter", limit=5), exotics)
+
+        race_id, _ = self._first_race_and_runner()
+        board = self.main.get_race_board(race_id=race_id, min_edge=0.0, books=None, exotics=True)
+        self.assertIn("exotics", board)
+        self.assertTrue(all(row["fair_place_price"] for row in board["rows"]))
+
+    def test_kelly_race_fractions_maximize_log_growth(self):
+        probs = [0.45, 0.3, 0.25]
+        odds = [2.4, 3.6, 2.8]
+        fractions = self.main.kelly_race_fractions(probs, odds)
+        self.assertEqual(fractions[2], 0.0)
+
+        def growth(f):
+            kept = 1.0 - sum(f)
+            return sum(p * math.log(kept + f[i] * o) for i, (p, o) in enumerate(zip(probs, odds)))
+
+        best = max(
+            ((a / 200.0, b / 200.0, 0.0) for a in range(0, 100) for b in range(0, 100)),
+            key=growth,
+        )
+        self.assertAlmostEqual(fractions[0], best[0], delta=0.006)
+        self.assertAlmostEqual(fractions[1], best[1], delta=0.006)
+
+        tips = [
+            {"race_id": 1, "runner_id": 1, "model_prob_pct": 45.0, "market_odds": 2.4},
+            {"race_id": 1, "runner_id": 2, "model_prob_pct": 30.0, "market_odds": 3.6},
+            {"race_id": 2, "runner_id": 3, "model_prob_pct": 50.0, "market_odds": 2.5},
+        ]
+        stakes = self.main.optimize_portfolio(tips, bankroll=100.0, kelly_fraction=1.0, max_exposure_pct=20.0)
+        self.assertAlmostEqual(sum(t["kelly_fraction_pct"] for t in stakes), 20.0, delta=0.01)
+
+    def test_best_prices_maintained_on_odds_move(self):
+        race_id, _ = self._first_race_and_runner()
+        self.main.simulate_odds_move(race_id)
+
+        conn = self.main.get_conn()
+        mismatches = conn.execute(
+            """
+            SELECT b.runner_id
+            FROM runner_best_prices b
+            JOIN runners r ON r.id = b.runner_id
+            WHERE r.race_id = ?
+              AND b.best_odds <> (SELECT MAX(current_odds) FROM odds WHERE runner_id = b.runner_id)
+            """,
+            (race_id,),
+        ).fetchall()
+        ranks = conn.execute(
+            """
+            SELECT o.runner_id, o.price_rank, o.current_odds
+            FROM odds o
+            JOIN runners r ON r.id = o.runner_id
+            WHERE r.race_id = ?
+            ORDER BY o.runner_id, o.price_rank
+            """,
+            (race_id,),
+        ).fetchall()
+        conn.close()
+        self.assertEqual(mismatches, [])
+        for prev, row in zip(ranks, ranks[1:]):
+            if prev["runner_id"] == row["runner_id"]:
+                self.assertEqual(row["price_rank"], prev["price_rank"] + 1)
+                self.assertGreaterEqual(prev["current_odds"], row["current_odds"])
+
+        fast = self.main.get_race_board(race_id=race_id, min_edge=0.0, books=None)
+        scanned = self.main.get_race_board(race_id=race_id, min_edge=0.0, books=",".join(self.main.BOOKMAKERS[:-1] + ["missing"]))
+        self.assertEqual(len(fast["rows"]), len(scanned["rows"]))
+        self.assertTrue(
+            all(f["market_odds"] >= s["market_odds"] for f, s in zip(
+                sorted(fast["rows"], key=lambda r: r["runner_id"]),
+                sorted(scanned["rows"], key=lambda r: r["runner_id"]),
+            ))
+        )
+
+    def test_name_search_prefix_autocomplete_stays_in_sync(self):
+        horses = self.main.search_names(q="gold", kind="horse", limit=5)["results"]
+        self.assertTrue(horses)
+        self.assertTrue(all(r["name"].startswith("Golden") and r["runner_id"] for r in horses))
+
+        jockeys = self.main.search_names(q="jam mc", kind=None, limit=5)["results"]
+        self.assertIn({"kind": "jockey", "name": "James McDonald", "runner_id": None}, jockeys)
+
+        race_id, _ = self._first_race_and_runner()
+        conn = self.main.get_conn()
+        runner_id = conn.execute(
+            """
+            INSERT INTO runners (
+                race_id, horse_number, horse_name, barrier, trainer, jockey, model_prob, predicted_price
+            )
+            VALUES (?, 99, 'Zephyrine Quokka', 99, 'Chris Waller', 'James McDonald', 0.0, 99.0)
+            """,
+            (race_id,),
+        ).lastrowid
+        conn.commit()
+        try:
+            found = self.main.search_names(q="zephyr", kind="horse", limit=5)["results"]
+            self.assertEqual(found, [{"kind": "horse", "name": "Zephyrine Quokka", "runner_id": runner_id}])
+
+            # The candidate cut keeps the best-ranked matches, not the first rowids.
+            conn.execute("INSERT INTO search_names (kind, name) VALUES ('horse', 'Zephyrine Quokka Of The Far Northern Plains')")
+            conn.execute("DELETE FROM search_names WHERE name = 'Zephyrine Quokka'")
+            conn.execute("INSERT INTO search_names (kind, name) VALUES ('horse', 'Zephyrine Quokka')")
+            conn.commit()
+            original = self.main.SEARCH_CANDIDATES
+            self.main.SEARCH_CANDIDATES = 1
+            try:
+                best = self.main.search_names(q="zephyr quo", kind="horse", limit=1)["results"]
+            finally:
+                self.main.SEARCH_CANDIDATES = original
+            self.assertEqual([r["name"] for r in best], ["Zephyrine Quokka"])
+        finally:
+            conn.execute("DELETE FROM runners WHERE id = ?", (runner_id,))
+            conn.execute("DELETE FROM search_names WHERE name LIKE 'Zephyrine Quokka%'")
+            conn.commit()
+            conn.close()
+
+    def test_trainer_and_jockey_history_read_through_dimensions(self):
+        conn = self.main.get_conn(with_archive=True)
+        kinds = dict(
+            conn.execute(
+                "SELECT name, type FROM sqlite_master WHERE name IN ('trainer_history', 'jockey_history')"
+            ).fetchall()
+        )
+        trainer = conn.execute("SELECT trainer FROM runners ORDER BY id LIMIT 1").fetchone()[0]
+        expected = conn.execute(
+            """
+            SELECT COUNT(*)
+            FROM runner_history_all h
+            JOIN runners_all r ON r.id = h.runner_id
+            WHERE r.trainer = ?
+            """,
+            (trainer,),
+        ).fetchone()[0]
+        conn.close()
+        self.assertEqual(kinds, {"trainer_history": "view", "jockey_history": "view"})
+
+        before = self.main.trainer_history(name=trainer, distance=None, track=None, runs_back=None)
+        self.assertEqual(before["stats"]["runs"], expected)
+
+        # New history rows are visible straight away, with no rebuild step.
+        _, runner = self._first_race_and_runner()
+        conn = self.main.get_conn()
+        runner_trainer = conn.execute("SELECT trainer FROM runners WHERE id = ?", (runner["runner_id"],)).fetchone()[0]
+        trainer_runs = self.main.trainer_history(name=runner_trainer, distance=None, track=None, runs_back=None)["stats"]["runs"]
+        conn.execute(
+            """
+            INSERT INTO runner_history (
+                runner_id, run_date, track, distance_m, finish_pos, starting_price, carried_weight_kg, jockey
+            )
+            VALUES (?, '2001-01-01', 'Randwick', 1200, 1, 5.0, 56.0, 'Zara Quill')
+            """,
+            (runner["runner_id"],),
+        )
+        conn.commit()
+        try:
+            jockey = self.main.jockey_history(name="Zara Quill", distance=None, track=None, runs_back=None)
+            self.assertEqual([r["run_date"] for r in jockey["runs"]], ["2001-01-01"])
+            after = self.main.trainer_history(name=runner_trainer, distance=None, track=None, runs_back=None)
+            self.assertEqual(after["stats"]["runs"], trainer_runs + 1)
+        finally:
+            conn.execute("DELETE FROM runner_history WHERE jockey = 'Zara Quill'")
+            conn.commit()
+            conn.close()
+
+    def test_compact_odds_storage_round_trips_through_view(self):
+        _, runner = self._first_race_and_runner()
+        conn = self.main.get_conn()
+        race_id = conn.execute("SELECT race_id FROM runners WHERE id = ?", (runner["runner_id"],)).fetchone()[0]
+        stamp = "2026-10-19T09:30:01.000250"
+        conn.execute(
+            """
+            INSERT INTO odds (runner_id, bookmaker, current_odds, bet_url, updated_at)
+            VALUES (?, 'zz-test-book', 3.45, ?, ?)
+            """,
+            (runner["runner_id"], f"https://example.com/bet/zz-test-book/{race_id}/{runner['runner_id']}", stamp),
+        )
+        conn.execute("UPDATE odds SET current_odds = 4.1 WHERE bookmaker = 'zz-test-book'")
+        try:
+            row = dict(conn.execute("SELECT * FROM odds WHERE bookmaker = 'zz-test-book'").fetchone())
+            stored = conn.execute(
+                """
+                SELECT o.price_ticks, o.bet_url, o.updated_us
+                FROM odds_data o
+                JOIN bookmakers b ON b.id = o.bookmaker_id
+                WHERE b.code = 'zz-test-book'
+                """
+            ).fetchone()
+            self.assertEqual(row["current_odds"], 4.1)
+            self.assertEqual(row["updated_at"], stamp)
+            self.assertEqual(row["bet_url"], f"https://example.com/bet/zz-test-book/{race_id}/{runner['runner_id']}")
+            # Default deep links are derived, not stored.
+            self.assertEqual((stored["price_ticks"], stored["bet_url"]), (410, None))
+            self.assertEqual(stored["updated_us"] % 1_000_000, 250)
+        finally:
+            conn.execute("DELETE FROM odds WHERE bookmaker = 'zz-test-book'")
+            conn.execute("DELETE FROM bookmakers WHERE code = 'zz-test-book'")
+            conn.commit()
+            conn.close()
+
+    def test_static_assets_are_fingerprinted_and_precompressed(self):
+        def request(**headers):
+            return Request({
+                "type": "http",
+                "method": "GET",
+                "path": "/",
+                "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()],
+            })
+
+        manifest = self.main.build_static_assets()
+        styles = manifest["styles.css"]
+        self.assertRegex(styles, r"^styles\.[0-9a-f]{12}\.css$")
+
+        page = self.main.index(request())
+        html = page.body.decode()
+        self.assertEqual(page.headers["cache-control"], "no-cache")
+        self.assertIn(f"/assets/{styles}", html)
+        self.assertIn(f"/assets/{manifest['app.js']}", html)
+        self.assertNotIn("/static/styles.css", html)
+        self.assertEqual(self.main.index(request(if_none_match=page.headers["etag"])).status_code, 304)
+
+        asset = self.main.static_asset(styles, request(accept_encoding="gzip, deflate"))
+        self.assertEqual(asset.headers["cache-control"], "public, max-age=31536000, immutable")
+        self.assertEqual(asset.headers["content-encoding"], "gzip")
+        self.assertEqual(gzip.decompress(asset.body), (self.main.STATIC_DIR / "styles.css").read_bytes())
+        plain = self.main.static_asset(styles, request())
+        self.assertNotIn("content-encoding", plain.headers)
+
+        # Each coding is its own representation with its own ETag.
+        self.assertEqual(asset.headers["etag"], plain.headers["etag"][:-1] + '-gzip"')
+        self.assertEqual(self.main.static_asset(styles, request(accept_encoding="gzip", if_none_match=asset.headers["etag"])).status_code, 304)
+        self.assertEqual(self.main.static_asset(styles, request(accept_encoding="gzip", if_none_match=plain.headers["etag"])).status_code, 200)
+        self.assertEqual(self.main.static_asset(styles, request(if_none_match=asset.headers["etag"])).status_code, 200)
+
+        # q=0 refuses a coding.
+        for accept in ("gzip;q=0", "gzip; q=0.0, identity", "*;q=0"):
+            self.assertNotIn("content-encoding", self.main.static_asset(styles, request(accept_encoding=accept)).headers)
+        self.assertEqual(self.main.accepted_encodings(request(accept_encoding="br;q=0, gzip;q=0.5, *")), {"gzip": 0.5, "*": 1.0})
+
+        with self.assertRaises(HTTPException) as ctx:
+            self.main.static_asset("styles.0000.css", request())
+        self.assertEqual(ctx.exception.status_code, 404)
+
+    def test_bootstrap_payloads_match_standalone_endpoints(self):
+        day = datetime.now().date().isoformat()
+        boot = self.main.bootstrap_board(race_date=day, books=None, race_id=None, rec_edge=1.0)
+        races = self.main.get_races(race_date=day, track=None)
+        self.assertEqual(boot["bookmakers"], self.main.get_bookmakers())
+        self.assertEqual(boot["races"], races)
+        self.assertEqual(boot["signals"], self.main.get_race_signals(race_date=day, books=None, rec_edge=1.0))
+        first_race = races["races"][0]["id"]
+        self.assertEqual(boot["board"], self.main.get_race_board(race_id=first_race, min_edge=0.0, books=None))
+        self.assertEqual(boot["tracked"]["tips"], self.main.tracked_tips()["tips"])
+
+        last_race = races["races"][-1]["id"]
+        picked = self.main.bootstrap_board(race_date=day, books="tab", race_id=last_race, rec_edge=1.0)
+        self.assertEqual(picked["board"]["race"]["id"], last_race)
+        self.assertEqual(picked["board"]["selected_books"], ["tab"])
+
+        dash = self.main.bootstrap_dashboard(race_date=day, min_edge=0.0, books=None)
+        self.assertEqual(dash["races"], races)
+        self.assertEqual(dash["tips"], self.main.get_daily_tips(race_date=day, min_edge=0.0, books=None))
+
+    def test_batch_boards_match_single_race_boards(self):
+        day = datetime.now().date().isoformat()
+        races = self.main.get_races(race_date=day, track=None)["races"]
+        ids = [r["id"] for r in races[:6]]
+        batch = self.main.get_race_boards(
+            race_ids=",".join(str(i) for i in reversed(ids)), race_date=None, track=None, min_edge=2.0, books="tab,neds"
+        )["boards"]
+        self.assertEqual([b["race"]["id"] for b in batch], list(reversed(ids)))
+        for board in batch:
+            single = self.main.get_race_board(race_id=board["race"]["id"], min_edge=2.0, books="tab,neds")
+            self.assertEqual(board, single)
+
+        track = races[0]["track"]
+        by_track = self.main.get_race_boards(race_ids=None, race_date=day, track=track, min_edge=0.0, books=None)["boards"]
+        self.assertEqual([b["race"]["id"] for b in by_track], [r["id"] for r in races if r["track"] == track])
+
+        for bad in ("1,x", None):
+            with self.assertRaises(HTTPException) as ctx:
+                self.main.get_race_boards(race_ids=bad, race_date=None, track=None, min_edge=0.0, books=None)
+            self.assertEqual(ctx.exception.status_code, 400)
+        with self.assertRaises(HTTPException) as ctx:
+            self.main.get_race_boards(race_ids="999999", race_date=None, track=None, min_edge=0.0, books=None)
+        self.assertEqual(ctx.exception.status_code, 404)
+
+    def test_sparse_fields_project_rows_and_skip_unrequested_work(self):
+        day = datetime.now().date().isoformat()
+        race_id = self.main.get_races(race_date=day, track=None)["races"][0]["id"]
+        full = self.main.get_race_board(race_id=race_id, min_edge=0.0, books=None)
+        sparse = self.main.get_race_board(race_id=race_id, min_edge=0.0, books=None, fields="horse_name,edge_pct")
+        self.assertEqual(sparse["race"], full["race"])
+        self.assertEqual(
+            sparse["rows"],
+            [{k: row[k] for k in ("runner_id", "horse_name", "edge_pct")} for row in full["rows"]],
+        )
+
+        statements = []
+        conn = self.main.get_conn()
+        conn.set_trace_callback(statements.append)
+        try:
+            self.main.race_board(conn, race_id, list(self.main.BOOKMAKERS), fields={"runner_id", "edge_pct"})
+            self.main.daily_tips(conn, day, list(self.main.BOOKMAKERS), 0.0, {"race_id", "runner_id", "edge_pct"})
+        finally:
+            conn.close()
+        self.assertFalse([s for s in statements if "_history" in s])
+
+        tips = self.main.get_daily_tips(race_date=day, min_edge=-100.0, books=None, fields="form_last5")["tips"]
+        self.assertTrue(tips)
+        self.assertEqual(set(tips[0]), {"race_id", "runner_id", "form_last5"})
+
+        self.main.track_tip(self.main.TrackTipRequest(
+            race_id=race_id, runner_id=full["rows"][0]["runner_id"], bookmaker="tab",
+            edge_pct=2.0, odds_at_tip=3.0, stake=5.0,
+        ))
+        bets = self.main.get_user_bets(fields="stake,result")["bets"]
+        self.assertTrue(bets)
+        self.assertEqual(set(bets[0]), {"id", "stake", "result"})
+
+        # A tip whose runner is gone is dropped whether or not runner columns are selected.
+        conn = self.main.get_conn()
+        orphan_id = conn.execute(
+            """
+            INSERT INTO tracked_tips (race_id, runner_id, bookmaker, edge_pct, odds_at_tip, stake, tracked_at)
+            VALUES (?, -1, 'tab', 2.0, 3.0, 1.0, ?)
+            """,
+            (race_id, datetime.now().isoformat()),
+        ).lastrowid
+        conn.commit()
+        try:
+            for fields in (None, "horse_name", "track", "stake,result"):
+                self.assertNotIn(orphan_id, [b["id"] for b in self.main.get_user_bets(fields=fields)["bets"]], fields)
+        finally:
+            conn.execute("DELETE FROM tracked_tips WHERE id = ?", (orphan_id,))
+            conn.commit()
+            conn.close()
+
+        with self.assertRaises(HTTPException) as ctx:
+            self.main.get_user_bets(fields="stake,password")
+        self.assertEqual(ctx.exception.status_code, 400)
+
+    def test_board_delta_returns_only_changed_runners(self):
+        day = datetime.now().date().isoformat()
+        race_id, other_id = [r["id"] for r in self.main.get_races(race_date=day, track=None)["races"][:2]]
+        kwargs = dict(min_edge=0.0, books=None, fields=None)
+        full = self.main.get_race_board_delta(race_id=race_id, since=None, **kwargs)
+        self.assertTrue(full["full"])
+        self.assertEqual(full["rows"], self.main.get_race_board(race_id=race_id, min_edge=0.0, books=None)["rows"])
+        version = full["version"]
+        self.assertEqual(self.main.get_race_board_delta(race_id=race_id, since=version, **kwargs)["rows"], [])
+
+        conn = self.main.get_conn()
+        moved = conn.execute("SELECT runner_id FROM odds WHERE runner_id IN (SELECT id FROM runners WHERE race_id = ?) LIMIT 1", (race_id,)).fetchone()[0]
+        conn.execute("UPDATE odds SET current_odds = current_odds + 0.5 WHERE runner_id = ? AND bookmaker = 'tab'", (moved,))
+        self.main.refresh_best_prices(conn, [race_id])
+        conn.commit()
+        conn.close()
+
+        delta = self.main.get_race_board_delta(race_id=race_id, since=version, **kwargs)
+        self.assertFalse(delta["full"])
+        self.assertGreater(delta["version"], version)
+        self.assertEqual([row["runner_id"] for row in delta["rows"]], [moved])
+        current = {row["runner_id"]: row for row in self.main.get_race_board(race_id=race_id, min_edge=0.0, books=None)["rows"]}
+        self.assertEqual(delta["rows"][0], {k: current[moved][k] for k in delta["rows"][0]})
+        self.assertNotIn("form_last5", delta["rows"][0])
+        self.assertEqual(self.main.get_race_board_delta(race_id=other_id, since=version, **kwargs)["rows"], [])
+
+        self.main.simulate_race_result(race_id)
+        after_result = self.main.get_race_board_delta(race_id=race_id, since=delta["version"], **kwargs)
+        self.assertEqual(len(after_result["rows"]), len(full["rows"]))
+        self.assertTrue(all("finish_pos" in row for row in after_result["rows"]))
+        self.assertTrue(after_result["results"])
+
+    def test_alert_engine_queues_changed_runners_once(self):
+        day = datetime.now().date().isoformat()
+        conn = self.main.get_conn()
+        race_id = conn.execute(
+            "SELECT id FROM races WHERE race_date = ? AND id NOT IN (SELECT race_id FROM race_results) ORDER BY id LIMIT 1",
+            (day,),
+        ).fetchone()[0]
+
+        def set_threshold(edge):
+            conn.execute("UPDATE user_settings SET notifications_enabled = 1, notify_min_edge = ? WHERE user_id = 'demo'", (edge,))
+            conn.commit()
+
+        def move_odds():
+            version = conn.execute("SELECT version FROM board_clock").fetchone()[0]
+            self.main.simulate_odds_move(race_id)
+            return {r[0] for r in conn.execute("SELECT runner_id FROM runner_changes WHERE version > ?", (version,))}
+
+        try:
+            # Nobody qualifies: the backlog is consumed and this race's runners are cleared.
+            set_threshold(1000.0)
+            self.main.run_alert_tick()
+            self.assertEqual(self.main.get_user_alerts(limit=500)["alerts"], [])
+            moved = move_odds()
+            self.assertEqual(self.main.get_alert_ticks(limit=1)["ticks"][0]["cleared"], len(moved))
+
+            set_threshold(-100.0)
+            moved = move_odds()
+            tick = self.main.get_alert_ticks(limit=1)["ticks"][0]
+            self.assertEqual((tick["races"], tick["runners"], tick["events"]), (1, len(moved), len(moved)))
+            self.assertGreaterEqual(tick["duration_ms"], 0.0)
+            alerts = self.main.get_user_alerts(limit=500)["alerts"]
+            self.assertEqual({a["runner_id"] for a in alerts}, moved)
+            self.assertTrue(all(a["race_id"] == race_id for a in alerts))
+
+            # Still above the threshold: already delivered, so nothing new is queued.
+            move_odds()
+            self.assertEqual(self.main.get_user_alerts(limit=500)["alerts"], [])
+            self.assertIsNone(self.main.run_alert_tick()["tick"])
+        finally:
+            set_threshold(1.0)
+            conn.close()
+    def test_board_cache_invalidates_on_writes_from_other_processes(self):
+        day = datetime.now().date().isoformat()
+        race_id, other_id = [r["id"] for r in self.main.get_races(race_date=day, track=None)["races"][2:4]]
+        board = lambda rid: self.main.get_race_board(race_id=rid, min_edge=0.0, books=None)
+        board(race_id)
+        board(other_id)
+        hits = self.main.get_board_cache_stats()["hits"]
+        self.assertIs(board(race_id), board(race_id))
+        self.assertEqual(self.main.get_board_cache_stats()["hits"], hits + 2)
+
+        # Another worker moves a price in race_id only.
+        writer = (
+            "import sqlite3, sys; conn = sqlite3.connect(sys.argv[1]); "
+            "conn.execute('UPDATE odds_data SET price_ticks = price_ticks + 37 WHERE runner_id = "
+            "(SELECT MIN(id) FROM runners WHERE race_id = ?)', (int(sys.argv[2]),)); conn.commit()"
+        )
+        subprocess.run([sys.executable, "-c", writer, str(self.main.DB_PATH), str(race_id)], check=True)
+        conn = self.main.get_conn()
+        try:
+            expected = self.main.race_board(conn, race_id, list(self.main.BOOKMAKERS))
+        finally:
+            conn.close()
+        before = self.main.get_board_cache_stats()
+        self.assertEqual(board(race_id), expected)
+        board(other_id)
+        after = self.main.get_board_cache_stats()
+        self.assertEqual((after["misses"], after["hits"]), (before["misses"] + 1, before["hits"] + 1))
+        hits = after["hits"]
+
+        # New form history can change any board's form/ROI columns.
+        conn = self.main.get_conn()
+        conn.execute("UPDATE runner_history_data SET finish_pos = finish_pos WHERE id = (SELECT MIN(id) FROM runner_history_data)")
+        conn.commit()
+        conn.close()
+        board(other_id)
+        stats = self.main.get_board_cache_stats()
+        self.assertEqual((stats["hits"], stats["entries"]), (hits, 1))
+
+        # Moving a runner in race_id to one of other_id's trainers changes that trainer's ROI on other_id too.
+        conn = self.main.get_conn()
+        runner = conn.execute(
+            """
+            SELECT r.id, r.trainer FROM runners r JOIN runner_history_data h ON h.runner_id = r.id
+            WHERE r.race_id = ? GROUP BY r.id ORDER BY COUNT(*) DESC LIMIT 1
+            """,
+            (race_id,),
+        ).fetchone()
+        trainer = conn.execute(
+            "SELECT trainer FROM runners WHERE race_id = ? AND trainer <> ? LIMIT 1", (other_id, runner["trainer"])
+        ).fetchone()[0]
+        stale = board(other_id)
+        conn.execute("UPDATE runners SET trainer = ? WHERE id = ?", (trainer, runner["id"]))
+        conn.commit()
+        try:
+            expected = self.main.race_board(conn, other_id, list(self.main.BOOKMAKERS))
+            self.assertNotEqual(expected, stale)
+            self.assertEqual(board(other_id), expected)
+        finally:
+            conn.execute("UPDATE runners SET trainer = ? WHERE id = ?", (runner["trainer"], runner["id"]))
+            conn.commit()
+            conn.close()
+
+    def test_jump_scheduler_warms_boards_and_sets_max_age(self):
+        main = self.main
+        jump = datetime(2030, 1, 1, 12, 0)
+        refresh = lambda now, resulted=False: main.refresh_after_s("2030-01-01", "12:00", resulted, now)
+        self.assertEqual(refresh(jump - timedelta(hours=5)), main.REFRESH_FAR_S)
+        self.assertEqual(refresh(jump - timedelta(minutes=3)), 5)
+        self.assertEqual(refresh(jump + timedelta(minutes=1)), main.REFRESH_AWAITING_RESULT_S)
+        self.assertEqual(refresh(jump - timedelta(minutes=3), True), main.REFRESH_RESULTED_S)
+
+        conn = main.get_conn()
+        race = conn.execute(
+            """
+            SELECT id, race_date, jump_time FROM races
+            WHERE race_date = ? AND NOT EXISTS (SELECT 1 FROM race_results rr WHERE rr.race_id = races.id)
+            ORDER BY race_date, jump_time LIMIT 1
+            """,
+            (datetime.now().date().isoformat(),),
+        ).fetchone()
+        conn.close()
+        now = main.jump_datetime(race["race_date"], race["jump_time"]) - timedelta(minutes=4)
+        with main.board_cache_lock:
+            main.board_cache.clear()
+            main.signals_cache.clear()
+        tick = main.run_scheduler_tick(now=now, warm_ahead_s=300)
+        self.assertIn(race["id"], tick["warmed"])
+        self.assertEqual(main.get_scheduler_status(limit=5)["last_tick"], tick)
+
+        hits = main.get_board_cache_stats()["hits"]
+        response = Response()
+        main.get_race_board(race_id=race["id"], min_edge=0.0, books=None, response=response)
+        main.get_race_signals(race_date=race["race_date"], books=None, rec_edge=1.0)
+        self.assertEqual(main.get_board_cache_stats()["hits"], hits + 2)
+        self.assertRegex(response.headers["cache-control"], r"^private, max-age=\d+$")
+        delta = main.get_race_board_delta(race_id=race["id"], since=None, min_edge=0.0, books=None)
+        self.assertIn(delta["refresh_after_s"], {5, 10, 30, 60, main.REFRESH_FAR_S, main.REFRESH_AWAITING_RESULT_S})
+
+    def test_next_to_jump_index_tracks_added_moved_and_resulted_races(self):
+        main = self.main
+        listing = main.get_next_to_jump(limit=5, top=2, min_edge=-100.0, books=None)
+        jumps = [r["jump_at"] for r in listing["races"]]
+        self.assertEqual(jumps, sorted(jumps))
+        for race in listing["races"]:
+            self.assertGreaterEqual(race["seconds_to_jump"], 0)
+            edges = [row["edge_pct"] for row in race["top_edges"]]
+            self.assertEqual(edges, sorted(edges, reverse=True))
+            self.assertLessEqual(len(edges), 2)
+
+        far = datetime(2099, 1, 1)
+        conn = main.get_conn()
+        try:
+            race_id = conn.execute(
+                """
+                INSERT INTO races (race_date, track, race_number, distance_m, jump_time, race_name, starters, prize_pool, track_rating)
+                VALUES ('2099-01-01', 'Index Downs', 1, 1200, '13:05', 'Index Plate', 0, 0, 'Good 4')
+                """
+            ).lastrowid
+            conn.commit()
+            self.assertEqual(main.next_jumps(far), [(datetime(2099, 1, 1, 13, 5), race_id)])
+            conn.execute("UPDATE races SET jump_time = '09:40' WHERE id = ?", (race_id,))
+            conn.commit()
+            self.assertEqual(main.next_jumps(far), [(datetime(2099, 1, 1, 9, 40), race_id)])
+        finally:
+            conn.execute("DELETE FROM races WHERE track = 'Index Downs'")
+            conn.commit()
+        self.assertEqual(main.next_jumps(far), [])
+
+        # Resulting a race drops it; withdrawing the result brings it back.
+        jump_at, upcoming_id = main.next_jumps(datetime.now(), 1)[0]
+        runner_id = conn.execute("SELECT MIN(id) FROM runners WHERE race_id = ?", (upcoming_id,)).fetchone()[0]
+        try:
+            conn.execute(
+                "INSERT INTO race_results (race_id, runner_id, finish_pos, official_at) VALUES (?, ?, 1, ?)",
+                (upcoming_id, runner_id, datetime.now().isoformat()),
+            )
+            conn.commit()
+            self.assertNotIn((jump_at, upcoming_id), main.next_jumps(jump_at, 5))
+        finally:
+            conn.execute("DELETE FROM race_results WHERE race_id = ?", (upcoming_id,))
+            conn.commit()
+            conn.close()
+        self.assertIn((jump_at, upcoming_id), main.next_jumps(jump_at, 5))
+
+    def test_odds_ingest_from_mock_feed_retries_and_batches(self):
+        day = datetime.now().date().isoformat()
+        race_ids = [r["id"] for r in self.main.get_races(race_date=day, track=None)["races"][:12]]
+        conn = self.main.get_conn()
+        ph = ",".join("?" for _ in race_ids)
+        runner_count = conn.execute(f"SELECT COUNT(*) FROM runners WHERE race_id IN ({ph})", race_ids).fetchone()[0]
+        conn.close()
+
+        async def run():
+            server = await self.main.start_mock_odds_feed(error_rate=0.25, max_inflight=3, seed=7)
+            port = server.sockets[0].getsockname()[1]
+            provider = self.main.HttpJsonOddsProvider(
+                "mock", f"http://127.0.0.1:{port}", max_concurrency=6, rate_per_s=400.0, max_retries=8, backoff_s=0.005
+            )
+            try:
+                return await self.main.ingest_odds([provider], race_ids, batch_rows=100, queue_size=2)
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        result = asyncio.run(run())
+        stats = result["providers"]["mock"]
+        expected = runner_count * len(self.main.BOOKMAKERS)
+        self.assertEqual(stats["failures"], 0, result["errors"])
+        self.assertGreater(stats["retries"], 0)
+        self.assertEqual(stats["requests"], len(race_ids) + stats["retries"])
+        self.assertEqual((result["quotes"], result["rows_written"]), (expected, expected))
+        self.assertGreater(result["batches"], 1)
+        self.assertLessEqual(result["max_queue_depth"], 2)
+        self.assertTrue(self.main.valid_quote({"runner_id": 1, "bookmaker": "tab", "odds": 3.0}))
+        self.assertFalse(self.main.valid_quote({"runner_id": 1, "bookmaker": "not-a-book", "odds": 3.0}))
+
+        conn = self.main.get_conn()
+        mismatched = conn.execute(
+            f"""
+            SELECT COUNT(*) FROM runner_best_prices b
+            WHERE b.race_id IN ({ph})
+              AND b.best_odds != (SELECT MAX(current_odds) FROM odds o WHERE o.runner_id = b.runner_id)
+            """,
+            race_ids,
+        ).fetchone()[0]
+        conn.close()
+        self.assertEqual(mismatched, 0)
+
+        with self.assertRaises(HTTPException) as ctx:
+            self.main.run_odds_ingest(self.main.OddsIngestRequest(providers=["nope"]))
+        self.assertEqual(ctx.exception.status_code, 400)
+
+    def test_odds_ingest_stops_when_the_writer_fails(self):
+        main = self.main
+        conn = main.get_conn()
+        runner_id = conn.execute("SELECT MIN(id) FROM runners").fetchone()[0]
+        conn.close()
+
+        class StubProvider(main.OddsProvider):
+            async def fetch_race(self, race_id):
+                return [{"runner_id": runner_id, "bookmaker": "tab", "odds": 3.0}]
+
+        with self.assertRaises(TypeError):
+            main.OddsProvider("abstract")
+
+        def failing_write(conn, quotes):
+            raise sqlite3.OperationalError("disk I/O error")
+
+        original = main.write_odds_batch
+        main.write_odds_batch = failing_write
+        try:
+            provider = StubProvider("stub", rate_per_s=10000.0)
+            run = main.ingest_odds([provider], list(range(1, 41)), batch_rows=1, queue_size=1)
+            with self.assertRaises(sqlite3.OperationalError):
+                asyncio.run(asyncio.wait_for(run, 5))
+        finally:
+            main.write_odds_batch = original
+
+    def test_odds_ingest_counts_malformed_quote_lists_as_failures(self):
+        main = self.main
+        conn = main.get_conn()
+        runner_id = conn.execute("SELECT MIN(id) FROM runners").fetchone()[0]
+        conn.close()
+
+        class PatchyProvider(main.OddsProvider):
+            async def fetch_race(self, race_id):
+                return None if race_id == 2 else [{"runner_id": runner_id, "bookmaker": "tab", "odds": 3.0}]
+
+        written = []
+        original = main.write_odds_batch
+        main.write_odds_batch = lambda conn, quotes: written.extend(quotes) or {"rows": len(quotes), "races": 1}
+        try:
+            result = asyncio.run(main.ingest_odds([PatchyProvider("patchy", rate_per_s=10000.0)], [1, 2, 3]))
+        finally:
+            main.write_odds_batch = original
+        stats = result["providers"]["patchy"]
+        self.assertEqual((stats["failures"], stats["quotes"], len(written)), (1, 2, 2))
+        self.assertEqual(result["errors"], ["patchy race 2: quotes is not a list"])
+
+        # The HTTP adapter rejects the payload itself, without retrying.
+        async def null_quotes(url):
+            return 200, {}, b'{"race_id": 1, "quotes": null}'
+
+        original_get = main.http_get
+        main.http_get = null_quotes
+        try:
+            with self.assertRaises(main.ProviderError) as ctx:
+                asyncio.run(main.HttpJsonOddsProvider("feed", "http://feed.invalid").fetch_race(1))
+        finally:
+            main.http_get = original_get
+        self.assertFalse(ctx.exception.retryable)
+
+    def test_form_import_streams_dedupes_and_is_idempotent(self):
+        conn = self.main.get_conn()
+        horse, runner_ids = conn.execute(
+            "SELECT horse_name, group_concat(id) FROM runners GROUP BY horse_name ORDER BY COUNT(*) DESC LIMIT 1"
+        ).fetchone()
+        runner_ids = sorted(int(x) for x in runner_ids.split(","))
+        existing = conn.execute(
+            "SELECT run_date, track FROM runner_history WHERE runner_id = ? ORDER BY id LIMIT 1", (runner_ids[0],)
+        ).fetchone()
+        conn.close()
+
+        header = ["horse_name", "run_date", "track", "distance_m", "finish_pos", "starting_price", "carried_weight_kg", "jockey"]
+        rows = [
+            [horse, "2019-03-02", "Import Park", 1200, 3, 6.5, 56.5, "Ivy Importer"],
+            [horse, "2019-03-09", "Import Park", 1400, 1, 4.2, 57.0, "Ivy Importer"],
+            [horse, "2019-03-09", "Import Park", 1400, 2, 4.4, 57.0, "Ivy Importer"],  # same key: last wins
+            [horse, existing["run_date"], existing["track"], 1600, 9, 21.0, 55.0, "Ivy Importer"],
+            ["Horse Nobody Raced", "2019-03-09", "Import Park", 1000, 1, 3.0, 54.0, "Ivy Importer"],
+            [horse, "not-a-date", "Import Park", 1000, 1, 3.0, 54.0, "Ivy Importer"],
+        ]
+        import_dir = self.main.FORM_IMPORT_DIR
+        with tempfile.TemporaryDirectory() as tmp:
+            self.main.FORM_IMPORT_DIR = Path(tmp).resolve()
+            self.addCleanup(setattr, self.main, "FORM_IMPORT_DIR", import_dir)
+            csv_path = Path(tmp) / "form.csv"
+            with csv_path.open("w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(rows)
+            first = self.main.run_form_import(self.main.FormImportRequest(path="form.csv", batch_rows=2))
+            self.assertEqual((first["records"], first["rejected"], first["unmatched"]), (6, 1, 1))
+            self.assertEqual(first["batches"], 3)
+            self.assertEqual(first["errors"], ["record 7: invalid run_date"])
+            self.assertFalse(self.main.get_form_import_status()["running"])
+
+            for outside in (str(Path(tmp).parent), "../form.csv", __file__):
+                with self.assertRaises(HTTPException) as ctx:
+                    self.main.run_form_import(self.main.FormImportRequest(path=outside))
+                self.assertEqual(ctx.exception.status_code, 400)
+
+            records = [dict(zip(header, row)) for row in rows[:5]]
+            json_path = Path(tmp) / "form.json"
+            json_path.write_text(json.dumps(records, indent=1))
+            ndjson_path = Path(tmp) / "form.ndjson"
+            ndjson_path.write_text("".join(json.dumps(r) + "\n" for r in records))
+            for path in (json_path, ndjson_path):
+                again = self.main.run_form_import(self.main.FormImportRequest(path=str(path)))
+                self.assertEqual((again["records"], again["inserted"], again["rejected"]), (5, 0, 0))
+
+        conn = self.main.get_conn()
+        try:
+            imported = conn.execute(
+                "SELECT runner_id, run_date, finish_pos FROM runner_history WHERE track = 'Import Park' ORDER BY runner_id, run_date"
+            ).fetchall()
+            self.assertEqual([tuple(r) for r in imported], [(rid, d, p) for rid in runner_ids for d, p in (("2019-03-02", 3), ("2019-03-09", 2))])
+            updated = conn.execute(
+                "SELECT COUNT(*), MIN(finish_pos), MIN(jockey) FROM runner_history WHERE runner_id = ? AND run_date = ? AND track = ?",
+                (runner_ids[0], existing["run_date"], existing["track"]),
+            ).fetchone()
+            self.assertEqual((updated[1], updated[2]), (9, "Ivy Importer"))
+            self.assertGreaterEqual(updated[0], 1)
+        finally:
+            conn.execute("DELETE FROM runner_history WHERE track = 'Import Park'")
+            conn.commit()
+            conn.close()
+
 
 if __name__ == "__main__":
     unittest.main()